@@ -0,0 +1,11 @@
+"""
+Root URLconf for ASGI workers: the async read views in api.async_views
+answer their paths first, everything else falls through to Ecommerce.urls.
+"""
+from django.urls import include, path
+
+from Ecommerce.urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/', include('api.async_urls')),
+] + sync_urlpatterns
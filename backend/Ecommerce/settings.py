@@ -45,11 +45,16 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.ReadYourWritesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'Ecommerce.urls'
+# Serve product, cart and wishlist reads from api.async_views. Turn this on
+# for uvicorn workers; sync gunicorn workers are better off with the DRF views.
+ASYNC_READ_VIEWS = config('ASYNC_READ_VIEWS', default=False, cast=bool)
+
+ROOT_URLCONF = 'Ecommerce.asgi_urls' if ASYNC_READ_VIEWS else 'Ecommerce.urls'
 
 TEMPLATES = [
     {
@@ -68,20 +73,83 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'Ecommerce.wsgi.application'
 
-try:
+# Connections are kept open for DB_CONN_MAX_AGE seconds and checked before
+# reuse. Setting DB_POOL_MAX_SIZE switches Postgres to Django's native
+# psycopg 3 pool instead (needs `pip install "psycopg[binary,pool]"`), in
+# which case connections go back to the pool after every request. Under
+# uvicorn (ASYNC_READ_VIEWS) prefer the pool or DB_CONN_MAX_AGE=0: async
+# requests run their queries on short-lived threads that would each hold
+# a persistent connection.
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=600, cast=int)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=2, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=0, cast=int)
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10.0, cast=float)
+
+
+def database_from_url(url):
+    database = dj_database_url.parse(url, conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=DB_CONN_HEALTH_CHECKS)
+    if DB_POOL_MAX_SIZE and database['ENGINE'] == 'django.db.backends.postgresql':
+        # Django refuses persistent connections alongside a pool.
+        database['CONN_MAX_AGE'] = 0
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+        }
+    return database
+
+
+if os.environ.get('DATABASE_URL'):
     DATABASES = {
-        'default': dj_database_url.parse(
-            os.environ.get("DATABASE_URL")
-        )
+        'default': database_from_url(os.environ['DATABASE_URL'])
     }
-except:
+else:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+            # IMMEDIATE transactions make concurrent cart writers queue on the
+            # busy timeout instead of failing on a lock upgrade.
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+            # A file-backed test database lets concurrency tests use real
+            # per-thread connections instead of a shared-cache memory DB.
+            'TEST': {
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
         }
     }
 
+# Read replicas, as a comma-separated list of URLs (sqlite:///replica.sqlite3
+# works for trying this locally). api.routers.ReplicaRouter sends the reads
+# of views marked with ReplicaReadMixin to them; everything else, and every
+# write, stays on default. Tests mirror them onto the default test database.
+DATABASE_REPLICAS = []
+for index, url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv())):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {**database_from_url(url), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+
+# How long a user who just wrote reads from the primary instead of a replica.
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    # Registers the trigram lookups used by api.search.PostgresSearchBackend.
+    INSTALLED_APPS.append('django.contrib.postgres')
+
+# Dotted path to a product search backend; empty picks one from the database vendor.
+PRODUCT_SEARCH_BACKEND = config('PRODUCT_SEARCH_BACKEND', default='')
+
+# Dotted path to the class import_products uploads images with; empty means Cloudinary.
+PRODUCT_IMAGE_UPLOADER = config('PRODUCT_IMAGE_UPLOADER', default='')
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -113,14 +181,47 @@ SECURE_CROSS_ORIGIN_OPENER_POLICY = 'same-origin-allow-popups'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'api.authentication.CachedJWTAuthentication',
+    ),
+    'PAGE_SIZE': config('API_PAGE_SIZE', default=24, cast=int),
 }
 
+# api.authentication caches: verified tokens and User rows per process, and
+# User rows in the shared cache until the user is saved.
+AUTH_TOKEN_CACHE_SIZE = config('AUTH_TOKEN_CACHE_SIZE', default=10000, cast=int)
+AUTH_TOKEN_CACHE_TTL = config('AUTH_TOKEN_CACHE_TTL', default=300, cast=int)
+AUTH_USER_CACHE_SIZE = config('AUTH_USER_CACHE_SIZE', default=10000, cast=int)
+AUTH_USER_LOCAL_TTL = config('AUTH_USER_LOCAL_TTL', default=30, cast=int)
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=600, cast=int)
+
+# PAGE_SIZE is consumed by per-view pagination classes, not a global default.
+SILENCED_SYSTEM_CHECKS = ['rest_framework.W001']
+
 CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS').split(',')
 
 RAZORPAY_KEY_ID = config('RAZORPAY_KEY_ID')
 RAZORPAY_KEY_SECRET = config('RAZORPAY_KEY_SECRET')
+RAZORPAY_WEBHOOK_SECRET = config('RAZORPAY_WEBHOOK_SECRET', default='')
+RAZORPAY_BASE_URL = config('RAZORPAY_BASE_URL', default='') or None
+RAZORPAY_CONNECT_TIMEOUT = config('RAZORPAY_CONNECT_TIMEOUT', default=3.05, cast=float)
+RAZORPAY_READ_TIMEOUT = config('RAZORPAY_READ_TIMEOUT', default=10.0, cast=float)
+RAZORPAY_MAX_RETRIES = config('RAZORPAY_MAX_RETRIES', default=2, cast=int)
+RAZORPAY_POOL_SIZE = config('RAZORPAY_POOL_SIZE', default=10, cast=int)
+RAZORPAY_BREAKER_THRESHOLD = config('RAZORPAY_BREAKER_THRESHOLD', default=5, cast=int)
+RAZORPAY_BREAKER_RESET = config('RAZORPAY_BREAKER_RESET', default=30.0, cast=float)
+
+# Run @task functions in-process on commit instead of queueing them.
+TASKS_ALWAYS_EAGER = config('TASKS_ALWAYS_EAGER', default=False, cast=bool)
+
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='orders@example.com')
+
+# Seconds a checkout holds its stock before release_expired_reservations returns it.
+STOCK_RESERVATION_TTL = config('STOCK_RESERVATION_TTL', default=15 * 60, cast=int)
+
+# Completed orders younger than this many seconds wait for the next
+# refresh_sales_rollups run, so late-committing transactions are not skipped.
+ANALYTICS_ROLLUP_LAG = config('ANALYTICS_ROLLUP_LAG', default=5 * 60, cast=int)
 
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
@@ -146,3 +247,8 @@ if 'REDIS_URL' in os.environ:
         }
     }
 
+# Where open carts live: 'database' (Order/OrderItem rows), 'redis' (hashes on
+# the CACHES connection, written back at checkout or by flush_carts) or
+# 'locmem' (an in-process stand-in for 'redis').
+CART_STORE = config('CART_STORE', default='database')
+
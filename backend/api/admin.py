@@ -1,10 +1,135 @@
+"""
+Admin registrations.
+
+The order-side tables grow to millions of rows, so their changelists join
+every relation that list_display renders (list_select_related), edit
+foreign keys through raw-id or autocomplete widgets instead of <select>s
+holding every user or product, only filter on indexed columns, and page
+with EstimatedCountPaginator rather than a COUNT(*) over the whole table.
+
+Line items edited here bypass Order.add_item and friends, so every admin
+path that changes them rebuilds the affected orders' stored totals, which
+also moves updated_at and with it the cart ETag.
+"""
+import json
+
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
 from api.models import User,Product, Order, OrderItem, ShippingAddress, WishlistItem, Banner
-# Register your models here.
-admin.site.register(User)
-admin.site.register(Product)
-admin.site.register(Order)
-admin.site.register(OrderItem)
-admin.site.register(ShippingAddress)
-admin.site.register(WishlistItem)
-admin.site.register(Banner)
\ No newline at end of file
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    On Postgres, reports the planner's row estimate instead of running
+    COUNT(*) once that estimate passes estimate_threshold. Smaller results,
+    and other databases, are counted exactly.
+    """
+    estimate_threshold = 100_000
+
+    @cached_property
+    def count(self):
+        estimate = self.estimated_count()
+        if estimate is not None and estimate > self.estimate_threshold:
+            return estimate
+        return super().count
+
+    def estimated_count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet) or connections[queryset.db].vendor != 'postgresql':
+            return None
+        try:
+            plan = json.loads(queryset.order_by().explain(format='json'))
+        except DatabaseError:
+            return None
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+def recalculate_orders(order_ids):
+    for order in Order.objects.filter(pk__in=[pk for pk in order_ids if pk is not None]):
+        order.recalculate_totals()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Skips the second, unfiltered COUNT(*) behind "N total" in the filter bar.
+    show_full_result_count = False
+    ordering = ('-id',)
+
+
+@admin.register(User)
+class UserAdmin(BaseUserAdmin):
+    fieldsets = BaseUserAdmin.fieldsets + (('Contact', {'fields': ('phone',)}),)
+
+
+@admin.register(Product)
+class ProductAdmin(admin.ModelAdmin):
+    list_display = ('id', 'sku', 'name', 'price', 'digital', 'updated_at')
+    list_filter = ('digital',)
+    search_fields = ('name', '=sku')
+    readonly_fields = ('image_url', 'thumbnail_url', 'image_url_2x', 'updated_at')
+    ordering = ('-id',)
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    raw_id_fields = ('product',)
+    extra = 0
+
+
+@admin.register(Order)
+class OrderAdmin(LargeTableAdmin):
+    list_display = ('id', 'customer', 'completed', 'total', 'item_count', 'date_ordered', 'completed_at')
+    list_select_related = ('customer',)
+    list_filter = ('completed',)
+    search_fields = ('=razorpay_order_id', '=customer__username')
+    autocomplete_fields = ('customer',)
+    readonly_fields = ('total', 'item_count', 'requires_shipping', 'updated_at', 'completed_at')
+    inlines = [OrderItemInline]
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        recalculate_orders([form.instance.pk])
+
+
+@admin.register(OrderItem)
+class OrderItemAdmin(LargeTableAdmin):
+    list_display = ('id', 'order_id', 'product', 'quantity', 'date_added')
+    list_select_related = ('product',)
+    raw_id_fields = ('order', 'product')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # An item moved to another order changes both of them.
+        recalculate_orders({obj.order_id, form.initial.get('order')})
+
+    def delete_model(self, request, obj):
+        order_id = obj.order_id
+        super().delete_model(request, obj)
+        recalculate_orders([order_id])
+
+    def delete_queryset(self, request, queryset):
+        order_ids = set(queryset.values_list('order_id', flat=True))
+        super().delete_queryset(request, queryset)
+        recalculate_orders(order_ids)
+
+
+@admin.register(ShippingAddress)
+class ShippingAddressAdmin(LargeTableAdmin):
+    list_display = ('id', 'order_id', 'customer', 'city', 'state', 'zipcode', 'date_added')
+    list_select_related = ('customer',)
+    raw_id_fields = ('customer', 'order')
+
+
+@admin.register(WishlistItem)
+class WishlistItemAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'product', 'added_at')
+    list_select_related = ('user', 'product')
+    autocomplete_fields = ('user', 'product')
+
+
+admin.site.register(Banner)
@@ -0,0 +1,173 @@
+"""
+Sales rollups.
+
+Revenue, units and order counts used to be computed by scanning OrderItem
+joined to Order and Product. DailySales and DailyProductSales hold those
+sums per day instead, so the /api/analytics/ endpoints read a few hundred
+small rows whatever the order volume.
+
+refresh_rollups folds completed orders in (completed_at, id) order and
+remembers the last one in SalesRollupState, so each run only reads orders
+completed since the previous one. Orders younger than
+ANALYTICS_ROLLUP_LAG are left for the next run: completed_at is stamped
+inside the completing transaction, and one that commits late must not land
+behind the watermark. Product revenue is recorded at the price of the day
+the order is rolled up.
+
+check_rollups recomputes what the rollups cover from the transactional
+tables and reports any difference; rebuild_rollups starts over.
+"""
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from api.models import DailyProductSales, DailySales, Order, OrderItem, SalesRollupState
+
+DAY_FIELDS = ('orders', 'revenue', 'units')
+PRODUCT_FIELDS = ('units', 'revenue')
+
+
+def daily_totals(orders):
+    """{day: {'orders', 'revenue', 'units'}} for a queryset of completed orders."""
+    rows = (
+        orders.annotate(day=TruncDate('completed_at'))
+        .values('day')
+        .annotate(orders=Count('id'), revenue=Sum('total'), units=Sum('item_count'))
+        .order_by()
+    )
+    return {row['day']: {field: row[field] for field in DAY_FIELDS} for row in rows}
+
+
+def product_totals(orders):
+    """{(day, product_id): {'units', 'revenue'}} for the line items of orders."""
+    rows = (
+        OrderItem.objects.filter(order__in=orders, product__isnull=False)
+        .annotate(day=TruncDate('order__completed_at'))
+        .values('day', 'product_id')
+        .annotate(
+            units=Sum('quantity'),
+            revenue=Sum(F('quantity') * F('product__price'), output_field=DecimalField(max_digits=14, decimal_places=2)),
+        )
+        .order_by()
+    )
+    return {(row['day'], row['product_id']): {field: row[field] for field in PRODUCT_FIELDS} for row in rows}
+
+
+def _merge(model, keys, totals):
+    """Add totals ({key tuple: {field: amount}}) onto model's rows, creating missing ones."""
+    if not totals:
+        return
+    candidates = model.objects.filter(**{f'{name}__in': {key[i] for key in totals} for i, name in enumerate(keys)})
+    existing = {tuple(getattr(row, name) for name in keys): row for row in candidates}
+    fields = list(next(iter(totals.values())))
+    changed, created = [], []
+    for key, amounts in totals.items():
+        row = existing.get(key)
+        if row is None:
+            created.append(model(**dict(zip(keys, key)), **amounts))
+            continue
+        for field, amount in amounts.items():
+            setattr(row, field, getattr(row, field) + amount)
+        changed.append(row)
+    model.objects.bulk_create(created)
+    model.objects.bulk_update(changed, fields)
+
+
+def _locked_state():
+    SalesRollupState.objects.get_or_create(pk=1)
+    return SalesRollupState.objects.select_for_update().get(pk=1)
+
+
+def _after(state):
+    if state.last_completed_at is None:
+        return Q()
+    return Q(completed_at__gt=state.last_completed_at) | Q(
+        completed_at=state.last_completed_at, id__gt=state.last_order_id
+    )
+
+
+def _up_to(state):
+    if state.last_completed_at is None:
+        return Q(pk__in=[])
+    return Q(completed_at__lt=state.last_completed_at) | Q(
+        completed_at=state.last_completed_at, id__lte=state.last_order_id
+    )
+
+
+def refresh_rollups(batch_size=1000):
+    """Fold the next batch_size newly completed orders into the rollups; returns how many."""
+    cutoff = timezone.now() - timedelta(seconds=settings.ANALYTICS_ROLLUP_LAG)
+    with transaction.atomic():
+        state = _locked_state()
+        batch = list(
+            Order.objects.filter(_after(state), completed=True, completed_at__lte=cutoff)
+            .order_by('completed_at', 'id')
+            .values_list('id', 'completed_at')[:batch_size]
+        )
+        if not batch:
+            return 0
+        orders = Order.objects.filter(id__in=[order_id for order_id, _ in batch])
+        _merge(DailySales, ('day',), {(day,): amounts for day, amounts in daily_totals(orders).items()})
+        _merge(DailyProductSales, ('day', 'product_id'), product_totals(orders))
+        state.last_order_id, state.last_completed_at = batch[-1]
+        state.save()
+    return len(batch)
+
+
+def rebuild_rollups(batch_size=1000):
+    """Drop the rollups and fold every completed order in again; returns how many."""
+    with transaction.atomic():
+        state = _locked_state()
+        DailySales.objects.all().delete()
+        DailyProductSales.objects.all().delete()
+        state.last_completed_at, state.last_order_id = None, 0
+        state.save()
+    total = 0
+    while True:
+        folded = refresh_rollups(batch_size)
+        total += folded
+        if folded < batch_size:
+            return total
+
+
+def check_rollups():
+    """
+    Recompute the days and products the rollups cover and return the rows
+    that differ, as dicts with day, product_id (None for day rows),
+    expected and actual. Product revenue is not compared, since the
+    recompute can only see today's prices.
+    """
+    state = SalesRollupState.objects.filter(pk=1).first() or SalesRollupState()
+    covered = Order.objects.filter(_up_to(state), completed=True)
+    mismatches = []
+
+    expected = daily_totals(covered)
+    actual = {row.day: {field: getattr(row, field) for field in DAY_FIELDS} for row in DailySales.objects.all()}
+    for day in sorted(expected.keys() | actual.keys()):
+        if expected.get(day) != actual.get(day):
+            mismatches.append({'day': day, 'product_id': None, 'expected': expected.get(day), 'actual': actual.get(day)})
+
+    expected = {key: amounts['units'] for key, amounts in product_totals(covered).items()}
+    actual = {(row['day'], row['product_id']): row['units'] for row in DailyProductSales.objects.values('day', 'product_id', 'units')}
+    for key in sorted(expected.keys() | actual.keys()):
+        if expected.get(key) != actual.get(key):
+            mismatches.append({'day': key[0], 'product_id': key[1], 'expected': expected.get(key), 'actual': actual.get(key)})
+    return mismatches
+
+
+def parse_range(params, default_days=30):
+    """The inclusive (start, end) days asked for by ?start=&end= (ISO dates); ValueError if malformed."""
+    end = date.fromisoformat(params['end']) if params.get('end') else timezone.localdate()
+    start = date.fromisoformat(params['start']) if params.get('start') else end - timedelta(days=default_days - 1)
+    if start > end:
+        raise ValueError('start must not be after end')
+    return start, end
+
+
+def rollups_as_of():
+    state = SalesRollupState.objects.filter(pk=1).first()
+    return state.last_completed_at if state else None
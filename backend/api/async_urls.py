@@ -0,0 +1,10 @@
+from django.urls import path
+from . import async_views
+
+urlpatterns = [
+    path('products/', async_views.product_list, name='api_product_list_async'),
+    path('products/<int:pk>/', async_views.product_detail, name='api_product_detail_async'),
+    path('cart/', async_views.cart_detail, name='api_cart_detail_async'),
+    path('wishlist/', async_views.wishlist_list, name='get-wishlist-async'),
+    path('payment/start/', async_views.start_payment, name='start-payment-async'),
+]
@@ -0,0 +1,263 @@
+"""
+Async versions of the hot read endpoints: product list and detail, cart
+and wishlist, plus start_payment, whose Razorpay call can take seconds and
+would otherwise hold a whole sync worker.
+
+DRF views are sync only, so these are plain Django async views that use
+the async ORM (aget, async for) and AsyncJWTAuthentication end to end.
+They return the same JSON, ETags and cursor links as their counterparts in
+api.views, which stay in place for other writes and for WSGI deployments.
+Ecommerce.asgi_urls routes these paths here ahead of the sync ones; see
+ASYNC_READ_VIEWS in settings.
+"""
+import json
+from base64 import b64decode, b64encode
+from functools import wraps
+from urllib.parse import parse_qs, urlencode
+
+from asgiref.sync import sync_to_async
+from django.db.models import aprefetch_related_objects
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST, require_safe
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.request import Request
+from rest_framework.utils.urls import replace_query_param
+
+from api.authentication import AsyncJWTAuthentication, ClaimsJWTAuthentication
+from api.cache import (
+    async_versioned_cache, http_not_modified, is_not_modified, json_response, object_etag, set_validators,
+)
+from api.cart_store import get_cart_store
+from api.checkout import payment_details, receipt_for, record_payment_start, reserve_cart
+from api.filters import ProductFilterBackend, ProductSearchFilter
+from api.inventory import OutOfStock, release_order_stock
+from api.models import Order, Product, WishlistItem, order_detail_prefetches
+from api.payments import GatewayUnavailable, get_async_payment_gateway
+from api.pagination import ProductCursorPagination, WishlistCursorPagination
+from api.routers import aread_primary_if_pinned, replica_reads
+from api.serializers import CustomerProductSerializer, OrderSerializer, ProductSerializer, WishlistItemSerializer
+
+authenticator = AsyncJWTAuthentication()
+# Token claims only, no database: enough to personalize public product reads.
+claims_authenticator = ClaimsJWTAuthentication()
+
+
+def error_response(exc):
+    response = json_response(exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}, status=exc.status_code)
+    if exc.status_code == 401:
+        response['WWW-Authenticate'] = authenticator.authenticate_header(None)
+    return response
+
+
+def login_required(view):
+    """Authenticate with a JWT before the view runs; 401 like IsAuthenticated otherwise."""
+    @wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        try:
+            result = await authenticator.aauthenticate(request)
+        except APIException as exc:
+            return error_response(exc)
+        if result is None:
+            response = json_response({'detail': 'Authentication credentials were not provided.'}, status=401)
+            response['WWW-Authenticate'] = authenticator.authenticate_header(None)
+            return response
+        request.user = result[0]
+        return await view(request, *args, **kwargs)
+    return wrapped
+
+
+class ProductListFilters:
+    """The filtering half of api.views.ProductListView."""
+    filter_backends = [ProductSearchFilter, ProductFilterBackend]
+
+    def filter_queryset(self, request, queryset):
+        drf_request = Request(request)
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(drf_request, queryset, self)
+        return queryset
+
+
+def _page_size(request, pagination):
+    try:
+        size = int(request.GET[pagination.page_size_query_param])
+    except (KeyError, ValueError):
+        return pagination.page_size
+    if size <= 0:
+        return pagination.page_size
+    return min(size, pagination.max_page_size)
+
+
+def _decode_cursor(request, pagination):
+    """Read a cursor in the format CursorPagination writes: base64 of 'p=<position>[&r=1]'."""
+    encoded = request.GET.get(pagination.cursor_query_param)
+    if encoded is None:
+        return None, False
+    try:
+        tokens = parse_qs(b64decode(encoded.encode('ascii')).decode('ascii'), keep_blank_values=True)
+        position = tokens.get('p', [None])[0]
+        return (int(position) if position is not None else None), tokens.get('r', ['0'])[0] == '1'
+    except (TypeError, ValueError):
+        raise NotFound('Invalid cursor')
+
+
+def _cursor_link(request, pagination, position, reverse):
+    tokens = {'r': '1'} if reverse else {}
+    tokens['p'] = position
+    encoded = b64encode(urlencode(tokens).encode('ascii')).decode('ascii')
+    return replace_query_param(request.build_absolute_uri(), pagination.cursor_query_param, encoded)
+
+
+async def paginate(request, queryset, pagination):
+    """
+    One page of queryset in the shape pagination (a CursorPagination ordered
+    by a single unique integer field, such as 'id' or '-id') would produce,
+    as (objects, next_link, previous_link).
+    """
+    position, reverse = _decode_cursor(request, pagination)
+    size = _page_size(request, pagination)
+    ordering = pagination().get_ordering(request, queryset, None)[0]
+    field = ordering.lstrip('-')
+    descending = ordering.startswith('-') != reverse
+    if position is not None:
+        queryset = queryset.filter(**{f'{field}__lt' if descending else f'{field}__gt': position})
+    queryset = queryset.order_by(f'-{field}' if descending else field)
+
+    page = [obj async for obj in queryset[:size + 1]]
+    has_more = len(page) > size
+    page = page[:size]
+    if reverse:
+        page.reverse()
+        has_next, has_previous = position is not None, has_more
+    else:
+        has_next, has_previous = has_more, position is not None
+    return (
+        page,
+        _cursor_link(request, pagination, getattr(page[-1], field), False) if has_next and page else None,
+        _cursor_link(request, pagination, getattr(page[0], field), True) if has_previous and page else None,
+    )
+
+
+async def customer_products(request, queryset):
+    """
+    The async half of api.views.CustomerProductStateMixin: returns the
+    queryset and serializer kwargs for this request, annotated with the
+    customer's wishlist and cart state when it carries a token.
+    """
+    result = claims_authenticator.authenticate(request)
+    if result is None:
+        return queryset, ProductSerializer, {}
+    user = result[0]
+    await aread_primary_if_pinned(user.id)
+    store = get_cart_store()
+    queryset = queryset.with_customer_state(user.id, cart=not store.write_behind)
+    context = {}
+    if store.write_behind:
+        context['cart_quantities'] = await sync_to_async(store.quantities)(user)
+    return queryset, CustomerProductSerializer, {'context': context}
+
+
+@require_safe
+@replica_reads
+@async_versioned_cache('products', uncached_params=('search',), personalized=True)
+async def product_list(request):
+    try:
+        # The search backend may read the database or the cache to rank matches.
+        queryset = await sync_to_async(ProductListFilters().filter_queryset)(request, Product.objects.all())
+        queryset, serializer_class, kwargs = await customer_products(request, queryset)
+        products, next_link, previous_link = await paginate(request, queryset, ProductCursorPagination)
+    except APIException as exc:
+        return error_response(exc)
+    return json_response({
+        'next': next_link,
+        'previous': previous_link,
+        'results': serializer_class(products, many=True, **kwargs).data,
+    })
+
+
+@require_safe
+@replica_reads
+async def product_detail(request, pk):
+    try:
+        queryset, serializer_class, kwargs = await customer_products(request, Product.objects.all())
+        product = await queryset.aget(pk=pk)
+    except APIException as exc:
+        return error_response(exc)
+    except Product.DoesNotExist:
+        return json_response({'detail': 'No Product matches the given query.'}, status=404)
+    if serializer_class is CustomerProductSerializer:
+        response = json_response(serializer_class(product, **kwargs).data)
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ['Authorization'])
+        return response
+    etag = object_etag('product', product)
+    if is_not_modified(request, etag, product.updated_at):
+        return http_not_modified(etag)
+    response = json_response(ProductSerializer(product).data)
+    patch_vary_headers(response, ['Authorization'])
+    return set_validators(response, etag, product.updated_at)
+
+
+@require_safe
+@login_required
+async def cart_detail(request):
+    user = request.user
+    store = get_cart_store()
+    if store.write_behind:
+        return json_response(await sync_to_async(store.cart_data)(user))
+
+    order, _ = await Order.objects.aget_or_create(customer=user, completed=False)
+    # Same row as request.user; saves the join the serializer would need.
+    order.customer = user
+    etag = object_etag('cart', order)
+    if is_not_modified(request, etag):
+        return http_not_modified(etag)
+    await aprefetch_related_objects([order], *order_detail_prefetches())
+    response = json_response(OrderSerializer(order).data)
+    return set_validators(response, etag, private=True)
+
+
+@require_safe
+@login_required
+async def wishlist_list(request):
+    queryset = WishlistItem.objects.filter(user=request.user).select_related('product')
+    try:
+        items, next_link, previous_link = await paginate(request, queryset, WishlistCursorPagination)
+    except APIException as exc:
+        return error_response(exc)
+    return json_response({
+        'next': next_link,
+        'previous': previous_link,
+        'results': WishlistItemSerializer(items, many=True).data,
+    })
+
+
+# Bearer tokens only, like the DRF views, so there is no session for CSRF to protect.
+@csrf_exempt
+@require_POST
+@login_required
+async def start_payment(request):
+    user = request.user
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return json_response({"error": "Request body must be JSON."}, status=400)
+
+    try:
+        order = await sync_to_async(reserve_cart)(user)
+    except Order.DoesNotExist:
+        return json_response({"error": "No active cart found."}, status=404)
+    except OutOfStock as e:
+        return json_response({"error": "Some items are out of stock.", "product_ids": e.product_ids}, status=409)
+
+    try:
+        razorpay_order = await get_async_payment_gateway().create_order(order.amount_in_paise, "INR", receipt_for(order))
+        await sync_to_async(record_payment_start)(order, razorpay_order, data.get('shipping_address') if isinstance(data, dict) else None)
+    except GatewayUnavailable as e:
+        await sync_to_async(release_order_stock)(order)
+        return json_response({"error": "Payment gateway is unavailable, please retry shortly.", "details": str(e)}, status=503)
+    except Exception as e:
+        await sync_to_async(release_order_stock)(order)
+        return json_response({"error": str(e)}, status=500)
+    # The cached request user defers email and phone, which load from the database.
+    return json_response(await sync_to_async(payment_details)(user, order))
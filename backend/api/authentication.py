@@ -0,0 +1,188 @@
+"""
+JWT authentication without a database round trip per request.
+
+simplejwt's JWTAuthentication verifies the token signature and then loads
+the User row on every request. CachedJWTAuthentication (the default class)
+keeps both results:
+
+* verified tokens sit in a per-process LRU until they expire, so a client
+  reusing its access token skips the HMAC check;
+* a snapshot of each User (the USER_CACHE_FIELDS plus a digest of the
+  password hash for the revoke check, never the hash itself) sits in a
+  short-TTL per-process LRU backed by the shared Django cache (Redis in
+  production). Requests get a User built from the snapshot whose other
+  fields load on first access. api.signals drops both entries when a user
+  is saved or deleted; other processes catch up within AUTH_USER_LOCAL_TTL.
+
+ClaimsJWTAuthentication goes further for endpoints that only need
+request.user.id: it builds a TokenUser from the token claims and never
+touches the User table. Such views must filter on user_id rather than
+passing request.user to the ORM, and a deactivated user keeps access until
+their access token expires, so it is only for read endpoints.
+
+AsyncJWTAuthentication serves the async views in api.async_views with the
+same caches.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class LRUCache:
+    """A small thread-safe LRU whose entries expire after a TTL."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+USER_CACHE_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+
+verified_tokens = LRUCache(settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL)
+local_users = LRUCache(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_LOCAL_TTL)
+
+
+def _user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def user_snapshot(user):
+    snapshot = {field: getattr(user, field) for field in USER_CACHE_FIELDS}
+    snapshot['password_digest'] = get_md5_hash_password(user.password)
+    return snapshot
+
+
+def user_from_snapshot(model, snapshot):
+    """A User holding the snapshot's fields; the rest are deferred and load on access."""
+    fields = [field.attname for field in model._meta.concrete_fields if field.attname in snapshot]
+    return model.from_db('default', fields, [snapshot[field] for field in fields])
+
+
+def invalidate_user(user_id):
+    local_users.pop(user_id)
+    cache.delete(_user_key(user_id))
+
+
+def invalidate_user_on_commit(user_id):
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+
+    def get_validated_token(self, raw_token):
+        token = verified_tokens.get(raw_token)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            verified_tokens.set(raw_token, token, ttl=token['exp'] - time.time())
+        return token
+
+    def _user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def _check_user(self, snapshot, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not snapshot['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != snapshot['password_digest']:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        # A fresh instance per request, so relation caches do not leak between them.
+        return user_from_snapshot(self.user_model, snapshot)
+
+    def get_user(self, validated_token):
+        user_id = self._user_id(validated_token)
+        snapshot = local_users.get(user_id)
+        if snapshot is None:
+            snapshot = cache.get(_user_key(user_id))
+            if snapshot is None:
+                try:
+                    user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+                except self.user_model.DoesNotExist:
+                    raise AuthenticationFailed(_("User not found"), code="user_not_found")
+                snapshot = user_snapshot(user)
+                cache.set(_user_key(user_id), snapshot, timeout=settings.AUTH_USER_CACHE_TTL)
+            local_users.set(user_id, snapshot)
+        return self._check_user(snapshot, validated_token)
+
+
+class ClaimsJWTAuthentication(CachedJWTAuthentication):
+    """For endpoints that only need request.user.id: no User lookup at all."""
+
+    def get_user(self, validated_token):
+        self._user_id(validated_token)
+        return TokenUser(validated_token)
+
+
+class AsyncJWTAuthentication(CachedJWTAuthentication):
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self._user_id(validated_token)
+        snapshot = local_users.get(user_id)
+        if snapshot is None:
+            snapshot = await cache.aget(_user_key(user_id))
+            if snapshot is None:
+                try:
+                    user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+                except self.user_model.DoesNotExist:
+                    raise AuthenticationFailed(_("User not found"), code="user_not_found")
+                snapshot = user_snapshot(user)
+                await cache.aset(_user_key(user_id), snapshot, timeout=settings.AUTH_USER_CACHE_TTL)
+            local_users.set(user_id, snapshot)
+        return self._check_user(snapshot, validated_token)
@@ -0,0 +1,261 @@
+"""
+Versioned response caching for public read endpoints.
+
+Each cached resource ("products", "banner") has a generation counter in
+the cache. Keys embed the current generation, so a post_save/post_delete
+signal only has to bump the counter for every cached page of that
+resource to become unreachable; the old entries simply expire. The same
+generation feeds the ETag, which lets a matching If-None-Match be
+answered with a 304 before the cache is even read. When a key is
+missing, only the worker holding a short lock rebuilds it while the
+others wait briefly for the result.
+
+Works with any Django cache backend (django_redis or local memory).
+
+conditional_get/set_validators cover per-object endpoints, whose ETag and
+Last-Modified come straight from the row's updated_at. The cart sends only
+the ETag, since it can change more than once within a second.
+
+The async_* variants serve the plain Django async views in
+api.async_views. They share keys and ETags with the sync decorator, so a
+page cached by one worker type is served by the other.
+"""
+import asyncio
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.routers import primary_reads
+
+_MISSING = object()
+
+
+def _version_key(resource):
+    return f'api:version:{resource}'
+
+
+def get_version(resource):
+    version = cache.get(_version_key(resource))
+    if version is None:
+        cache.add(_version_key(resource), 1, timeout=None)
+        version = cache.get(_version_key(resource), 1)
+    return version
+
+
+async def aget_version(resource):
+    version = await cache.aget(_version_key(resource))
+    if version is None:
+        await cache.aadd(_version_key(resource), 1, timeout=None)
+        version = await cache.aget(_version_key(resource), 1)
+    return version
+
+
+def bump_version(resource):
+    try:
+        return cache.incr(_version_key(resource))
+    except ValueError:
+        cache.add(_version_key(resource), 2, timeout=None)
+        return cache.get(_version_key(resource))
+
+
+def invalidate_on_commit(resource):
+    """Bump the generation once the current transaction commits."""
+    transaction.on_commit(lambda: bump_version(resource))
+
+
+def _request_digest(request):
+    query = sorted((key, sorted(values)) for key, values in request.GET.lists())
+    raw = f'{request.get_host()}|{request.path}|{query}'
+    return hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return header.strip() == '*' or etag in [tag.strip() for tag in header.split(',')]
+
+
+def not_modified(etag):
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    response['ETag'] = etag
+    return response
+
+
+def object_etag(prefix, obj):
+    return f'"{prefix}-{obj.pk}-{obj.updated_at.timestamp():.6f}"'
+
+
+def http_not_modified(etag):
+    response = HttpResponseNotModified()
+    response['ETag'] = etag
+    return response
+
+
+def json_response(data, status=200):
+    """A JsonResponse that keeps its data around for async_versioned_cache."""
+    response = JsonResponse(data, status=status, safe=False)
+    response.data = data
+    return response
+
+
+def is_not_modified(request, etag, last_modified=None):
+    if 'HTTP_IF_NONE_MATCH' in request.META:
+        return etag_matches(request, etag)
+    if last_modified is None:
+        return False
+    since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return since is not None and int(last_modified.timestamp()) <= since
+
+
+def conditional_get(request, etag, last_modified=None):
+    """Return a 304 response if the client's validators are still current, else None."""
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag)
+    return None
+
+
+def set_validators(response, etag, last_modified=None, private=False):
+    """
+    Without last_modified only the ETag is sent. Resources that can change
+    several times within a second, like the cart, use that: Last-Modified
+    has one-second resolution and would let If-Modified-Since hide a change.
+    """
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    response['Cache-Control'] = 'private, no-cache' if private else 'no-cache'
+    return response
+
+
+def _build_once(key, build, timeout, lock_timeout, wait):
+    """Rebuild a missing key in a single worker; the rest wait for its result."""
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, timeout=lock_timeout):
+        try:
+            # Shared by everyone until the next bump: build it from the primary.
+            with primary_reads():
+                response = build()
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data, timeout=timeout)
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        data = cache.get(key, _MISSING)
+        if data is not _MISSING:
+            return Response(data)
+    return build()
+
+
+async def _abuild_once(key, build, timeout, lock_timeout, wait):
+    lock_key = f'{key}:lock'
+    if await cache.aadd(lock_key, 1, timeout=lock_timeout):
+        try:
+            with primary_reads():
+                response = await build()
+            if response.status_code == status.HTTP_200_OK:
+                await cache.aset(key, response.data, timeout=timeout)
+            return response
+        finally:
+            await cache.adelete(lock_key)
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+        data = await cache.aget(key, _MISSING)
+        if data is not _MISSING:
+            return json_response(data)
+    return await build()
+
+
+def _skips_cache(request, uncached_params, personalized):
+    return (
+        request.method not in ('GET', 'HEAD')
+        or any(p in request.GET for p in uncached_params)
+        or (personalized and 'HTTP_AUTHORIZATION' in request.META)
+    )
+
+
+def versioned_cache(resource, timeout=60 * 60, uncached_params=(), lock_timeout=10, wait=2.0, personalized=False):
+    """
+    Cache a read view's response data under the resource's generation.
+
+    Requests carrying any of uncached_params skip the cache entirely, which
+    keeps free-text parameters from filling it with one-off entries. With
+    personalized=True, so do requests with credentials: the view answers
+    those per customer, and every response varies on Authorization.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            response = cached_view(request, *args, **kwargs)
+            if personalized:
+                patch_vary_headers(response, ['Authorization'])
+            return response
+
+        def cached_view(request, *args, **kwargs):
+            if _skips_cache(request, uncached_params, personalized):
+                return view(request, *args, **kwargs)
+
+            version = get_version(resource)
+            digest = _request_digest(request)
+            etag = f'"{resource}-{version}-{digest[:16]}"'
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+            key = f'api:{resource}:v{version}:{digest}'
+            data = cache.get(key, _MISSING)
+            if data is _MISSING:
+                response = _build_once(key, lambda: view(request, *args, **kwargs), timeout, lock_timeout, wait)
+            else:
+                response = Response(data)
+            if response.status_code == status.HTTP_200_OK:
+                response['ETag'] = etag
+                response['Cache-Control'] = 'no-cache'
+            return response
+        return wrapped
+    return decorator
+
+
+def async_versioned_cache(resource, timeout=60 * 60, uncached_params=(), lock_timeout=10, wait=2.0, personalized=False):
+    """versioned_cache for async views that return json_response()."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            response = await cached_view(request, *args, **kwargs)
+            if personalized:
+                patch_vary_headers(response, ['Authorization'])
+            return response
+
+        async def cached_view(request, *args, **kwargs):
+            if _skips_cache(request, uncached_params, personalized):
+                return await view(request, *args, **kwargs)
+
+            version = await aget_version(resource)
+            digest = _request_digest(request)
+            etag = f'"{resource}-{version}-{digest[:16]}"'
+            if etag_matches(request, etag):
+                return http_not_modified(etag)
+
+            key = f'api:{resource}:v{version}:{digest}'
+            data = await cache.aget(key, _MISSING)
+            if data is _MISSING:
+                response = await _abuild_once(key, lambda: view(request, *args, **kwargs), timeout, lock_timeout, wait)
+            else:
+                response = json_response(data)
+            if response.status_code == status.HTTP_200_OK:
+                response['ETag'] = etag
+                response['Cache-Control'] = 'no-cache'
+            return response
+        return wrapped
+    return decorator
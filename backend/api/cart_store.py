@@ -0,0 +1,280 @@
+"""
+Where open carts live between checkouts.
+
+DatabaseCartStore (the default) reads and writes Order/OrderItem rows
+directly. RedisCartStore keeps each open cart in a Redis hash of
+product id -> quantity and only writes it back to Order/OrderItem when the
+cart is persisted: at start_payment/ProcessOrderView, or when the
+flush_carts command drains the set of carts changed since the last flush.
+
+Selected by settings.CART_STORE: 'database', 'redis' (the django_redis
+connection behind CACHES['default']) or 'locmem' (an in-process stand-in
+for tests and offline development).
+"""
+import threading
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+
+from api.models import Order, OrderItem, Product
+from api.serializers import OrderSerializer, ProductSerializer, ShippingAddressSerializer
+
+
+class DatabaseCartStore:
+    write_behind = False
+
+    def _order(self, user):
+        return Order.objects.get_or_create(customer=user, completed=False)[0]
+
+    def add_item(self, user, product):
+        self._order(user).add_item(product)
+
+    def remove_item(self, user, product):
+        self._order(user).remove_item(product)
+
+    def set_item_quantity(self, user, product, quantity):
+        self._order(user).set_item_quantity(product, quantity)
+
+    def apply_operations(self, user, operations):
+        self._order(user).apply_operations(operations)
+
+    def cart_data(self, user):
+        order = Order.objects.with_details().get(customer=user, completed=False)
+        return OrderSerializer(order).data
+
+    def persist(self, user):
+        pass
+
+    def clear(self, user):
+        pass
+
+    def flush(self):
+        return 0
+
+
+class LocMemHashClient:
+    """The handful of Redis hash and set commands RedisCartStore uses, kept in process memory."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hashes = defaultdict(dict)
+        self._sets = defaultdict(set)
+
+    def hincrby(self, key, field, amount=1):
+        with self._lock:
+            value = int(self._hashes[key].get(str(field), 0)) + amount
+            self._hashes[key][str(field)] = value
+            return value
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        with self._lock:
+            if field is not None:
+                self._hashes[key][str(field)] = value
+            for name, item in (mapping or {}).items():
+                self._hashes[key][str(name)] = item
+
+    def hsetnx(self, key, field, value):
+        with self._lock:
+            if str(field) in self._hashes[key]:
+                return 0
+            self._hashes[key][str(field)] = value
+            return 1
+
+    def hdel(self, key, *fields):
+        with self._lock:
+            for field in fields:
+                self._hashes[key].pop(str(field), None)
+
+    def hgetall(self, key):
+        with self._lock:
+            return dict(self._hashes.get(key, {}))
+
+    def exists(self, key):
+        with self._lock:
+            return int(bool(self._hashes.get(key)))
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._hashes.pop(key, None)
+                self._sets.pop(key, None)
+
+    def expire(self, key, seconds):
+        pass
+
+    def sadd(self, key, *members):
+        with self._lock:
+            self._sets[key].update(str(member) for member in members)
+
+    def srem(self, key, *members):
+        with self._lock:
+            self._sets[key].difference_update(str(member) for member in members)
+
+    def smembers(self, key):
+        with self._lock:
+            return set(self._sets.get(key, ()))
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+class RedisCartStore:
+    write_behind = True
+    loaded_field = '_loaded'
+    dirty_key = 'cart:dirty'
+    ttl = 60 * 60 * 24 * 30
+
+    def __init__(self, client):
+        self.client = client
+
+    def _key(self, user):
+        return f'cart:{user.pk}'
+
+    def _lines(self, user):
+        """Read the cart hash, hydrating it from the open order on first touch."""
+        key = self._key(user)
+        raw = self.client.hgetall(key)
+        if not raw:
+            lines = dict(
+                OrderItem.objects.filter(order__customer_id=user.pk, order__completed=False, product__isnull=False)
+                .values_list('product_id', 'quantity')
+            )
+            # HSETNX, so a concurrent request that hydrated and changed a line
+            # in the meantime keeps its value.
+            for field, value in {self.loaded_field: 1, **lines}.items():
+                self.client.hsetnx(key, field, value)
+            self.client.expire(key, self.ttl)
+            raw = self.client.hgetall(key)
+        return {
+            int(_text(field)): int(_text(value))
+            for field, value in raw.items()
+            if _text(field) != self.loaded_field and int(_text(value)) > 0
+        }
+
+    def _touch(self, user):
+        self.client.expire(self._key(user), self.ttl)
+        self.client.sadd(self.dirty_key, user.pk)
+
+    def add_item(self, user, product, quantity=1):
+        self._lines(user)
+        self.client.hincrby(self._key(user), product.pk, quantity)
+        self._touch(user)
+
+    def remove_item(self, user, product):
+        lines = self._lines(user)
+        if product.pk not in lines:
+            return
+        if self.client.hincrby(self._key(user), product.pk, -1) <= 0:
+            self.client.hdel(self._key(user), product.pk)
+        self._touch(user)
+
+    def set_item_quantity(self, user, product, quantity):
+        self._lines(user)
+        if quantity > 0:
+            self.client.hset(self._key(user), product.pk, quantity)
+        else:
+            self.client.hdel(self._key(user), product.pk)
+        self._touch(user)
+
+    def apply_operations(self, user, operations):
+        lines = self._lines(user)
+        for operation in operations:
+            product_id = operation['productId']
+            current = lines.get(product_id, 0)
+            action = operation.get('action', 'set')
+            if action == 'add':
+                current += operation.get('quantity', 1)
+            elif action == 'remove':
+                current -= operation.get('quantity', 1)
+            else:
+                current = operation['quantity']
+            lines[product_id] = max(current, 0)
+        kept = {pk: qty for pk, qty in lines.items() if qty}
+        if kept:
+            self.client.hset(self._key(user), mapping=kept)
+        emptied = [pk for pk, qty in lines.items() if not qty]
+        if emptied:
+            self.client.hdel(self._key(user), *emptied)
+        self._touch(user)
+
+    def quantities(self, user):
+        """Product id -> quantity for the user's cart."""
+        return self._lines(user)
+
+    def cart_data(self, user):
+        """Build the same payload OrderSerializer gives an open order, from the hash."""
+        lines = self._lines(user)
+        products = Product.objects.in_bulk(lines)
+        ordered = [products[pk] for pk in sorted(lines) if pk in products]
+        serialized = ProductSerializer(ordered, many=True).data
+        items = []
+        total = Decimal('0')
+        for product, product_data in zip(ordered, serialized):
+            quantity = lines[product.pk]
+            line_total = product.price * quantity
+            total += line_total
+            items.append({'id': product.pk, 'product': product_data, 'quantity': quantity, 'get_total': line_total})
+        return {
+            'id': None,
+            'customer': str(user),
+            'date_ordered': None,
+            'completed': False,
+            'transaction_id': None,
+            'shipping': any(product.digital == False for product in ordered),
+            'get_cart_total': total,
+            'get_cart_items': sum(item['quantity'] for item in items),
+            'shipping_address': ShippingAddressSerializer(None).data,
+            'orderitems': items,
+        }
+
+    def persist(self, user):
+        """Write the cached cart back to the user's open Order."""
+        if not self.client.exists(self._key(user)):
+            # Expired: nothing left to write, and flush should stop revisiting it.
+            self.client.srem(self.dirty_key, user.pk)
+            return
+        lines = self._lines(user)
+        order = Order.objects.get_or_create(customer=user, completed=False)[0]
+        stored = OrderItem.objects.filter(order=order).values_list('product_id', flat=True)
+        operations = [{'productId': pk, 'quantity': qty} for pk, qty in lines.items()]
+        operations += [{'productId': pk, 'quantity': 0} for pk in stored if pk is not None and pk not in lines]
+        existing = set(Product.objects.filter(pk__in=[op['productId'] for op in operations]).values_list('pk', flat=True))
+        operations = [op for op in operations if op['productId'] in existing]
+        if operations:
+            order.apply_operations(operations)
+        self.client.srem(self.dirty_key, user.pk)
+
+    def clear(self, user):
+        """Forget the cached cart once its order has been completed."""
+        self.client.delete(self._key(user))
+        self.client.srem(self.dirty_key, user.pk)
+
+    def flush(self):
+        from api.models import User
+
+        user_ids = [int(_text(member)) for member in self.client.smembers(self.dirty_key)]
+        for user in User.objects.filter(pk__in=user_ids):
+            self.persist(user)
+        return len(user_ids)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_cart_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                kind = getattr(settings, 'CART_STORE', 'database')
+                if kind == 'redis':
+                    from django_redis import get_redis_connection
+                    _store = RedisCartStore(get_redis_connection('default'))
+                elif kind == 'locmem':
+                    _store = RedisCartStore(LocMemHashClient())
+                else:
+                    _store = DatabaseCartStore()
+    return _store
@@ -0,0 +1,216 @@
+"""
+Bulk catalog import, used by the import_products command.
+
+Rows are read one at a time from a CSV or JSONL file and handled in
+batches: each batch is validated, its images are uploaded on a bounded
+thread pool, and the products are upserted on sku with
+bulk_create(update_conflicts=True) in one transaction. Memory holds one
+batch whatever the file size, and a 100k-row file costs a few hundred
+statements instead of 100k saves each waiting on its own upload.
+
+bulk_create skips Product.save and its signals, so the import does their
+work itself: image URLs are built from the upload result, open carts
+holding a product whose price or digital flag changed are recalculated,
+and the products cache generation and the shared search index version are
+bumped once at the end, so every worker rebuilds its index.
+"""
+import csv
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+
+from api.cache import bump_version
+from api.images import PRODUCT_IMAGE_VARIANTS, build_image_urls, get_image_uploader
+from api.models import Order, Product
+from api.search import invalidate_search_index
+
+UPDATE_FIELDS = ['name', 'price', 'digital', 'updated_at']
+IMAGE_FIELDS = ['image', *PRODUCT_IMAGE_VARIANTS]
+MAX_PRICE = Decimal('99999.99')
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+FALSE_VALUES = {'', '0', 'false', 'no', 'n'}
+
+
+class RowError(ValueError):
+    pass
+
+
+class ImportReport:
+    max_errors = 100
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.invalid = 0
+        self.images = 0
+        self.image_failures = 0
+        self.errors = []
+
+    def error(self, line, message):
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, message))
+
+    def __str__(self):
+        return (
+            f'{self.rows} rows: {self.created} created, {self.updated} updated, '
+            f'{self.invalid} invalid, {self.images} images uploaded, {self.image_failures} image failures'
+        )
+
+
+def read_rows(path, file_format=None):
+    """Yield (line number, row) from a CSV or JSONL file; rows that are not JSON objects come back as None."""
+    if file_format is None:
+        file_format = 'jsonl' if str(path).endswith(('.jsonl', '.ndjson')) else 'csv'
+    with open(path, newline='', encoding='utf-8') as source:
+        if file_format == 'csv':
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                row = None
+            yield number, row if isinstance(row, dict) else None
+
+
+def _text(row, field, max_length, required=True):
+    value = row.get(field)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f'{field} is required')
+    if len(value) > max_length:
+        raise RowError(f'{field} is longer than {max_length} characters')
+    return value
+
+
+def validate_row(row):
+    """The cleaned sku, name, price, digital and image of one row; RowError if it cannot be imported."""
+    if row is None:
+        raise RowError('not a JSON object')
+    try:
+        price = Decimal(str(row.get('price', '')).strip())
+    except InvalidOperation:
+        raise RowError('price is not a number')
+    if not price.is_finite() or price < 0 or price > MAX_PRICE:
+        raise RowError(f'price must be between 0 and {MAX_PRICE}')
+    if price != price.quantize(Decimal('0.01')):
+        raise RowError('price has more than two decimal places')
+
+    digital = row.get('digital')
+    if not isinstance(digital, bool):
+        flag = '' if digital is None else str(digital).strip().lower()
+        if flag not in TRUE_VALUES | FALSE_VALUES:
+            raise RowError('digital must be true or false')
+        digital = flag in TRUE_VALUES
+
+    return {
+        'sku': _text(row, 'sku', 64),
+        'name': _text(row, 'name', 200),
+        'price': price.quantize(Decimal('0.01')),
+        'digital': digital,
+        'image': _text(row, 'image', 1000, required=False),
+    }
+
+
+def _upload_images(rows, uploader, executor, report):
+    """Upload the images of a batch concurrently; returns {sku: CloudinaryResource}."""
+    futures = {
+        executor.submit(uploader.upload, data['image'], f'products/{sku}'): sku
+        for sku, (line, data) in rows.items() if data['image']
+    }
+    uploaded = {}
+    for future in as_completed(futures):
+        sku = futures[future]
+        try:
+            uploaded[sku] = future.result()
+        except Exception as e:
+            report.image_failures += 1
+            report.error(rows[sku][0], f'image upload failed: {e}')
+    report.images += len(uploaded)
+    return uploaded
+
+
+def _import_batch(batch, report, dry_run, uploader, executor):
+    rows = {}
+    for line, row in batch:
+        report.rows += 1
+        try:
+            data = validate_row(row)
+        except RowError as e:
+            report.invalid += 1
+            report.error(line, str(e))
+            continue
+        # A sku repeated within a batch: the last row wins, as it would across batches.
+        rows[data['sku']] = (line, data)
+    if not rows:
+        return
+
+    existing = {
+        sku: (price, digital)
+        for sku, price, digital in Product.objects.filter(sku__in=rows).values_list('sku', 'price', 'digital')
+    }
+    report.updated += len(existing)
+    report.created += len(rows) - len(existing)
+    if dry_run:
+        return
+
+    uploaded = _upload_images(rows, uploader, executor, report)
+    plain, with_image = [], []
+    for sku, (line, data) in rows.items():
+        product = Product(sku=sku, name=data['name'], price=data['price'], digital=data['digital'])
+        image = uploaded.get(sku)
+        if image is None:
+            plain.append(product)
+            continue
+        product.image = image
+        for field, url in build_image_urls(image, PRODUCT_IMAGE_VARIANTS).items():
+            setattr(product, field, url)
+        with_image.append(product)
+
+    # What Product.save's signal would do: open carts holding a product whose
+    # price or shipping need changed get their totals rebuilt.
+    changed = [
+        sku for sku, (price, digital) in existing.items()
+        if (rows[sku][1]['price'], rows[sku][1]['digital']) != (price, digital)
+    ]
+    with transaction.atomic():
+        # Rows without a new image leave the stored one alone.
+        Product.objects.bulk_create(plain, update_conflicts=True, unique_fields=['sku'], update_fields=UPDATE_FIELDS)
+        Product.objects.bulk_create(
+            with_image, update_conflicts=True, unique_fields=['sku'], update_fields=UPDATE_FIELDS + IMAGE_FIELDS,
+        )
+        if changed:
+            for order in Order.objects.filter(completed=False, orderitem__product__sku__in=changed).distinct():
+                order.recalculate_totals()
+
+
+def import_products(rows, batch_size=1000, dry_run=False, uploader=None, upload_workers=8, progress=None):
+    """
+    Validate and upsert (line number, row) pairs as read_rows yields them.
+    progress, if given, is called with the report after every batch. With
+    dry_run nothing is uploaded or written, but the report still counts
+    what would be created and updated.
+    """
+    report = ImportReport()
+    uploader = uploader or get_image_uploader()
+    rows = iter(rows)
+    with ThreadPoolExecutor(max_workers=upload_workers) as executor:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            _import_batch(batch, report, dry_run, uploader, executor)
+            if progress is not None:
+                progress(report)
+    if not dry_run and (report.created or report.updated):
+        bump_version('products')
+        invalidate_search_index()
+    return report
@@ -0,0 +1,51 @@
+"""
+The steps of starting a Razorpay checkout, shared by the sync start_payment
+view (api.views) and its async counterpart (api.async_views) so the two
+differ only in how they wait on the gateway.
+"""
+from django.conf import settings
+
+from api.cart_store import get_cart_store
+from api.inventory import reserve_order
+from api.models import Order
+
+SHIPPING_FIELDS = ('address', 'city', 'state', 'zipcode')
+
+
+def reserve_cart(user):
+    """Hold stock for the user's open cart; raises Order.DoesNotExist or OutOfStock."""
+    get_cart_store().persist(user)
+    order = Order.objects.get(customer=user, completed=False)
+    reserve_order(order)
+    return order
+
+
+def receipt_for(order):
+    # Razorpay orders are keyed on the receipt, so retries reuse the same one.
+    return f"order_rcptid_{order.id}"
+
+
+def record_payment_start(order, razorpay_order, shipping_address=None):
+    """Remember what the customer is about to pay, and where to ship, for the callback or webhook."""
+    order.razorpay_order_id = razorpay_order['id']
+    order.payment_amount = order.amount_in_paise
+    if isinstance(shipping_address, dict):
+        order.shipping_details = {field: shipping_address.get(field) for field in SHIPPING_FIELDS}
+    order.save(update_fields=['razorpay_order_id', 'payment_amount', 'shipping_details', 'updated_at'])
+
+
+def payment_details(user, order):
+    """What the browser needs to open Razorpay's checkout for order."""
+    return {
+        "order_id": order.razorpay_order_id,
+        "razorpay_key": settings.RAZORPAY_KEY_ID,
+        "amount": order.payment_amount,
+        "currency": "INR",
+        "name": "Your E-Commerce Site",
+        "description": "Test Transaction",
+        "prefill": {
+            "name": user.username,
+            "email": user.email,
+            "contact": user.phone
+        }
+    }
@@ -0,0 +1,102 @@
+"""
+Streaming order exports, shared by /api/orders/export/ and the
+export_orders command.
+
+Orders are read with .iterator(chunk_size=...) (a server-side cursor on
+Postgres) and their items, products and shipping addresses are prefetched
+one chunk at a time, so memory holds a single chunk however many orders
+the export covers, and the query count grows with chunks, not orders.
+Output is produced order by order as CSV (one row per line item) or
+NDJSON (one object per order).
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from api.models import order_detail_prefetches
+
+DEFAULT_CHUNK_SIZE = 500
+
+CSV_COLUMNS = [
+    'order_id', 'date_ordered', 'customer', 'transaction_id', 'order_total', 'item_count',
+    'product_id', 'product_name', 'unit_price', 'quantity', 'line_total',
+    'address', 'city', 'state', 'zipcode',
+]
+
+
+class _Echo:
+    """A file-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def iterate_orders(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    return (
+        queryset.select_related('customer')
+        .prefetch_related(*order_detail_prefetches())
+        .order_by('id')
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def _address_fields(order):
+    address = order.shipping_address
+    if address is None:
+        return ['', '', '', '']
+    return [address.address, address.city, address.state, address.zipcode]
+
+
+def csv_stream(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for order in iterate_orders(queryset, chunk_size):
+        head = [
+            order.id, order.date_ordered.isoformat(), order.customer.username if order.customer else '',
+            order.transaction_id or '', order.total, order.item_count,
+        ]
+        address = _address_fields(order)
+        lines = []
+        for item in order.orderitem_set.all():
+            product = item.product
+            lines.append(writer.writerow(head + [
+                product.id if product else '', product.name if product else '',
+                product.price if product else '', item.quantity, item.get_total if product else 0,
+            ] + address))
+        if not lines:
+            lines.append(writer.writerow(head + ['', '', '', '', ''] + address))
+        yield ''.join(lines)
+
+
+def ndjson_stream(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    for order in iterate_orders(queryset, chunk_size):
+        address = order.shipping_address
+        record = {
+            'id': order.id,
+            'date_ordered': order.date_ordered,
+            'customer': order.customer.username if order.customer else None,
+            'transaction_id': order.transaction_id,
+            'total': order.total,
+            'item_count': order.item_count,
+            'items': [
+                {
+                    'product_id': item.product_id,
+                    'product_name': item.product.name if item.product else None,
+                    'unit_price': item.product.price if item.product else None,
+                    'quantity': item.quantity,
+                }
+                for item in order.orderitem_set.all()
+            ],
+            'shipping_address': {
+                'address': address.address, 'city': address.city,
+                'state': address.state, 'zipcode': address.zipcode,
+            } if address else None,
+        }
+        yield json.dumps(record, cls=DjangoJSONEncoder) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': (csv_stream, 'text/csv'),
+    'ndjson': (ndjson_stream, 'application/x-ndjson'),
+}
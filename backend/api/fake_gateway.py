@@ -0,0 +1,114 @@
+"""
+A local stand-in for the Razorpay orders API, for exercising the payment
+gateway's timeouts, retries and circuit breaker without network access.
+
+    python manage.py run_fake_gateway --port 8765 --latency 0.5 --failure-rate 0.2
+
+then point RAZORPAY_BASE_URL at http://127.0.0.1:8765.
+"""
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeGatewayState:
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.fail_next = 0
+        self.orders = []
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+
+    def should_fail(self):
+        with self.lock:
+            self.requests += 1
+            if self.fail_next:
+                self.fail_next -= 1
+                return True
+            return self.random.random() < self.failure_rate
+
+
+class FakeGatewayHandler(BaseHTTPRequestHandler):
+    server_version = 'FakeRazorpay/1.0'
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _simulate(self):
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        if self.state.should_fail():
+            self._send(500, {'error': {'code': 'SERVER_ERROR', 'description': 'Simulated failure'}})
+            return False
+        return True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        data = json.loads(self.rfile.read(length) or b'{}')
+        if urlparse(self.path).path != '/v1/orders':
+            return self._send(404, {'error': {'code': 'BAD_REQUEST_ERROR', 'description': 'Not found'}})
+        if not self._simulate():
+            return
+        order = {
+            'id': f'order_{uuid.uuid4().hex[:14]}',
+            'entity': 'order',
+            'amount': data.get('amount'),
+            'currency': data.get('currency'),
+            'receipt': data.get('receipt'),
+            'status': 'created',
+        }
+        with self.state.lock:
+            self.state.orders.append(order)
+        self._send(200, order)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/v1/orders':
+            return self._send(404, {'error': {'code': 'BAD_REQUEST_ERROR', 'description': 'Not found'}})
+        if not self._simulate():
+            return
+        receipt = parse_qs(url.query).get('receipt', [None])[0]
+        with self.state.lock:
+            items = [order for order in self.state.orders if receipt is None or order['receipt'] == receipt]
+        self._send(200, {'entity': 'collection', 'count': len(items), 'items': items})
+
+
+class FakeGatewayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), **state_options):
+        super().__init__(address, FakeGatewayHandler)
+        self.state = FakeGatewayState(**state_options)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Serve on a daemon thread; returns self for `with` use."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        super().__exit__(*exc_info)
@@ -0,0 +1,53 @@
+from decimal import Decimal, InvalidOperation
+
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+
+from api.search import get_search_backend
+
+
+class ProductSearchFilter(filters.BaseFilterBackend):
+    """
+    ?search= answered by the configured search backend (api.search) rather
+    than LIKE '%term%': the queryset is narrowed to the matches and carries
+    their rank, which ProductCursorPagination orders the pages by.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return get_search_backend().rank_queryset(queryset, query)
+
+
+class ProductFilterBackend(filters.BaseFilterBackend):
+    """Filter products by ?min_price=, ?max_price= and ?digital=true|false."""
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        min_price = self._decimal(params, 'min_price')
+        max_price = self._decimal(params, 'max_price')
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+
+        digital = params.get('digital')
+        if digital is not None:
+            if digital.lower() not in ('true', 'false', '1', '0'):
+                raise ValidationError({'digital': 'Must be true or false.'})
+            queryset = queryset.filter(digital=digital.lower() in ('true', '1'))
+        return queryset
+
+    def _decimal(self, params, name):
+        value = params.get(name)
+        if value in (None, ''):
+            return None
+        try:
+            value = Decimal(value)
+        except InvalidOperation:
+            raise ValidationError({name: 'Must be a number.'})
+        if not value.is_finite():
+            raise ValidationError({name: 'Must be a number.'})
+        return value
@@ -0,0 +1,70 @@
+import logging
+from functools import lru_cache
+
+import cloudinary
+import cloudinary.uploader
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+_DELIVERY = [{'quality': 'auto'}, {'fetch_format': 'auto'}]
+
+PRODUCT_IMAGE_VARIANTS = {
+    'image_url': [{'width': 800, 'height': 800, 'crop': 'limit'}, *_DELIVERY],
+    'thumbnail_url': [{'width': 300, 'height': 300, 'crop': 'limit'}, *_DELIVERY],
+    'image_url_2x': [{'width': 1600, 'height': 1600, 'crop': 'limit'}, *_DELIVERY],
+}
+
+BANNER_IMAGE_VARIANTS = {
+    'image_url': [{'width': 1920, 'crop': 'limit'}, *_DELIVERY],
+    'mobile_image_url': [{'width': 768, 'crop': 'limit'}, *_DELIVERY],
+}
+
+
+@lru_cache(maxsize=4096)
+def _build_url(public_id, transformation):
+    return cloudinary.CloudinaryImage(public_id).build_url(
+        transformation=[dict(step) for step in transformation]
+    )
+
+
+def build_image_url(image, transformation):
+    """Return the delivery URL for one transformation, memoized by public_id."""
+    if not image or not hasattr(image, 'url'):
+        return ""
+    frozen = tuple(tuple(sorted(step.items())) for step in transformation)
+    try:
+        return _build_url(image.public_id, frozen)
+    except Exception:
+        logger.exception("Error generating optimized URL for %s", image.public_id)
+        return image.url
+
+
+def build_image_urls(image, variants):
+    """Map each variant's field name to its delivery URL."""
+    return {field: build_image_url(image, transformation) for field, transformation in variants.items()}
+
+
+def store_image_urls(instance, variants):
+    """Persist the precomputed URLs of a saved instance if they changed."""
+    urls = build_image_urls(instance.image, variants)
+    if any(getattr(instance, field) != url for field, url in urls.items()):
+        for field, url in urls.items():
+            setattr(instance, field, url)
+        type(instance).objects.filter(pk=instance.pk).update(**urls)
+
+
+class CloudinaryUploader:
+    """Uploads a local path or remote URL to Cloudinary under a fixed public_id."""
+
+    def upload(self, source, public_id):
+        return cloudinary.uploader.upload_resource(
+            source, public_id=public_id, overwrite=True, resource_type='image',
+        )
+
+
+def get_image_uploader():
+    """The uploader named by settings.PRODUCT_IMAGE_UPLOADER, Cloudinary by default."""
+    path = settings.PRODUCT_IMAGE_UPLOADER
+    return import_string(path)() if path else CloudinaryUploader()
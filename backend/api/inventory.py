@@ -0,0 +1,178 @@
+"""
+Stock reservation.
+
+Stock lives in StockShard rows: `available` is what can still be sold and
+`reserved` is what is held for checkouts awaiting payment. start_payment
+reserves every line of the cart with conditional
+`UPDATE ... SET available = available - n WHERE available >= n`
+statements, so two buyers can never take the same unit and no row is read
+before it is written. A hot SKU can be spread over several shards; each
+reservation starts at a random shard so concurrent buyers mostly update
+different rows, and only falls back to locking all shards when no single
+one can cover the quantity.
+
+Reservations are committed when the order is paid and handed back to
+`available` when their TTL passes without payment
+(release_expired_reservations).
+"""
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from api.models import OrderItem, StockReservation, StockShard
+
+logger = logging.getLogger(__name__)
+
+
+class OutOfStock(Exception):
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f'Insufficient stock for products {self.product_ids}')
+
+
+def set_stock(product, quantity, shards=1):
+    """Replace a product's stock with quantity spread evenly over shards."""
+    with transaction.atomic():
+        StockShard.objects.filter(product=product, shard__gte=shards).delete()
+        base, extra = divmod(quantity, shards)
+        for shard in range(shards):
+            StockShard.objects.update_or_create(
+                product=product, shard=shard,
+                defaults={'available': base + (1 if shard < extra else 0)},
+            )
+
+
+def _move(product_id, shard, quantity):
+    """Move quantity from available to reserved on one shard if it is there."""
+    return StockShard.objects.filter(
+        product_id=product_id, shard=shard, available__gte=quantity,
+    ).update(available=F('available') - quantity, reserved=F('reserved') + quantity)
+
+
+def take_stock(product_id, quantity, shards):
+    """Reserve quantity of a product; returns [(shard, quantity)] or raises OutOfStock."""
+    start = random.randrange(len(shards))
+    for shard in shards[start:] + shards[:start]:
+        if _move(product_id, shard, quantity):
+            return [(shard, quantity)]
+
+    # No single shard can cover it: lock them all and take across shards.
+    rows = list(StockShard.objects.select_for_update().filter(product_id=product_id).order_by('shard'))
+    if sum(row.available for row in rows) < quantity:
+        raise OutOfStock([product_id])
+    allocations = []
+    remaining = quantity
+    for row in rows:
+        portion = min(row.available, remaining)
+        if portion and _move(product_id, row.shard, portion):
+            allocations.append((row.shard, portion))
+            remaining -= portion
+        if not remaining:
+            return allocations
+    raise OutOfStock([product_id])
+
+
+def _tracked_lines(order):
+    lines = dict(
+        OrderItem.objects.filter(order=order, product__isnull=False, quantity__gt=0)
+        .values_list('product_id', 'quantity')
+    )
+    shards = {}
+    for product_id, shard in StockShard.objects.filter(product_id__in=lines).values_list('product_id', 'shard'):
+        shards.setdefault(product_id, []).append(shard)
+    return {product_id: (lines[product_id], sorted(product_shards)) for product_id, product_shards in shards.items()}
+
+
+def reserve_order(order, ttl=None):
+    """
+    Hold stock for every stock-tracked line of the order, replacing any
+    earlier hold. All or nothing: raises OutOfStock naming the short products.
+    """
+    ttl = ttl or timedelta(seconds=settings.STOCK_RESERVATION_TTL)
+    expires_at = timezone.now() + ttl
+    with transaction.atomic():
+        release_order_stock(order)
+        reservations = []
+        short = []
+        for product_id, (quantity, shards) in _tracked_lines(order).items():
+            try:
+                allocations = take_stock(product_id, quantity, shards)
+            except OutOfStock:
+                short.append(product_id)
+                continue
+            reservations += [
+                StockReservation(order=order, product_id=product_id, shard=shard, quantity=portion, expires_at=expires_at)
+                for shard, portion in allocations
+            ]
+        if short:
+            # Rolls back whatever this call already took.
+            transaction.set_rollback(True)
+            raise OutOfStock(short)
+        StockReservation.objects.bulk_create(reservations)
+
+
+def _settle(reservations, status, restore):
+    for reservation in reservations:
+        updates = {'reserved': F('reserved') - reservation.quantity}
+        if restore:
+            updates['available'] = F('available') + reservation.quantity
+        StockShard.objects.filter(product_id=reservation.product_id, shard=reservation.shard).update(**updates)
+    StockReservation.objects.filter(pk__in=[r.pk for r in reservations]).update(status=status)
+
+
+def release_order_stock(order):
+    with transaction.atomic():
+        held = list(StockReservation.objects.select_for_update().filter(order=order, status=StockReservation.HELD))
+        _settle(held, StockReservation.RELEASED, restore=True)
+
+
+def commit_order_stock(order):
+    """
+    Turn the order's held stock into sold stock once it is paid. The cart
+    may have changed since the hold was taken: missing units are taken now
+    if possible and surplus ones go back to available.
+    """
+    with transaction.atomic():
+        held = list(StockReservation.objects.select_for_update().filter(order=order, status=StockReservation.HELD))
+        _settle(held, StockReservation.COMMITTED, restore=False)
+        reserved = {}
+        for reservation in held:
+            reserved.setdefault(reservation.product_id, []).append(reservation)
+        lines = _tracked_lines(order)
+
+        for product_id in lines.keys() | reserved.keys():
+            quantity, shards = lines.get(product_id, (0, []))
+            missing = quantity - sum(r.quantity for r in reserved.get(product_id, []))
+            if missing > 0:
+                try:
+                    allocations = take_stock(product_id, missing, shards)
+                except OutOfStock:
+                    logger.error('Order %s was paid but product %s is short by %s', order.pk, product_id, missing)
+                    continue
+                for shard, portion in allocations:
+                    StockShard.objects.filter(product_id=product_id, shard=shard).update(reserved=F('reserved') - portion)
+            elif missing < 0:
+                surplus = -missing
+                for reservation in reserved[product_id]:
+                    portion = min(surplus, reservation.quantity)
+                    StockShard.objects.filter(product_id=product_id, shard=reservation.shard).update(available=F('available') + portion)
+                    surplus -= portion
+                    if not surplus:
+                        break
+
+
+def release_expired_reservations(batch_size=500):
+    """Return expired, unpaid holds to available stock; returns how many were released."""
+    with transaction.atomic():
+        expired = list(
+            StockReservation.objects.select_for_update(skip_locked=True)
+            .filter(status=StockReservation.HELD, expires_at__lte=timezone.now())
+            .order_by('expires_at')[:batch_size]
+        )
+        _settle(expired, StockReservation.RELEASED, restore=True)
+    return len(expired)
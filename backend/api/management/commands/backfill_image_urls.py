@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from api.images import BANNER_IMAGE_VARIANTS, PRODUCT_IMAGE_VARIANTS, build_image_urls
+from api.models import Banner, Product
+
+
+class Command(BaseCommand):
+    """
+    Fills in the precomputed Cloudinary delivery URLs for products and
+    banners saved before they were stored on the model.
+    """
+    help = 'Precompute and store Cloudinary image URLs for existing rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        for model, variants in ((Product, PRODUCT_IMAGE_VARIANTS), (Banner, BANNER_IMAGE_VARIANTS)):
+            updated = self.backfill(model, variants, options['batch_size'])
+            self.stdout.write(f'{model.__name__}: updated {updated} rows.')
+
+    def backfill(self, model, variants, batch_size):
+        fields = list(variants)
+        pending = []
+        updated = 0
+        rows = model.objects.exclude(image__isnull=True).exclude(image='').only('pk', 'image', *fields)
+        for instance in rows.iterator(chunk_size=batch_size):
+            urls = build_image_urls(instance.image, variants)
+            if all(getattr(instance, field) == url for field, url in urls.items()):
+                continue
+            for field, url in urls.items():
+                setattr(instance, field, url)
+            pending.append(instance)
+            if len(pending) >= batch_size:
+                model.objects.bulk_update(pending, fields)
+                updated += len(pending)
+                pending = []
+        if pending:
+            model.objects.bulk_update(pending, fields)
+            updated += len(pending)
+        return updated
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exports import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS
+from api.models import Order
+
+
+class Command(BaseCommand):
+    """
+    The back-office counterpart of /api/orders/export/: streams orders to a
+    file or stdout in constant memory, so it can dump the whole table.
+    """
+    help = 'Export orders as CSV or NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--customer', help='Only orders of this username.')
+        parser.add_argument('--include-open', action='store_true', help='Include carts that were never completed.')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--output', help='File to write to; stdout when omitted.')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be positive.')
+        queryset = Order.objects.using(options['database'])
+        if not options['include_open']:
+            queryset = queryset.filter(completed=True)
+        if options['customer']:
+            queryset = queryset.filter(customer__username=options['customer'])
+
+        stream, _ = EXPORT_FORMATS[options['output_format']]
+        chunks = stream(queryset, options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as out:
+                out.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
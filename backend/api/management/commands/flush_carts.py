@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.cart_store import get_cart_store
+
+
+class Command(BaseCommand):
+    """
+    Writes carts held in the Redis cart store back to Order/OrderItem.
+    Meant to run periodically when CART_STORE is 'redis'; a no-op for the
+    database store.
+    """
+    help = 'Persist carts changed in the cart store since the last flush.'
+
+    def handle(self, *args, **options):
+        flushed = get_cart_store().flush()
+        self.stdout.write(f'Flushed {flushed} carts.')
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.catalog_import import import_products, read_rows
+
+
+class Command(BaseCommand):
+    """
+    Creates or updates products from a CSV or JSONL file keyed on sku, e.g.
+    `python manage.py import_products catalog.csv --batch-size 2000`.
+    Columns are sku, name, price, digital and image (a path or URL that is
+    uploaded to Cloudinary). Invalid rows are reported and skipped.
+    """
+    help = 'Bulk import or update products from a CSV or JSONL file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', dest='file_format', choices=['csv', 'jsonl'], help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--upload-workers', type=int, default=8, help='Concurrent image uploads.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and count without uploading or writing.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0 or options['upload_workers'] <= 0:
+            raise CommandError('--batch-size and --upload-workers must be positive.')
+        started = time.monotonic()
+
+        def progress(report):
+            rate = report.rows / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f'{report} ({rate:.0f} rows/s)')
+
+        try:
+            report = import_products(
+                read_rows(options['path'], options['file_format']),
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run'],
+                upload_workers=options['upload_workers'],
+                progress=progress,
+            )
+        except OSError as e:
+            raise CommandError(f'Cannot read {options["path"]}: {e}')
+
+        for line, message in report.errors:
+            self.stderr.write(f'line {line}: {message}')
+        if len(report.errors) < report.invalid + report.image_failures:
+            self.stderr.write(f'... and {report.invalid + report.image_failures - len(report.errors)} more')
+        prefix = 'Dry run, nothing written: ' if options['dry_run'] else 'Imported '
+        self.stdout.write(self.style.SUCCESS(f'{prefix}{report} in {time.monotonic() - started:.1f}s.'))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.webhooks import process_pending_events
+
+
+class Command(BaseCommand):
+    """
+    Drains recorded Razorpay webhook events and finalizes their orders.
+    Run once to empty the queue, or with --loop as a long-lived worker.
+    Several workers can run side by side on Postgres, where pending rows
+    are claimed with SKIP LOCKED.
+    """
+    help = 'Finalize orders from recorded payment webhook events.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--max-attempts', type=int, default=5)
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new events.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty.')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            handled = process_pending_events(options['batch_size'], options['max_attempts'])
+            total += handled
+            # A short batch means the queue is drained; failed events wait out their backoff.
+            if handled == options['batch_size']:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(f'Processed {total} payment events.')
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import Order
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the stored total, item_count and requires_shipping columns on
+    Order from its line items and fixes any rows that have drifted.
+    """
+    help = 'Recompute stored order totals from their line items.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--open-only', action='store_true', help='Only reconcile open carts.')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        orders = Order.objects.with_computed_totals()
+        if options['open_only']:
+            orders = orders.filter(completed=False)
+
+        fields = ['total', 'item_count', 'requires_shipping', 'updated_at']
+        batch_size = options['batch_size']
+        pending = []
+        checked = fixed = 0
+        for order in orders.iterator(chunk_size=batch_size):
+            checked += 1
+            if (order.total, order.item_count, order.requires_shipping) == (
+                order.computed_total, order.computed_item_count, order.computed_requires_shipping
+            ):
+                continue
+            order.total = order.computed_total
+            order.item_count = order.computed_item_count
+            order.requires_shipping = order.computed_requires_shipping
+            order.updated_at = timezone.now()
+            pending.append(order)
+            if len(pending) >= batch_size:
+                Order.objects.bulk_update(pending, fields)
+                fixed += len(pending)
+                pending = []
+        if pending:
+            Order.objects.bulk_update(pending, fields)
+            fixed += len(pending)
+
+        self.stdout.write(f'Checked {checked} orders, fixed {fixed}.')
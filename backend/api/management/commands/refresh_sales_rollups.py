@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.analytics import check_rollups, rebuild_rollups, refresh_rollups
+
+
+class Command(BaseCommand):
+    """
+    Folds orders completed since the last run into the daily sales rollups
+    behind /api/analytics/. Run it every few minutes; --check compares the
+    rollups with a full recompute and --rebuild starts them over.
+    """
+    help = 'Refresh the daily sales rollup tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--rebuild', action='store_true', help='Drop the rollups and recompute them from every order.')
+        parser.add_argument('--check', action='store_true', help='Compare the rollups with a full recompute and fail on any difference.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if options['rebuild']:
+            total = rebuild_rollups(batch_size)
+        else:
+            total = 0
+            while True:
+                folded = refresh_rollups(batch_size)
+                total += folded
+                if folded < batch_size:
+                    break
+        self.stdout.write(f'Rolled up {total} orders.')
+
+        if options['check']:
+            mismatches = check_rollups()
+            for mismatch in mismatches:
+                self.stderr.write(f"{mismatch['day']} product {mismatch['product_id']}: expected {mismatch['expected']}, found {mismatch['actual']}")
+            if mismatches:
+                raise CommandError(f'{len(mismatches)} rollup rows differ from a full recompute; run with --rebuild.')
+            self.stdout.write('Rollups match a full recompute.')
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from api.inventory import release_expired_reservations
+
+
+class Command(BaseCommand):
+    """
+    Returns stock held by checkouts whose reservation TTL passed without a
+    payment. Run it every minute or so.
+    """
+    help = 'Release expired stock reservations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            released = release_expired_reservations(options['batch_size'])
+            total += released
+            if released < options['batch_size']:
+                break
+        self.stdout.write(f'Released {total} reservations.')
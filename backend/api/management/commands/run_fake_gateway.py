@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from api.fake_gateway import FakeGatewayServer
+
+
+class Command(BaseCommand):
+    """
+    Runs a local fake of the Razorpay orders API with configurable latency
+    and failure rate. Point RAZORPAY_BASE_URL at it to test checkout offline.
+    """
+    help = 'Serve a fake Razorpay orders API for local testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before answering.')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of requests answered with a 500.')
+
+    def handle(self, *args, **options):
+        server = FakeGatewayServer(
+            (options['host'], options['port']),
+            latency=options['latency'],
+            failure_rate=options['failure_rate'],
+        )
+        self.stdout.write(f'Fake Razorpay listening on {server.base_url}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
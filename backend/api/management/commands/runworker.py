@@ -0,0 +1,56 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from api.tasks import claim_tasks, execute_task
+
+
+def run_task(task_id):
+    close_old_connections()
+    try:
+        return execute_task(task_id)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    """
+    Runs queued background tasks. Due tasks are claimed in batches and
+    executed on a thread pool (default) or a process pool; use --burst to
+    drain the queue once and exit.
+    """
+    help = 'Run background tasks from the task queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread')
+        parser.add_argument('--burst', action='store_true', help='Exit once no task is due.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when idle.')
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        if options['pool'] == 'process':
+            # Children must not inherit the parent's open database connection.
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=concurrency, initializer=django.setup)
+        else:
+            executor = ThreadPoolExecutor(max_workers=concurrency)
+
+        succeeded = failed = 0
+        with executor:
+            while True:
+                ids = claim_tasks(concurrency * 2)
+                if not ids:
+                    if options['burst']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+                for ok in executor.map(run_task, ids):
+                    if ok:
+                        succeeded += 1
+                    else:
+                        failed += 1
+        self.stdout.write(f'Ran {succeeded + failed} tasks: {succeeded} succeeded, {failed} failed.')
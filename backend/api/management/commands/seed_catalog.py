@@ -0,0 +1,44 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from api.cache import bump_version
+from api.models import Product
+from api.search import invalidate_search_index
+
+
+class Command(BaseCommand):
+    """
+    Seeds a large synthetic product catalog for load testing the catalog
+    API, e.g. `python manage.py seed_catalog --count 1000000`. Rows are
+    inserted with bulk_create, so image URLs are left empty and the product
+    cache generation is bumped by hand.
+    """
+    help = 'Insert a large number of synthetic products for load testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        count = options['count']
+        batch_size = options['batch_size']
+        start = Product.objects.count()
+        created = 0
+        while created < count:
+            size = min(batch_size, count - created)
+            Product.objects.bulk_create([
+                Product(
+                    name=f'Load test product {start + created + i}',
+                    price=rng.randrange(100, 9999900) / 100,
+                    digital=rng.random() < 0.2,
+                )
+                for i in range(size)
+            ], batch_size=batch_size)
+            created += size
+            self.stdout.write(f'Seeded {created}/{count} products')
+        bump_version('products')
+        invalidate_search_index()
+        self.stdout.write(self.style.SUCCESS(f'Seeded {count} products.'))
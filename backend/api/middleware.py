@@ -0,0 +1,47 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from api.routers import apin_to_primary, pin_to_primary
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pin a user to the primary database after a successful write request, so
+    their next reads do not come from a replica that has not caught up.
+
+    DRF authenticates inside the view and copies the user back onto the
+    Django request, so request.user is the JWT user by the time the
+    response passes through here.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _writer(self, request, response):
+        user = getattr(request, 'user', None)
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return None
+        if user is None or not user.is_authenticated:
+            return None
+        return user.id
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        user_id = self._writer(request, response)
+        if user_id is not None:
+            pin_to_primary(user_id)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        user_id = self._writer(request, response)
+        if user_id is not None:
+            await apin_to_primary(user_id)
+        return response
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.2 on 2026-10-18 19:33
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Exists, F, OuterRef, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_order_totals(apps, schema_editor):
+    Order = apps.get_model('api', 'Order')
+    OrderItem = apps.get_model('api', 'OrderItem')
+    money = models.DecimalField(max_digits=12, decimal_places=2)
+    orders = Order.objects.annotate(
+        computed_total=Coalesce(
+            Sum(F('orderitem__product__price') * F('orderitem__quantity'), output_field=money),
+            Value(Decimal('0')),
+            output_field=money,
+        ),
+        computed_item_count=Coalesce(Sum('orderitem__quantity'), 0),
+        computed_requires_shipping=Exists(
+            OrderItem.objects.filter(order=OuterRef('pk'), product__digital=False)
+        ),
+    )
+    batch = []
+    for order in orders.iterator(chunk_size=500):
+        order.total = order.computed_total
+        order.item_count = order.computed_item_count
+        order.requires_shipping = order.computed_requires_shipping
+        batch.append(order)
+        if len(batch) >= 500:
+            Order.objects.bulk_update(batch, ['total', 'item_count', 'requires_shipping'])
+            batch = []
+    if batch:
+        Order.objects.bulk_update(batch, ['total', 'item_count', 'requires_shipping'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_alter_orderitem_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='requires_shipping',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_order_totals, migrations.RunPython.noop),
+    ]
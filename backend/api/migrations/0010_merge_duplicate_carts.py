@@ -0,0 +1,56 @@
+# Generated by Django 5.2.2 on 2026-10-18 19:34
+
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def merge_duplicate_carts(apps, schema_editor):
+    """Fold duplicate open orders and duplicate lines together so the new constraints can be added."""
+    Order = apps.get_model('api', 'Order')
+    OrderItem = apps.get_model('api', 'OrderItem')
+    touched = set()
+
+    duplicate_carts = (
+        Order.objects.filter(completed=False, customer__isnull=False)
+        .values('customer').annotate(n=Count('id')).filter(n__gt=1)
+    )
+    for row in duplicate_carts:
+        keeper, *extras = Order.objects.filter(completed=False, customer=row['customer']).order_by('pk')
+        for extra in extras:
+            OrderItem.objects.filter(order=extra).update(order=keeper)
+            extra.delete()
+        touched.add(keeper.pk)
+
+    duplicate_lines = (
+        OrderItem.objects.filter(order__isnull=False, product__isnull=False)
+        .values('order', 'product').annotate(n=Count('id'), units=Sum('quantity')).filter(n__gt=1)
+    )
+    for row in duplicate_lines:
+        keeper, *extras = OrderItem.objects.filter(order=row['order'], product=row['product']).order_by('pk')
+        keeper.quantity = row['units']
+        keeper.save(update_fields=['quantity'])
+        OrderItem.objects.filter(pk__in=[extra.pk for extra in extras]).delete()
+        touched.add(row['order'])
+
+    money = models.DecimalField(max_digits=12, decimal_places=2)
+    for order in Order.objects.filter(pk__in=touched):
+        items = OrderItem.objects.filter(order=order)
+        totals = items.aggregate(
+            total=Sum(F('product__price') * F('quantity'), output_field=money),
+            item_count=Sum('quantity'),
+        )
+        order.total = totals['total'] or 0
+        order.item_count = totals['item_count'] or 0
+        order.requires_shipping = items.filter(product__digital=False).exists()
+        order.save(update_fields=['total', 'item_count', 'requires_shipping'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_order_totals'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_carts, migrations.RunPython.noop),
+    ]
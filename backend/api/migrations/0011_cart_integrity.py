@@ -0,0 +1,21 @@
+# Generated by Django 5.2.2 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_merge_duplicate_carts'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(condition=models.Q(('completed', False)), fields=('customer',), name='unique_open_order_per_customer'),
+        ),
+        migrations.AddConstraint(
+            model_name='orderitem',
+            constraint=models.UniqueConstraint(fields=('order', 'product'), name='unique_product_per_order'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.2 on 2026-10-18 19:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_cart_integrity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='banner',
+            name='image_url',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='banner',
+            name='mobile_image_url',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='image_url',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='image_url_2x',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='thumbnail_url',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.2 on 2026-10-18 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_precomputed_image_urls'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price', 'id'], name='product_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['digital', 'id'], name='product_digital_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def create_search_indexes(apps, schema_editor):
+    # The full-text and trigram indexes only exist on Postgres; other
+    # databases use the in-process index in api.search.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS product_name_fts_idx ON api_product "
+        "USING GIN (to_tsvector('english'::regconfig, COALESCE(name, '')))"
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS product_name_trgm_idx ON api_product USING GIN (name gin_trgm_ops)'
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS product_name_fts_idx')
+    schema_editor.execute('DROP INDEX IF EXISTS product_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_product_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
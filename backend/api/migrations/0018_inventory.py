@@ -0,0 +1,43 @@
+# Generated by Django 5.2.2 on 2026-10-18 19:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_task_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(default=0)),
+                ('quantity', models.IntegerField()),
+                ('status', models.CharField(choices=[('held', 'Held'), ('committed', 'Committed'), ('released', 'Released')], default='held', max_length=10)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_reservations', to='api.order')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='reservation_expiry_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(default=0)),
+                ('available', models.IntegerField(default=0)),
+                ('reserved', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_shards', to='api.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'shard'), name='unique_stock_shard'), models.CheckConstraint(condition=models.Q(('available__gte', 0)), name='stock_available_non_negative')],
+            },
+        ),
+    ]
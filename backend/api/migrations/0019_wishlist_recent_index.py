@@ -0,0 +1,17 @@
+# Generated by Django 5.2.2 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_inventory'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wishlistitem',
+            index=models.Index(fields=['user', '-id'], name='wishlist_user_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.2 on 2026-10-18 20:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_completed_at(apps, schema_editor):
+    # Orders completed before completed_at existed: their last update is
+    # the best record of when that happened.
+    Order = apps.get_model('api', 'Order')
+    Order.objects.filter(completed=True, completed_at__isnull=True).update(completed_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_wishlist_recent_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('orders', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('units', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SalesRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_completed_at', models.DateTimeField(blank=True, null=True)),
+                ('last_order_id', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('completed_at__isnull', False)), fields=['completed_at', 'id'], name='order_completed_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='dailyproductsales',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='api.product'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyproductsales',
+            constraint=models.UniqueConstraint(fields=('day', 'product'), name='unique_daily_product_sales'),
+        ),
+        migrations.RunPython(backfill_completed_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.2 on 2026-10-18 20:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_product_sku'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['completed', '-id'], name='order_completed_recent_idx'),
+        ),
+    ]
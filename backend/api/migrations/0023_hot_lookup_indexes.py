@@ -0,0 +1,36 @@
+# Generated by Django 5.2.2 on 2026-10-18 20:21
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def clear_duplicate_razorpay_ids(apps, schema_editor):
+    """Store blank Razorpay ids as NULL and keep each id only on its newest order."""
+    Order = apps.get_model('api', 'Order')
+    Order.objects.filter(razorpay_order_id='').update(razorpay_order_id=None)
+    duplicates = (
+        Order.objects.filter(razorpay_order_id__isnull=False)
+        .values('razorpay_order_id').annotate(n=Count('id')).filter(n__gt=1)
+    )
+    for row in duplicates:
+        older = Order.objects.filter(razorpay_order_id=row['razorpay_order_id']).order_by('-pk').values_list('pk', flat=True)[1:]
+        Order.objects.filter(pk__in=list(older)).update(razorpay_order_id=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_order_admin_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_duplicate_razorpay_ids, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('completed', True)), fields=['customer', '-date_ordered'], name='order_customer_history_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(condition=models.Q(('razorpay_order_id__isnull', False)), fields=('razorpay_order_id',), name='unique_razorpay_order_id'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.2 on 2026-10-18 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='payment_amount',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='shipping_details',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
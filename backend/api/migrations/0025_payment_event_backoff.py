@@ -0,0 +1,27 @@
+# Generated by Django 5.2.2 on 2026-10-18 20:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_order_payment_details'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='paymentevent',
+            name='paymentevent_pending_idx',
+        ),
+        migrations.AddField(
+            model_name='paymentevent',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='paymentevent',
+            index=models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['next_attempt_at', 'id'], name='paymentevent_pending_idx'),
+        ),
+    ]
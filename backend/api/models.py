@@ -1,35 +1,91 @@
-from django.db import models
+from decimal import Decimal
+from django.db import IntegrityError, models, transaction
+from django.db.models import Exists, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Now
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from cloudinary.models import CloudinaryField
-import cloudinary
+from api.images import BANNER_IMAGE_VARIANTS, PRODUCT_IMAGE_VARIANTS, build_image_url, store_image_urls
 
 class User(AbstractUser):
     phone=models.CharField(max_length=15)
 
+class ProductQuerySet(models.QuerySet):
+
+    def with_customer_state(self, user_id, cart=True):
+        """
+        Annotate whether each product is in the customer's wishlist and, with
+        cart=True, its quantity in their open cart. Both are correlated
+        subqueries answered from the (user, product) and (order, product)
+        unique indexes, so the page is still one query.
+        """
+        queryset = self.annotate(
+            in_wishlist=Exists(WishlistItem.objects.filter(user_id=user_id, product=OuterRef('pk'))),
+        )
+        if cart:
+            line = OrderItem.objects.filter(
+                order__customer_id=user_id, order__completed=False, product=OuterRef('pk'),
+            ).values('quantity')[:1]
+            queryset = queryset.annotate(cart_quantity=Coalesce(Subquery(line), Value(0)))
+        return queryset
+
 class Product(models.Model):
+    # Catalog key used by import_products to match rows to products.
+    sku=models.CharField(max_length=64, unique=True, null=True, blank=True)
     name=models.CharField(max_length=200, null=True)
     price=models.DecimalField(max_digits=7, decimal_places=2)
     digital=models.BooleanField(default=False, null=True, blank=False)
     image=CloudinaryField('image',null=True,blank=True)
+    # Delivery URLs are built once when the image is saved, not per serialization.
+    image_url=models.CharField(max_length=500, blank=True, default='')
+    thumbnail_url=models.CharField(max_length=500, blank=True, default='')
+    image_url_2x=models.CharField(max_length=500, blank=True, default='')
+    updated_at=models.DateTimeField(auto_now=True)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['price', 'id'], name='product_price_idx'),
+            models.Index(fields=['digital', 'id'], name='product_digital_idx'),
+        ]
+
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        store_image_urls(self, PRODUCT_IMAGE_VARIANTS)
+
     @property
     def imageURL(self):
-        if self.image and hasattr(self.image, 'url'):
-            try:
-                optimized_url = cloudinary.CloudinaryImage(self.image.public_id).build_url(
-                    transformation=[
-                        {'width': 800, 'height': 800, 'crop': 'limit'},
-                        {'quality': 'auto'},
-                        {'fetch_format': 'auto'}
-                    ]
-                )
-                return optimized_url
-            except Exception as e:
-                print(f"Error generating optimized URL: {e}")
-                return self.image.url
-        else:
-            return ""
+        return self.image_url or build_image_url(self.image, PRODUCT_IMAGE_VARIANTS['image_url'])
+
+def order_detail_prefetches():
+    return (
+        models.Prefetch('orderitem_set', queryset=OrderItem.objects.select_related('product')),
+        'shippingaddress_set',
+    )
+
+class OrderQuerySet(models.QuerySet):
+    def with_details(self):
+        """Join everything OrderSerializer touches so a page of orders costs a fixed number of queries."""
+        return self.select_related('customer').prefetch_related(*order_detail_prefetches())
+
+    def with_computed_totals(self):
+        """Annotate the cart totals as they would be computed from the order's line items."""
+        money = models.DecimalField(max_digits=12, decimal_places=2)
+        return self.annotate(
+            computed_total=Coalesce(
+                Sum(F('orderitem__product__price') * F('orderitem__quantity'), output_field=money),
+                Value(Decimal('0')),
+                output_field=money,
+            ),
+            computed_item_count=Coalesce(Sum('orderitem__quantity'), 0),
+            computed_requires_shipping=Exists(
+                OrderItem.objects.filter(order=OuterRef('pk'), product__digital=False)
+            ),
+        )
 
 class Order(models.Model):
     customer = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True) 
@@ -37,29 +93,216 @@ class Order(models.Model):
     completed=models.BooleanField(default=False, null=True, blank=False)
     transaction_id=models.CharField(max_length=200, null=True)
     razorpay_order_id = models.CharField(max_length=200, null=True, blank=True)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.IntegerField(default=0)
+    requires_shipping = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    # What start_payment asked Razorpay for, and where to ship if only the webhook completes the order.
+    payment_amount = models.IntegerField(null=True, blank=True)
+    shipping_details = models.JSONField(null=True, blank=True)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # The sales rollup walks completed orders in completion order.
+            models.Index(fields=['completed_at', 'id'], condition=Q(completed_at__isnull=False), name='order_completed_at_idx'),
+            # The admin changelist filters on completed and pages newest first.
+            models.Index(fields=['completed', '-id'], name='order_completed_recent_idx'),
+            # Order history: a customer's completed orders, newest first.
+            models.Index(fields=['customer', '-date_ordered'], condition=Q(completed=True), name='order_customer_history_idx'),
+        ]
+        constraints = [
+            # Also the open-cart index: every (customer, completed=False) lookup is answered from it.
+            models.UniqueConstraint(
+                fields=['customer'],
+                condition=Q(completed=False),
+                name='unique_open_order_per_customer',
+            ),
+            # Payment verification and webhooks look orders up by their Razorpay order.
+            models.UniqueConstraint(
+                fields=['razorpay_order_id'],
+                condition=Q(razorpay_order_id__isnull=False),
+                name='unique_razorpay_order_id',
+            ),
+        ]
 
     def __str__(self):
         return str(self.id)
     
     @property
     def shipping(self):
-        shipping = False
-        orderitems=self.orderitem_set.all()
-        for i in orderitems:
-            if i.product.digital==False:
-                shipping = True
-        return shipping
+        return self.requires_shipping
+
+    @property
+    def shipping_address(self):
+        # Iterate the related manager instead of calling .first() so a
+        # prefetched shippingaddress_set is reused rather than re-queried.
+        addresses = sorted(self.shippingaddress_set.all(), key=lambda address: address.pk)
+        return addresses[0] if addresses else None
     
+    @property
+    def amount_in_paise(self):
+        return int(self.total * 100)
+
+    def attach_shipping_address(self, details=None):
+        """Create the shipping address from details, or those saved at checkout, unless one exists."""
+        details = details or self.shipping_details
+        if not details or self.shippingaddress_set.exists():
+            return None
+        return ShippingAddress.objects.create(
+            customer_id=self.customer_id,
+            order=self,
+            address=details.get('address'),
+            city=details.get('city'),
+            state=details.get('state'),
+            zipcode=details.get('zipcode'),
+        )
+
     @property
     def get_cart_total(self):
-        orderitems=self.orderitem_set.all()
-        total=sum(item.get_total for item in orderitems)
-        return total
+        return self.total
+
     @property
     def get_cart_items(self):
-        orderitems=self.orderitem_set.all()
-        total=sum(item.quantity for item in orderitems)
-        return total
+        return self.item_count
+
+    def apply_line_change(self, product, quantity_delta, line_removed=False):
+        """Fold one line-item change into the stored totals with a single UPDATE."""
+        updates = {
+            'total': F('total') + product.price * quantity_delta,
+            'item_count': F('item_count') + quantity_delta,
+            'updated_at': Now(),
+        }
+        if product.digital == False:
+            if quantity_delta > 0:
+                updates['requires_shipping'] = True
+            elif line_removed:
+                updates['requires_shipping'] = Exists(
+                    OrderItem.objects.filter(order=OuterRef('pk'), product__digital=False)
+                )
+        Order.objects.filter(pk=self.pk).update(**updates)
+
+    def _lock(self):
+        """Lock the cart row; every line write takes it, so batch reads cannot go stale."""
+        Order.objects.select_for_update().filter(pk=self.pk).first()
+
+    def add_item(self, product, quantity=1):
+        """Increment a line in place, creating it if the cart does not hold the product yet."""
+        with transaction.atomic():
+            self._lock()
+            lines = OrderItem.objects.filter(order=self, product=product)
+            if not lines.update(quantity=F('quantity') + quantity):
+                try:
+                    with transaction.atomic():
+                        OrderItem.objects.create(order=self, product=product, quantity=quantity)
+                except IntegrityError:
+                    # A concurrent request created the line first; add on top of it.
+                    lines.update(quantity=F('quantity') + quantity)
+            self.apply_line_change(product, quantity)
+
+    def remove_item(self, product):
+        """Decrement a line by one unit and drop it once it reaches zero."""
+        with transaction.atomic():
+            self._lock()
+            lines = OrderItem.objects.filter(order=self, product=product)
+            removed_units = lines.filter(quantity__gt=0).update(quantity=F('quantity') - 1)
+            emptied, _ = lines.filter(quantity__lte=0).delete()
+            if removed_units:
+                self.apply_line_change(product, -1, line_removed=bool(emptied))
+
+    def set_item_quantity(self, product, quantity):
+        """Set a line to an absolute quantity; zero or less removes it."""
+        with transaction.atomic():
+            # Lock the cart row so the read of the current quantity cannot race another writer.
+            self._lock()
+            line = OrderItem.objects.filter(order=self, product=product).first()
+            previous = line.quantity if line else 0
+            quantity = max(quantity, 0)
+            if quantity == 0:
+                if line:
+                    line.delete()
+            elif line:
+                line.quantity = quantity
+                line.save(update_fields=['quantity'])
+            else:
+                OrderItem.objects.create(order=self, product=product, quantity=quantity)
+            if quantity != previous:
+                self.apply_line_change(product, quantity - previous, line_removed=quantity == 0)
+
+    def apply_operations(self, operations):
+        """
+        Apply a list of cart operations under one lock using bulk reads and writes.
+
+        Each operation is a dict with a productId and either an action
+        ('add', 'remove', 'set') or just a quantity, which sets the line.
+        Products are assumed to exist.
+        """
+        product_ids = {operation['productId'] for operation in operations}
+        with transaction.atomic():
+            self._lock()
+            lines = {
+                line.product_id: line
+                for line in OrderItem.objects.filter(order=self, product_id__in=product_ids)
+            }
+            quantities = {product_id: line.quantity or 0 for product_id, line in lines.items()}
+            for operation in operations:
+                product_id = operation['productId']
+                current = quantities.get(product_id, 0)
+                action = operation.get('action', 'set')
+                if action == 'add':
+                    current += operation.get('quantity', 1)
+                elif action == 'remove':
+                    current -= operation.get('quantity', 1)
+                else:
+                    current = operation['quantity']
+                quantities[product_id] = max(current, 0)
+
+            to_create, to_update, to_delete = [], [], []
+            for product_id, quantity in quantities.items():
+                line = lines.get(product_id)
+                if line is None:
+                    if quantity:
+                        to_create.append(OrderItem(order=self, product_id=product_id, quantity=quantity))
+                elif quantity == 0:
+                    to_delete.append(line.pk)
+                elif quantity != line.quantity:
+                    line.quantity = quantity
+                    to_update.append(line)
+
+            if to_create:
+                OrderItem.objects.bulk_create(to_create)
+            if to_update:
+                OrderItem.objects.bulk_update(to_update, ['quantity'])
+            if to_delete:
+                OrderItem.objects.filter(pk__in=to_delete).delete()
+            self.recalculate_totals()
+
+    def mark_paid(self, payment_id):
+        """Complete the order for a captured payment; returns False if it was already completed."""
+        with transaction.atomic():
+            order = Order.objects.select_for_update().get(pk=self.pk)
+            if order.completed:
+                return False
+            order.transaction_id = payment_id
+            order.completed = True
+            order.completed_at = timezone.now()
+            order.save(update_fields=['transaction_id', 'completed', 'completed_at', 'updated_at'])
+            from api.inventory import commit_order_stock
+            commit_order_stock(order)
+        self.transaction_id = payment_id
+        self.completed = True
+        self.completed_at = order.completed_at
+        return True
+
+    def recalculate_totals(self):
+        """Rebuild the stored totals from the line items."""
+        computed = Order.objects.with_computed_totals().get(pk=self.pk)
+        self.total = computed.computed_total
+        self.item_count = computed.computed_item_count
+        self.requires_shipping = computed.computed_requires_shipping
+        self.save(update_fields=['total', 'item_count', 'requires_shipping', 'updated_at'])
 
     
 class OrderItem(models.Model):
@@ -70,6 +313,9 @@ class OrderItem(models.Model):
 
     class Meta:
         ordering = ['date_added']
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'product'], name='unique_product_per_order'),
+        ]
 
     @property
     def get_total(self):
@@ -88,8 +334,95 @@ class ShippingAddress(models.Model):
     date_added=models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return self.address
+        return self.address or ''
     
+class StockShard(models.Model):
+    """
+    One slice of a product's stock. Most products have a single shard; hot
+    SKUs are split across several so concurrent reservations update
+    different rows. Products without shards are not stock-tracked.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_shards')
+    shard = models.PositiveSmallIntegerField(default=0)
+    available = models.IntegerField(default=0)
+    reserved = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'shard'], name='unique_stock_shard'),
+            models.CheckConstraint(condition=Q(available__gte=0), name='stock_available_non_negative'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id}#{self.shard}: {self.available} available, {self.reserved} reserved'
+
+class StockReservation(models.Model):
+    HELD = 'held'
+    COMMITTED = 'committed'
+    RELEASED = 'released'
+    STATUS_CHOICES = [(HELD, 'Held'), (COMMITTED, 'Committed'), (RELEASED, 'Released')]
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='stock_reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    shard = models.PositiveSmallIntegerField(default=0)
+    quantity = models.IntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=HELD)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='reservation_expiry_idx'),
+        ]
+
+class PaymentEvent(models.Model):
+    """Raw Razorpay webhook deliveries, stored as received and finalized later by a worker."""
+    event_id = models.CharField(max_length=100, unique=True)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    # Failed events are retried with exponential backoff (api.tasks.retry_delay).
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['next_attempt_at', 'id'], condition=Q(processed_at__isnull=True), name='paymentevent_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.event_type} {self.event_id}'
+
+class Task(models.Model):
+    """A queued background job, run by the runworker command."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='task_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
+
 class WishlistItem(models.Model):
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -98,6 +431,11 @@ class WishlistItem(models.Model):
 
     class Meta:
         unique_together = ('user', 'product')
+        indexes = [
+            # Serves the newest-first wishlist page; the unique index above
+            # already covers product-id lookups by user.
+            models.Index(fields=['user', '-id'], name='wishlist_user_recent_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user.username} wishes for {self.product.name}'
@@ -107,22 +445,47 @@ class Banner(models.Model):
     name = models.CharField(max_length=100, unique=True, help_text="homepage-banner")
     image = CloudinaryField('banner_image')
     alt_text = models.CharField(max_length=200, default="E-commerce banner")
+    image_url = models.CharField(max_length=500, blank=True, default='')
+    mobile_image_url = models.CharField(max_length=500, blank=True, default='')
 
     def __str__(self):
         return self.name
-    
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        store_image_urls(self, BANNER_IMAGE_VARIANTS)
+
     @property
     def imageURL(self):
-        if self.image and hasattr(self.image, 'url'):
-            try:
-                optimized_url = cloudinary.CloudinaryImage(self.image.public_id).build_url(
-                    transformation=[
-                        {'width': 1920, 'crop': 'limit'},
-                        {'quality': 'auto'},
-                        {'fetch_format': 'auto'}
-                    ]
-                )
-                return optimized_url
-            except Exception:
-                return self.image.url
-        return ""
+        return self.image_url or build_image_url(self.image, BANNER_IMAGE_VARIANTS['image_url'])
+
+class DailySales(models.Model):
+    """Completed orders per day, maintained by api.analytics.refresh_rollups."""
+    day = models.DateField(unique=True)
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    units = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.day}: {self.orders} orders, {self.revenue}'
+
+class DailyProductSales(models.Model):
+    """Units and revenue per product per day, maintained by api.analytics.refresh_rollups."""
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product'], name='unique_daily_product_sales'),
+        ]
+
+    def __str__(self):
+        return f'{self.day} {self.product_id}: {self.units} units'
+
+class SalesRollupState(models.Model):
+    """The (completed_at, id) of the last order folded into the rollups; a single row."""
+    last_completed_at = models.DateTimeField(null=True, blank=True)
+    last_order_id = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
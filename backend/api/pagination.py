@@ -0,0 +1,30 @@
+from rest_framework.pagination import CursorPagination
+
+from api.search import SEARCH_RANK
+
+
+class ProductCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the primary key, so the cost of a page does not
+    grow with how deep into the catalog the client has scrolled. The page
+    size defaults to REST_FRAMEWORK['PAGE_SIZE']. Search results are paged
+    by their (unique) search rank instead, best match first.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        if SEARCH_RANK in queryset.query.annotations:
+            return (SEARCH_RANK,)
+        return super().get_ordering(request, queryset, view)
+
+
+class WishlistCursorPagination(CursorPagination):
+    """
+    Newest first. Ids are handed out in the order items are added, so '-id'
+    sorts like '-added_at' while giving the cursor a unique key.
+    """
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
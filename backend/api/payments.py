@@ -0,0 +1,192 @@
+"""
+Payment gateway wrapper around the Razorpay client.
+
+RazorpayGateway gives the SDK a pooled requests session and explicit
+connect/read timeouts, retries transient failures a bounded number of
+times, and keys order creation on the receipt so a retry after a timed-out
+(but actually successful) call reuses the order Razorpay already created
+instead of opening a second one. A circuit breaker stops calling Razorpay
+for a while after repeated failures so checkout fails fast rather than
+tying up workers. AsyncPaymentGateway lets the async start_payment view
+(api.async_views) await order creation on a worker thread under ASGI.
+"""
+import logging
+import threading
+import time
+
+import razorpay
+import requests
+from razorpay.errors import GatewayError, ServerError, SignatureVerificationError
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentGatewayError(Exception):
+    pass
+
+
+class GatewayUnavailable(PaymentGatewayError):
+    """Razorpay could not be reached, or the circuit breaker is open."""
+
+
+class AmountMismatch(PaymentGatewayError):
+    """A payment for a different amount than the order now totals, e.g. the cart grew after checkout began."""
+
+
+def check_amount(order, amount):
+    """Raise AmountMismatch unless amount (in paise) settles the order; None means unknown and passes."""
+    if amount is not None and int(amount) != order.amount_in_paise:
+        raise AmountMismatch(f'Order {order.pk} totals {order.amount_in_paise} paise but {amount} were paid')
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+
+    @property
+    def is_open(self):
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            # After reset_timeout the breaker is half-open and lets a trial call through.
+            return time.monotonic() - self._opened_at < self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+TRANSIENT_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    # An error page that is not JSON, typically from a proxy in front of Razorpay.
+    requests.exceptions.InvalidJSONError,
+    ServerError,
+    GatewayError,
+)
+
+
+class RazorpayGateway:
+    def __init__(self, key_id, key_secret, base_url=None, connect_timeout=3.05, read_timeout=10.0,
+                 max_retries=2, backoff=0.25, pool_size=10, breaker=None):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        options = {'base_url': base_url} if base_url else {}
+        self.client = razorpay.Client(session=session, auth=(key_id, key_secret), **options)
+        self.key_id = key_id
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+
+    def _call(self, operation):
+        if self.breaker.is_open:
+            raise GatewayUnavailable('Payment gateway is temporarily unavailable.')
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = operation(attempt)
+            except TRANSIENT_ERRORS as exc:
+                self.breaker.record_failure()
+                logger.warning('Razorpay call failed (attempt %s): %s', attempt + 1, exc)
+                if attempt == self.max_retries or self.breaker.is_open:
+                    raise GatewayUnavailable(str(exc)) from exc
+                time.sleep(self.backoff * 2 ** attempt)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def _find_order(self, receipt, amount):
+        existing = self.client.order.all({'receipt': receipt}, timeout=self.timeout)
+        for order in existing.get('items', []):
+            if order.get('amount') == amount and order.get('status') == 'created':
+                return order
+        return None
+
+    def create_order(self, amount, currency, receipt):
+        """Create (or reuse) the Razorpay order for this receipt and amount."""
+        cache_key = f'razorpay:order:{receipt}:{amount}:{currency}'
+        cached = cache.get(cache_key)
+        if cached:
+            return cached
+
+        def attempt(number):
+            if number:
+                # The previous attempt may have reached Razorpay before failing.
+                found = self._find_order(receipt, amount)
+                if found:
+                    return found
+            return self.client.order.create({
+                'amount': amount,
+                'currency': currency,
+                'receipt': receipt,
+                'payment_capture': '1',
+            }, timeout=self.timeout)
+
+        order = self._call(attempt)
+        cache.set(cache_key, order, timeout=60 * 60)
+        return order
+
+    def verify_payment_signature(self, params):
+        # Pure HMAC check on our side; no network call involved.
+        return self.client.utility.verify_payment_signature(params)
+
+    def verify_webhook_signature(self, body, signature, secret):
+        if not secret or not signature:
+            raise SignatureVerificationError('Missing webhook secret or signature')
+        return self.client.utility.verify_webhook_signature(body, signature, secret)
+
+
+class AsyncPaymentGateway:
+    """Awaitable facade over a gateway; calls run on threads outside the event loop."""
+
+    def __init__(self, gateway):
+        self.gateway = gateway
+
+    async def create_order(self, amount, currency, receipt):
+        return await sync_to_async(self.gateway.create_order, thread_sensitive=False)(amount, currency, receipt)
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_payment_gateway():
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = RazorpayGateway(
+                    settings.RAZORPAY_KEY_ID,
+                    settings.RAZORPAY_KEY_SECRET,
+                    base_url=settings.RAZORPAY_BASE_URL,
+                    connect_timeout=settings.RAZORPAY_CONNECT_TIMEOUT,
+                    read_timeout=settings.RAZORPAY_READ_TIMEOUT,
+                    max_retries=settings.RAZORPAY_MAX_RETRIES,
+                    pool_size=settings.RAZORPAY_POOL_SIZE,
+                    breaker=CircuitBreaker(
+                        settings.RAZORPAY_BREAKER_THRESHOLD,
+                        settings.RAZORPAY_BREAKER_RESET,
+                    ),
+                )
+    return _gateway
+
+
+def get_async_payment_gateway():
+    return AsyncPaymentGateway(get_payment_gateway())
@@ -0,0 +1,119 @@
+"""
+Read-replica routing.
+
+Only reads that can tolerate replication lag go to a replica: the views
+that opt in with ReplicaReadMixin (or the replica_reads decorator for
+plain and async views) flag the current context, and ReplicaRouter sends
+that context's reads to a random entry of settings.DATABASE_REPLICAS.
+Writes, and reads everywhere else (cart, checkout, payments), stay on
+default. With no replicas configured nothing is routed to a replica.
+
+Replicas lag, so a customer who has just written (a cart change, a
+payment) is pinned to the primary for REPLICA_PIN_SECONDS: the pin lives
+in the shared cache, is set by ReadYourWritesMiddleware after any
+successful unsafe request and by the payment webhook worker, and is
+checked once the replica-reading view knows who is asking.
+
+Shared cache entries (api.cache.versioned_cache) outlive any replication
+lag, so they are always built under primary_reads(): a generation bumped
+by a write is never refilled from a replica that has not seen it yet.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def use_replicas(enabled=True):
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def primary_reads():
+    """Read from default inside the block, even within a replica-reading view."""
+    return use_replicas(False)
+
+
+def _pin_key(user_id):
+    return f'db:pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    if settings.DATABASE_REPLICAS:
+        cache.set(_pin_key(user_id), 1, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+async def apin_to_primary(user_id):
+    if settings.DATABASE_REPLICAS:
+        await cache.aset(_pin_key(user_id), 1, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def read_primary_if_pinned(user_id):
+    """Send the rest of this replica-reading context to the primary if the user wrote recently."""
+    if _replica_reads.get() and settings.DATABASE_REPLICAS and cache.get(_pin_key(user_id)):
+        _replica_reads.set(False)
+
+
+async def aread_primary_if_pinned(user_id):
+    if _replica_reads.get() and settings.DATABASE_REPLICAS and await cache.aget(_pin_key(user_id)):
+        _replica_reads.set(False)
+
+
+def replica_reads(view):
+    """Route a function view's reads to replicas; works on sync and async views."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapped(*args, **kwargs):
+            with use_replicas():
+                return await view(*args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            with use_replicas():
+                return view(*args, **kwargs)
+    return wrapped
+
+
+class ReplicaReadMixin:
+    """For read-only DRF views whose data may lag the primary by a moment."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with use_replicas():
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Authentication has run by now, so we know whose pin to check.
+        if request.user.is_authenticated:
+            read_primary_if_pinned(request.user.id)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        # No opinion: Django follows the instance hint, so related objects
+        # of a row read from a replica come from the same replica, and
+        # falls back to default otherwise.
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as default.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
@@ -0,0 +1,260 @@
+"""
+Pluggable product search.
+
+On Postgres, PostgresSearchBackend ranks full-text matches with
+SearchVector/SearchQuery and falls back to trigram similarity for typos;
+both are served by the GIN indexes created in migration 0014. Other
+databases use InMemorySearchBackend, an inverted index over product names
+that is built on first use and kept current by product save/delete
+signals. That index lives in the process, so it is meant for SQLite
+development setups rather than multi-worker deployments. Writes that skip
+the signals (bulk_create, QuerySet.update) call invalidate_search_index,
+which bumps a version in the shared cache; every process compares it on
+each query and rebuilds its index when it moved.
+
+Both the product list's ?search= (api.filters.ProductSearchFilter) and
+/products/search/ are answered by the configured backend. For the list,
+rank_queryset narrows the queryset to the matches and annotates each with
+a unique SEARCH_RANK (1 is the best match), which ProductCursorPagination
+then pages by. Postgres ranks every match in SQL; the in-memory backend
+hands its best max_results ids to the database, so past that a dev
+catalog stops matching.
+
+The backend can be forced with settings.PRODUCT_SEARCH_BACKEND (a dotted
+path); by default it is picked from the database vendor.
+"""
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When, Window
+from django.db.models.functions import RowNumber
+from django.utils.module_loading import import_string
+
+from api.cache import get_version, invalidate_on_commit
+from api.models import Product
+
+INDEX_RESOURCE = 'search-index'
+SEARCH_RANK = 'search_rank'
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def invalidate_search_index():
+    """Make every process's in-memory index rebuild after bulk product writes."""
+    invalidate_on_commit(INDEX_RESOURCE)
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall((text or '').lower())
+
+
+def _in_order(product_ids):
+    products = Product.objects.in_bulk(product_ids)
+    return [products[pk] for pk in product_ids if pk in products]
+
+
+class PostgresSearchBackend:
+    trigram_threshold = 0.3
+
+    ordering = [F('rank').desc(), F('similarity').desc(), F('id').asc()]
+
+    def _matches(self, queryset, query):
+        from django.contrib.postgres.search import (
+            SearchQuery, SearchRank, SearchVector, TrigramSimilarity,
+        )
+
+        vector = SearchVector('name', config='english')
+        search_query = SearchQuery(query, config='english', search_type='websearch')
+        return (
+            queryset.annotate(
+                document=vector,
+                rank=SearchRank(vector, search_query),
+                similarity=TrigramSimilarity('name', query),
+            )
+            .filter(Q(document=search_query) | Q(name__trigram_similar=query))
+        )
+
+    def search(self, query, limit):
+        return list(self._matches(Product.objects.all(), query).order_by(*self.ordering)[:limit])
+
+    def rank_queryset(self, queryset, query):
+        return self._matches(queryset, query).annotate(
+            **{SEARCH_RANK: Window(RowNumber(), order_by=self.ordering)}
+        )
+
+    def autocomplete(self, prefix, limit):
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        return list(
+            Product.objects.filter(name__icontains=prefix)
+            .annotate(similarity=TrigramSimilarity('name', prefix))
+            .order_by('-similarity', 'id')
+            .values('id', 'name')[:limit]
+        )
+
+    def index_product(self, product):
+        pass
+
+    def remove_product(self, product_id):
+        pass
+
+
+class InMemorySearchBackend:
+    """Inverted index of name tokens with prefix matching and tf-idf ranking."""
+
+    exact_weight = 2.0
+    prefix_weight = 1.0
+    max_results = 1000
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._built = False
+            self._version = None
+            self._postings = defaultdict(dict)
+            self._doc_tokens = {}
+            self._names = {}
+            self._vocabulary = []
+            self._vocabulary_dirty = False
+
+    def _ensure_built(self):
+        version = get_version(INDEX_RESOURCE)
+        if self._built and self._version == version:
+            return
+        with self._lock:
+            if self._built and self._version == version:
+                return
+            self.reset()
+            self._version = version
+            for product_id, name in Product.objects.values_list('id', 'name').iterator(chunk_size=2000):
+                self._add(product_id, name)
+            self._built = True
+
+    def _add(self, product_id, name):
+        tokens = tokenize(name)
+        self._doc_tokens[product_id] = tokens
+        self._names[product_id] = name
+        for token in tokens:
+            postings = self._postings[token]
+            postings[product_id] = postings.get(product_id, 0) + 1
+        self._vocabulary_dirty = True
+
+    def _discard(self, product_id):
+        for token in self._doc_tokens.pop(product_id, ()):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(product_id, None)
+                if not postings:
+                    del self._postings[token]
+        self._names.pop(product_id, None)
+        self._vocabulary_dirty = True
+
+    def index_product(self, product):
+        with self._lock:
+            if not self._built:
+                return
+            self._discard(product.pk)
+            self._add(product.pk, product.name)
+
+    def remove_product(self, product_id):
+        with self._lock:
+            if self._built:
+                self._discard(product_id)
+
+    def _expand(self, term):
+        """Vocabulary tokens starting with term, found by bisecting the sorted vocabulary."""
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        start = bisect_left(self._vocabulary, term)
+        matches = []
+        for token in self._vocabulary[start:]:
+            if not token.startswith(term):
+                break
+            matches.append(token)
+        return matches
+
+    def _score(self, terms):
+        total_docs = max(len(self._doc_tokens), 1)
+        scores = None
+        for term in terms:
+            term_scores = defaultdict(float)
+            for token in self._expand(term):
+                postings = self._postings[token]
+                idf = math.log(1 + total_docs / len(postings))
+                weight = self.exact_weight if token == term else self.prefix_weight
+                for product_id, frequency in postings.items():
+                    term_scores[product_id] += weight * frequency * idf
+            # Every query term has to match, either exactly or as a prefix.
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {pk: score + term_scores[pk] for pk, score in scores.items() if pk in term_scores}
+            if not scores:
+                return {}
+        return scores or {}
+
+    def search_ids(self, query, limit):
+        """Ids of the best matches, best first."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        self._ensure_built()
+        with self._lock:
+            scores = self._score(terms)
+        return sorted(scores, key=lambda pk: (-scores[pk], pk))[:limit]
+
+    def search(self, query, limit):
+        return _in_order(self.search_ids(query, limit))
+
+    def rank_queryset(self, queryset, query):
+        ids = self.search_ids(query, self.max_results)
+        if not ids:
+            return queryset.none()
+        rank = Case(
+            *(When(id=pk, then=Value(position)) for position, pk in enumerate(ids, 1)),
+            output_field=IntegerField(),
+        )
+        return queryset.filter(id__in=ids).annotate(**{SEARCH_RANK: rank})
+
+    def autocomplete(self, prefix, limit):
+        terms = tokenize(prefix)
+        if not terms:
+            return []
+        self._ensure_built()
+        with self._lock:
+            scores = self._score(terms)
+            lowered = prefix.strip().lower()
+            # Names that start with what was typed come first, then by relevance.
+            ranked = sorted(
+                scores,
+                key=lambda pk: (not (self._names[pk] or '').lower().startswith(lowered), -scores[pk], pk),
+            )[:limit]
+            return [{'id': pk, 'name': self._names[pk]} for pk in ranked]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', '')
+                if path:
+                    _backend = import_string(path)()
+                elif connection.vendor == 'postgresql':
+                    _backend = PostgresSearchBackend()
+                else:
+                    _backend = InMemorySearchBackend()
+    return _backend
@@ -12,9 +12,27 @@ class UserSerializer(serializers.ModelSerializer):
 
 class ProductSerializer(serializers.ModelSerializer):
     image = serializers.CharField(source='imageURL', read_only=True)
+    thumbnail = serializers.CharField(source='thumbnail_url', read_only=True)
+    image_2x = serializers.CharField(source='image_url_2x', read_only=True)
     class Meta:
         model=Product
-        fields=['id','name', 'price', 'digital', 'image']
+        fields=['id','name', 'price', 'digital', 'image', 'thumbnail', 'image_2x']
+
+class CustomerProductSerializer(ProductSerializer):
+    """ProductSerializer plus the requesting customer's wishlist and cart state."""
+    in_wishlist = serializers.BooleanField(read_only=True)
+    cart_quantity = serializers.SerializerMethodField()
+
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + ['in_wishlist', 'cart_quantity']
+
+    def get_cart_quantity(self, obj):
+        # Write-behind cart stores pass their quantities in; otherwise the
+        # queryset was annotated by Product.objects.with_customer_state.
+        quantities = self.context.get('cart_quantities')
+        if quantities is not None:
+            return quantities.get(obj.pk, 0)
+        return obj.cart_quantity
 
 class OrderItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
@@ -31,10 +49,24 @@ class OrderItemSerializer(serializers.ModelSerializer):
                 'name': '[Product no longer available]',
                 'price': '0.00',
                 'digital': False,
-                'image': None
+                'image': None,
+                'thumbnail': None,
+                'image_2x': None,
             }
         return representation
 
+class CartOperationSerializer(serializers.Serializer):
+    productId = serializers.IntegerField()
+    action = serializers.ChoiceField(choices=['add', 'remove', 'set'], required=False)
+    quantity = serializers.IntegerField(required=False, min_value=0)
+
+    def validate(self, attrs):
+        if 'action' not in attrs and 'quantity' not in attrs:
+            raise serializers.ValidationError('Each operation needs an action or a quantity.')
+        if attrs.get('action') == 'set' and 'quantity' not in attrs:
+            raise serializers.ValidationError('quantity is required for the set action.')
+        return attrs
+
 class ShippingAddressSerializer(serializers.ModelSerializer):
     class Meta:
         model = ShippingAddress
@@ -57,7 +89,7 @@ class OrderSerializer(serializers.ModelSerializer):
     def get_shipping_address(self, obj):
 
         try:
-            address = obj.shippingaddress_set.first()
+            address = obj.shipping_address
             return ShippingAddressSerializer(address).data
         except:
             return None
@@ -69,8 +101,11 @@ class WishlistItemSerializer(serializers.ModelSerializer):
         model = WishlistItem
         fields = ['id', 'product']
 
+class WishlistBulkSerializer(serializers.Serializer):
+    product_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=200)
+
 class BannerSerializer(serializers.ModelSerializer):
     image_url = serializers.CharField(source='imageURL', read_only=True)
     class Meta:
         model = Banner
-        fields = ['name', 'image_url', 'alt_text']
\ No newline at end of file
+        fields = ['name', 'image_url', 'mobile_image_url', 'alt_text']
\ No newline at end of file
@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from api.authentication import invalidate_user_on_commit
+from api.cache import invalidate_on_commit
+from api.models import Banner, Order, Product, User, WishlistItem
+from api.search import get_search_backend
+from api.wishlist import invalidate_wishlist_ids
+
+
+def _open_orders_with(product):
+    return Order.objects.filter(completed=False, orderitem__product=product).distinct()
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_cache(sender, **kwargs):
+    invalidate_on_commit('products')
+
+
+@receiver([post_save, post_delete], sender=Banner)
+def invalidate_banner_cache(sender, **kwargs):
+    invalidate_on_commit('banner')
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user_on_commit(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=WishlistItem)
+def invalidate_wishlist_ids_cache(sender, instance, **kwargs):
+    invalidate_wishlist_ids(instance.user_id)
+
+
+@receiver(post_save, sender=Product)
+def index_product_for_search(sender, instance, **kwargs):
+    # On commit, so a rolled-back save leaves no phantom entry behind.
+    transaction.on_commit(lambda: get_search_backend().index_product(instance))
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product_for_search(sender, instance, **kwargs):
+    # The delete clears instance.pk once the signals have run.
+    product_id = instance.pk
+    transaction.on_commit(lambda: get_search_backend().remove_product(product_id))
+
+
+@receiver(post_save, sender=Product)
+def refresh_open_cart_totals(sender, instance, created, **kwargs):
+    # Stored cart totals are priced at the time of the change, so a price
+    # edit in the admin has to be pushed into every open cart holding it.
+    if created:
+        return
+    for order in _open_orders_with(instance):
+        order.recalculate_totals()
+
+
+@receiver(pre_delete, sender=Product)
+def remember_open_carts(sender, instance, **kwargs):
+    instance._open_order_ids = list(_open_orders_with(instance).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def refresh_carts_after_delete(sender, instance, **kwargs):
+    for order in Order.objects.filter(pk__in=getattr(instance, '_open_order_ids', [])):
+        order.recalculate_totals()
@@ -0,0 +1,125 @@
+"""
+A small database-backed task queue for work that should not delay a
+request, such as post-checkout side effects.
+
+Functions decorated with @task gain .delay(), which enqueues a Task row
+once the surrounding transaction commits, so a worker never sees work for
+data that was rolled back. The runworker command claims due tasks and runs
+them on a thread or process pool; a failing task is retried with
+exponential backoff until max_attempts. With settings.TASKS_ALWAYS_EAGER
+the task runs in-process on commit instead, which is what the tests use.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from api.models import Order, Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class TaskFunction:
+    def __init__(self, func, max_attempts):
+        self.func = func
+        self.max_attempts = max_attempts
+        self.name = f'{func.__module__}.{func.__name__}'
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Enqueue the task once the current transaction commits."""
+        if getattr(settings, 'TASKS_ALWAYS_EAGER', False):
+            transaction.on_commit(lambda: self.func(*args, **kwargs))
+        else:
+            transaction.on_commit(lambda: enqueue(self.name, args, kwargs, self.max_attempts))
+
+
+def task(func=None, *, max_attempts=5):
+    def register(func):
+        wrapped = TaskFunction(func, max_attempts)
+        _registry[wrapped.name] = wrapped
+        return wrapped
+    return register(func) if func else register
+
+
+def enqueue(name, args=(), kwargs=None, max_attempts=5):
+    return Task.objects.create(name=name, args=list(args), kwargs=kwargs or {}, max_attempts=max_attempts)
+
+
+def _resolve(name):
+    if name not in _registry:
+        import_string(name)
+    return _registry[name]
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(2 ** attempts, 3600))
+
+
+def claim_tasks(limit, lock_timeout=timedelta(minutes=10)):
+    """Mark up to limit due tasks as running and return their ids."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=Task.PENDING, run_after__lte=now)
+                # Tasks whose worker died mid-run become claimable again.
+                | Q(status=Task.RUNNING, locked_at__lt=now - lock_timeout)
+            )
+            .order_by('run_after', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        Task.objects.filter(id__in=ids).update(status=Task.RUNNING, locked_at=now)
+    return ids
+
+
+def execute_task(task_id):
+    """Run one claimed task and record its outcome; returns True on success."""
+    job = Task.objects.get(pk=task_id)
+    job.attempts += 1
+    try:
+        _resolve(job.name).func(*job.args, **job.kwargs)
+    except Exception as exc:
+        logger.warning('Task %s (%s) failed on attempt %s: %s', job.pk, job.name, job.attempts, exc)
+        job.last_error = repr(exc)
+        if job.attempts >= job.max_attempts:
+            job.status = Task.FAILED
+            job.finished_at = timezone.now()
+        else:
+            job.status = Task.PENDING
+            job.run_after = timezone.now() + retry_delay(job.attempts)
+        job.save(update_fields=['attempts', 'status', 'run_after', 'last_error', 'finished_at'])
+        return False
+    job.status = Task.DONE
+    job.finished_at = timezone.now()
+    job.last_error = ''
+    job.save(update_fields=['attempts', 'status', 'last_error', 'finished_at'])
+    return True
+
+
+@task
+def send_order_confirmation(order_id):
+    order = Order.objects.select_related('customer').get(pk=order_id)
+    if not order.customer or not order.customer.email:
+        return
+    send_mail(
+        subject=f'Order #{order.pk} confirmed',
+        message=f'Thanks for your order of {order.item_count} item(s) totalling {order.total}.',
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[order.customer.email],
+    )
+
+
+def on_order_completed(order):
+    """Enqueue everything that follows a completed checkout."""
+    send_order_confirmation.delay(order.pk)
@@ -0,0 +1,16 @@
+import pytest
+from django.core.cache import cache
+
+from api.authentication import local_users, verified_tokens
+
+
+@pytest.fixture(autouse=True)
+def reset_auth_caches():
+    # Test transactions never commit, so the on_commit invalidation that
+    # normally follows a User save never runs; start every test cold.
+    local_users.clear()
+    verified_tokens.clear()
+    cache.clear()
+    yield
+    local_users.clear()
+    verified_tokens.clear()
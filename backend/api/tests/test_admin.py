@@ -0,0 +1,84 @@
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from api.admin import EstimatedCountPaginator
+from api.models import Order, OrderItem, Product, ShippingAddress, WishlistItem
+
+
+def _seed(django_user_model, count, prefix="user"):
+    for i in range(count):
+        user = django_user_model.objects.create_user(username=f"{prefix}{i}", password="pass", phone="1")
+        product = Product.objects.create(name=f"Product {i}", price=10)
+        order = Order.objects.create(customer=user, completed=True)
+        OrderItem.objects.create(order=order, product=product, quantity=1)
+        ShippingAddress.objects.create(customer=user, order=order, city="Kochi")
+        WishlistItem.objects.create(user=user, product=product)
+
+
+@pytest.fixture
+def admin_client(django_user_model):
+    client = Client()
+    client.force_login(django_user_model.objects.create_superuser(username="admin", password="pass", phone="0"))
+    return client
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('model', ['order', 'orderitem', 'shippingaddress', 'wishlistitem'])
+def test_changelist_queries_do_not_grow_with_rows(admin_client, django_user_model, model):
+    url = f'/admin/api/{model}/'
+    _seed(django_user_model, 2)
+    with CaptureQueriesContext(connection) as small:
+        assert admin_client.get(url).status_code == 200
+
+    _seed(django_user_model, 8, prefix="more")
+    with CaptureQueriesContext(connection) as large:
+        response = admin_client.get(url)
+
+    assert response.status_code == 200
+    assert len(large) == len(small)
+
+
+@pytest.mark.django_db
+def test_estimated_count_paginator_counts_exactly_off_postgres(django_user_model):
+    _seed(django_user_model, 3)
+    paginator = EstimatedCountPaginator(Order.objects.order_by('-id'), 2)
+
+    assert paginator.estimated_count() is None
+    assert paginator.count == 3
+
+
+@pytest.mark.django_db
+def test_estimated_count_paginator_trusts_large_estimates(monkeypatch):
+    monkeypatch.setattr(EstimatedCountPaginator, 'estimated_count', lambda self: 2_500_000)
+    assert EstimatedCountPaginator(Order.objects.all(), 100).count == 2_500_000
+
+    monkeypatch.setattr(EstimatedCountPaginator, 'estimated_count', lambda self: 40)
+    with CaptureQueriesContext(connection) as queries:
+        assert EstimatedCountPaginator(Order.objects.all(), 100).count == 0
+    assert len(queries) == 1
+
+
+@pytest.mark.django_db
+def test_admin_line_item_changes_refresh_order_totals(admin_client, django_user_model):
+    user = django_user_model.objects.create_user(username="shopper", password="pass", phone="1")
+    order = Order.objects.create(customer=user)
+    lamp = Product.objects.create(name="Lamp", price=10)
+    ebook = Product.objects.create(name="Ebook", price=4, digital=True)
+    before = order.updated_at
+
+    response = admin_client.post('/admin/api/orderitem/add/', {'order': order.id, 'product': lamp.id, 'quantity': 3})
+    assert response.status_code == 302
+    order.refresh_from_db()
+    assert (order.total, order.item_count, order.requires_shipping) == (30, 3, True)
+    assert order.updated_at > before
+
+    item = OrderItem.objects.get(order=order)
+    admin_client.post(f'/admin/api/orderitem/{item.id}/change/', {'order': order.id, 'product': ebook.id, 'quantity': 2})
+    order.refresh_from_db()
+    assert (order.total, order.item_count, order.requires_shipping) == (8, 2, False)
+
+    admin_client.post(f'/admin/api/orderitem/{item.id}/delete/', {'post': 'yes'})
+    order.refresh_from_db()
+    assert (order.total, order.item_count) == (0, 0)
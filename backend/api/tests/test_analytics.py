@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.analytics import check_rollups, refresh_rollups
+from api.models import DailyProductSales, DailySales, Order, OrderItem, Product
+
+DAY_ONE = datetime(2026, 3, 1, 10, tzinfo=dt_timezone.utc)
+DAY_TWO = DAY_ONE + timedelta(days=1)
+
+
+@pytest.fixture
+def products():
+    return Product.objects.create(name="Lamp", price=10), Product.objects.create(name="Rug", price=25)
+
+
+def _order(user, completed_at, lines):
+    order = Order.objects.create(customer=user, completed=True, completed_at=completed_at)
+    for product, quantity in lines:
+        OrderItem.objects.create(order=order, product=product, quantity=quantity)
+    order.recalculate_totals()
+    return order
+
+
+@pytest.mark.django_db
+def test_refresh_folds_only_new_completed_orders(django_user_model, products):
+    lamp, rug = products
+    user = django_user_model.objects.create_user(username="buyer", password="pass", phone="1")
+    _order(user, DAY_ONE, [(lamp, 2)])
+    _order(user, DAY_ONE, [(lamp, 1), (rug, 1)])
+    Order.objects.create(customer=user, completed=False)
+
+    assert refresh_rollups() == 2
+    day = DailySales.objects.get(day=DAY_ONE.date())
+    assert (day.orders, day.revenue, day.units) == (2, Decimal('55'), 4)
+    assert DailyProductSales.objects.get(day=DAY_ONE.date(), product=lamp).units == 3
+
+    _order(user, DAY_TWO, [(rug, 2)])
+    assert refresh_rollups() == 1
+    assert refresh_rollups() == 0
+    assert DailySales.objects.get(day=DAY_ONE.date()).orders == 2
+    assert DailyProductSales.objects.get(day=DAY_TWO.date(), product=rug).revenue == Decimal('50')
+    assert check_rollups() == []
+
+
+@pytest.mark.django_db
+def test_recent_orders_wait_for_the_rollup_lag(django_user_model, products, settings):
+    settings.ANALYTICS_ROLLUP_LAG = 300
+    user = django_user_model.objects.create_user(username="buyer", password="pass", phone="1")
+    _order(user, timezone.now(), [(products[0], 1)])
+
+    assert refresh_rollups() == 0
+    settings.ANALYTICS_ROLLUP_LAG = 0
+    assert refresh_rollups() == 1
+
+
+@pytest.mark.django_db
+def test_check_reports_drift_and_rebuild_fixes_it(django_user_model, products):
+    user = django_user_model.objects.create_user(username="buyer", password="pass", phone="1")
+    _order(user, DAY_ONE, [(products[0], 1)])
+    call_command('refresh_sales_rollups', '--check')
+
+    DailySales.objects.filter(day=DAY_ONE.date()).update(orders=5)
+    [mismatch] = check_rollups()
+    assert mismatch['expected']['orders'] == 1 and mismatch['actual']['orders'] == 5
+    with pytest.raises(CommandError):
+        call_command('refresh_sales_rollups', '--check')
+
+    call_command('refresh_sales_rollups', '--rebuild', '--check')
+    assert DailySales.objects.get(day=DAY_ONE.date()).orders == 1
+
+
+@pytest.mark.django_db
+def test_analytics_endpoints_are_staff_only_and_read_the_rollups(django_user_model, products):
+    lamp, rug = products
+    user = django_user_model.objects.create_user(username="buyer", password="pass", phone="1")
+    staff = django_user_model.objects.create_user(username="staff", password="pass", phone="2", is_staff=True)
+    _order(user, DAY_ONE, [(lamp, 3)])
+    _order(user, DAY_TWO, [(rug, 1)])
+    refresh_rollups()
+    client = APIClient()
+
+    client.force_authenticate(user=user)
+    assert client.get('/api/analytics/daily/').status_code == 403
+
+    client.force_authenticate(user=staff)
+    response = client.get('/api/analytics/daily/?start=2026-03-01&end=2026-03-02')
+    assert response.status_code == 200
+    assert [row['orders'] for row in response.data['results']] == [1, 1]
+    assert response.data['totals']['revenue'] == Decimal('55')
+    assert response.data['as_of'] == DAY_TWO
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get('/api/analytics/top-products/?start=2026-03-01&end=2026-03-02&by=units')
+    assert [row['name'] for row in response.data['results']] == ['Lamp', 'Rug']
+    assert not any('api_orderitem' in q['sql'] for q in queries.captured_queries)
+
+    assert client.get('/api/analytics/daily/?start=2026-03-05&end=2026-03-01').status_code == 400
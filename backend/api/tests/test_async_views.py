@@ -0,0 +1,80 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import Order, OrderItem, Product, WishlistItem
+
+pytestmark = pytest.mark.urls('Ecommerce.asgi_urls')
+
+
+def bearer(user):
+    return {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+
+@pytest.mark.django_db
+def test_async_product_list_matches_sync_pages():
+    from api.views import ProductListView
+    for i in range(5):
+        Product.objects.create(name=f'Item {i}', price=i + 1, digital=i % 2 == 0)
+    client = APIClient()
+
+    url = '/api/products/?digital=true&page_size=2'
+    while url:
+        cache.clear()
+        async_page = client.get(url).json()
+        cache.clear()
+        sync_page = ProductListView.as_view()(APIRequestFactory().get(url)).data
+        assert async_page == sync_page
+        url = async_page['next']
+    assert [p['name'] for p in client.get('/api/products/?search=item 3').json()['results']] == ['Item 3']
+    assert client.get('/api/products/?min_price=abc').status_code == 400
+    assert client.get('/api/products/?min_price=NaN').status_code == 400
+
+
+@pytest.mark.django_db
+def test_async_product_detail_honours_etag():
+    product = Product.objects.create(name='Lamp', price=10)
+    client = APIClient()
+
+    response = client.get(f'/api/products/{product.id}/')
+    assert response.status_code == 200
+    assert response.json()['name'] == 'Lamp'
+    assert client.get(f'/api/products/{product.id}/', HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+    assert client.get('/api/products/999999/').status_code == 404
+
+
+@pytest.mark.django_db
+def test_async_cart_and_wishlist_require_jwt(django_user_model):
+    user = django_user_model.objects.create_user(username='async', password='pass', phone='1')
+    product = Product.objects.create(name='Mug', price=4)
+    OrderItem.objects.create(order=Order.objects.create(customer=user), product=product, quantity=2)
+    WishlistItem.objects.create(user=user, product=product)
+    client = APIClient()
+
+    assert client.get('/api/cart/').status_code == 401
+    assert client.get('/api/cart/', HTTP_AUTHORIZATION='Bearer nonsense').status_code == 401
+
+    cart = client.get('/api/cart/', **bearer(user))
+    assert cart.status_code == 200
+    assert cart.json()['orderitems'][0]['quantity'] == 2
+    assert cart.json()['customer'] == str(user)
+
+    wishlist = client.get('/api/wishlist/', **bearer(user))
+    assert [item['product']['name'] for item in wishlist.json()['results']] == ['Mug']
+
+
+@pytest.mark.django_db
+def test_async_product_reads_carry_customer_state(django_user_model):
+    user = django_user_model.objects.create_user(username='async-state', password='pass', phone='1')
+    mug = Product.objects.create(name='Mug', price=4)
+    WishlistItem.objects.create(user=user, product=mug)
+    OrderItem.objects.create(order=Order.objects.create(customer=user), product=mug, quantity=2)
+    client = APIClient()
+
+    listed = client.get('/api/products/', **bearer(user)).json()['results'][0]
+    detail = client.get(f'/api/products/{mug.id}/', **bearer(user)).json()
+
+    assert (listed['in_wishlist'], listed['cart_quantity']) == (True, 2)
+    assert (detail['in_wishlist'], detail['cart_quantity']) == (True, 2)
+    assert 'in_wishlist' not in client.get('/api/products/').json()['results'][0]
@@ -0,0 +1,93 @@
+from unittest import mock
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from api.models import Order, Product, WishlistItem
+
+
+def bearer(user):
+    return {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+
+def user_queries(queries):
+    return [q['sql'] for q in queries if 'FROM "api_user"' in q['sql']]
+
+
+@pytest.mark.django_db
+def test_cart_loads_the_user_once_and_reloads_after_save(django_user_model, django_capture_on_commit_callbacks):
+    user = django_user_model.objects.create_user(username='cached', password='pass', phone='1')
+    Order.objects.create(customer=user)
+    client = APIClient()
+    headers = bearer(user)
+
+    with CaptureQueriesContext(connection) as first:
+        assert client.get('/api/cart/', **headers).status_code == 200
+    with CaptureQueriesContext(connection) as second:
+        assert client.get('/api/cart/', **headers).status_code == 200
+    assert len(user_queries(first.captured_queries)) == 1
+    assert user_queries(second.captured_queries) == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user.is_active = False
+        user.save()
+    assert client.get('/api/cart/', **headers).status_code == 401
+
+
+@pytest.mark.django_db
+def test_verified_tokens_skip_the_signature_check(django_user_model):
+    user = django_user_model.objects.create_user(username='sig', password='pass', phone='1')
+    client = APIClient()
+    headers = bearer(user)
+
+    with mock.patch.object(AccessToken, 'verify', autospec=True, side_effect=AccessToken.verify) as verify:
+        client.get('/api/cart/', **headers)
+        client.get('/api/cart/', **headers)
+    assert verify.call_count == 1
+
+
+@pytest.mark.django_db
+def test_claims_only_endpoints_never_read_the_user(django_user_model):
+    user = django_user_model.objects.create_user(username='claims', password='pass', phone='1')
+    product = Product.objects.create(name='Mug', price=4)
+    client = APIClient()
+    headers = bearer(user)
+
+    assert client.post('/api/wishlist/add/', {'product_id': product.id}, format='json', **headers).status_code == 201
+    with CaptureQueriesContext(connection) as ctx:
+        wishlist = client.get('/api/wishlist/', **headers)
+        orders = client.get('/api/orders/', **headers)
+
+    assert user_queries(ctx.captured_queries) == []
+    assert [item['product']['name'] for item in wishlist.data['results']] == ['Mug']
+    assert orders.status_code == 200
+    assert WishlistItem.objects.get().user_id == user.id
+
+
+@pytest.mark.django_db
+def test_writes_check_the_user_and_the_shared_cache_holds_no_password(django_user_model, django_capture_on_commit_callbacks):
+    from django.core.cache import cache
+
+    user = django_user_model.objects.create_user(username='writer', password='pass', phone='1')
+    product = Product.objects.create(name='Mug', price=4)
+    client = APIClient()
+    headers = bearer(user)
+
+    assert client.post('/api/wishlist/add/', {'product_id': product.id}, format='json', **headers).status_code == 201
+    cached = cache.get(f'auth:user:{user.id}')
+    assert set(cached) == {'id', 'username', 'is_active', 'is_staff', 'is_superuser', 'password_digest'}
+    assert user.password not in cached.values()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user.is_active = False
+        user.save()
+    response = client.post('/api/wishlist/remove/', {'product_id': product.id}, format='json', **headers)
+    assert response.status_code == 401
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user.delete()
+    response = client.post('/api/wishlist/bulk-add/', {'product_ids': [product.id]}, format='json', **headers)
+    assert response.status_code == 401
@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+from django.core.cache import cache
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from api.cache import _build_once, bump_version, get_version
+from api.models import Product
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db
+def test_product_list_revalidates_and_invalidates_on_save(django_capture_on_commit_callbacks):
+    product = Product.objects.create(name="Kettle", price=30)
+    client = APIClient()
+
+    first = client.get('/api/products/')
+    etag = first['ETag']
+    assert first.data['results'][0]['price'] == '30.00'
+    assert client.get('/api/products/', HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    with django_capture_on_commit_callbacks(execute=True):
+        product.price = 25
+        product.save()
+
+    second = client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+    assert second.status_code == 200
+    assert second['ETag'] != etag
+    assert second.data['results'][0]['price'] == '25.00'
+
+
+def test_bump_version_moves_to_a_new_generation():
+    version = get_version('products')
+    bump_version('products')
+    assert get_version('products') == version + 1
+
+
+def test_only_one_worker_rebuilds_a_missing_key():
+    key = 'api:test:v1:abc'
+    cache.add(f'{key}:lock', 1)
+    threading.Timer(0.1, cache.set, args=(key, {'built': 'elsewhere'})).start()
+
+    def build():
+        raise AssertionError("waiting worker should not rebuild")
+
+    response = _build_once(key, build, timeout=60, lock_timeout=10, wait=2.0)
+    assert response.data == {'built': 'elsewhere'}
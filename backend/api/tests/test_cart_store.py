@@ -0,0 +1,81 @@
+from decimal import Decimal
+
+import pytest
+from rest_framework.test import APIClient
+
+from api.cart_store import LocMemHashClient, RedisCartStore
+from api.models import Order, OrderItem, Product
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = RedisCartStore(LocMemHashClient())
+    monkeypatch.setattr('api.views.get_cart_store', lambda: store)
+    monkeypatch.setattr('api.management.commands.flush_carts.get_cart_store', lambda: store)
+    return store
+
+
+@pytest.fixture
+def shopper(django_user_model):
+    return django_user_model.objects.create_user(username="hot", password="pass", phone="1")
+
+
+@pytest.mark.django_db
+def test_redis_cart_is_written_back_only_on_persist(store, shopper):
+    client = APIClient()
+    client.force_authenticate(user=shopper)
+    book = Product.objects.create(name="Book", price="12.00", digital=False)
+    song = Product.objects.create(name="Song", price="1.50", digital=True)
+
+    client.post('/api/cart/update/', {'productId': book.id, 'action': 'add'}, format='json')
+    client.post('/api/cart/update/', {'productId': book.id, 'action': 'add'}, format='json')
+    response = client.post('/api/cart/batch/', {'operations': [{'productId': song.id, 'quantity': 3}]}, format='json')
+    assert response.data['get_cart_total'] == Decimal('28.50')
+    assert response.data['get_cart_items'] == 5
+    assert not OrderItem.objects.exists()
+
+    assert client.get('/api/cart/').data['orderitems'][0]['quantity'] == 2
+
+    store.persist(shopper)
+    order = Order.objects.get(customer=shopper, completed=False)
+    assert dict(order.orderitem_set.values_list('product__name', 'quantity')) == {"Book": 2, "Song": 3}
+    assert (order.total, order.item_count, order.requires_shipping) == (Decimal('28.50'), 5, True)
+
+
+@pytest.mark.django_db
+def test_flush_carts_persists_dirty_carts(store, shopper):
+    from django.core.management import call_command
+
+    lamp = Product.objects.create(name="Lamp", price="20.00", digital=False)
+    order = Order.objects.create(customer=shopper)
+    OrderItem.objects.create(order=order, product=lamp, quantity=1)
+
+    store.add_item(shopper, lamp)
+    call_command('flush_carts')
+
+    assert OrderItem.objects.get(order=order, product=lamp).quantity == 2
+    assert store.client.smembers(store.dirty_key) == set()
+
+
+@pytest.mark.django_db
+def test_hydration_keeps_concurrent_changes_and_expired_carts_leave_the_dirty_set(store, shopper):
+    lamp = Product.objects.create(name="Lamp", price="20.00", digital=False)
+    order = Order.objects.create(customer=shopper)
+    OrderItem.objects.create(order=order, product=lamp, quantity=1)
+    key = store._key(shopper)
+
+    # Another request hydrated and incremented between this one's empty read and its write.
+    real_hgetall = store.client.hgetall
+    def racing_hgetall(name):
+        raw = real_hgetall(name)
+        if not raw:
+            store.client.hset(name, mapping={store.loaded_field: 1, lamp.pk: 2})
+        return raw
+    store.client.hgetall = racing_hgetall
+    assert store.quantities(shopper) == {lamp.pk: 2}
+    store.client.hgetall = real_hgetall
+
+    store.client.sadd(store.dirty_key, shopper.pk)
+    store.client.delete(key)
+    store.persist(shopper)
+    assert store.client.smembers(store.dirty_key) == set()
@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.exports import CSV_COLUMNS, csv_stream
+from api.models import Order, OrderItem, Product, ShippingAddress
+
+
+def _orders(user, count, items_per_order=2):
+    for i in range(count):
+        order = Order.objects.create(customer=user, completed=True)
+        for j in range(items_per_order):
+            product = Product.objects.create(name=f"Product {i}-{j}", price=10)
+            OrderItem.objects.create(order=order, product=product, quantity=j + 1)
+        order.recalculate_totals()
+        ShippingAddress.objects.create(customer=user, order=order, address="1 Main St", city="Kochi", state="KL", zipcode="682001")
+
+
+def _body(response):
+    return b''.join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db
+def test_csv_export_has_one_row_per_line_of_the_callers_completed_orders(django_user_model):
+    user = django_user_model.objects.create_user(username="buyer", password="pass", phone="1")
+    other = django_user_model.objects.create_user(username="other", password="pass", phone="2")
+    _orders(user, 2)
+    _orders(other, 1)
+    Order.objects.create(customer=user, completed=False)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.get('/api/orders/export/')
+
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'text/csv'
+    assert 'attachment' in response['Content-Disposition']
+    rows = list(csv.DictReader(io.StringIO(_body(response))))
+    assert len(rows) == 4
+    assert {row['customer'] for row in rows} == {'buyer'}
+    assert rows[1]['quantity'] == '2' and rows[1]['line_total'] == '20.00'
+    assert rows[0]['city'] == 'Kochi'
+
+
+@pytest.mark.django_db
+def test_ndjson_export_and_staff_scope(django_user_model):
+    staff = django_user_model.objects.create_user(username="staff", password="pass", phone="1", is_staff=True)
+    other = django_user_model.objects.create_user(username="other", password="pass", phone="2")
+    _orders(other, 3)
+    client = APIClient()
+    client.force_authenticate(user=staff)
+
+    assert _body(client.get('/api/orders/export/?output=ndjson')) == ''
+
+    response = client.get('/api/orders/export/?output=ndjson&scope=all')
+    records = [json.loads(line) for line in _body(response).splitlines()]
+    assert response['Content-Type'] == 'application/x-ndjson'
+    assert len(records) == 3
+    assert records[0]['total'] == '30.00'
+    assert [item['quantity'] for item in records[0]['items']] == [1, 2]
+    assert records[0]['shipping_address']['zipcode'] == '682001'
+
+
+@pytest.mark.django_db
+def test_export_rejects_unknown_output_and_anonymous_callers(django_user_model):
+    client = APIClient()
+    assert client.get('/api/orders/export/').status_code == 401
+    client.force_authenticate(user=django_user_model.objects.create_user(username="u", password="p", phone="1"))
+    assert client.get('/api/orders/export/?output=xml').status_code == 400
+
+
+@pytest.mark.django_db
+def test_export_queries_grow_with_chunks_not_orders(django_user_model):
+    user = django_user_model.objects.create_user(username="buyer", password="pass", phone="1")
+    _orders(user, 9)
+
+    with CaptureQueriesContext(connection) as queries:
+        lines = list(csv_stream(Order.objects.all(), chunk_size=3))
+
+    assert lines[0].strip() == ','.join(CSV_COLUMNS)
+    assert len(lines) == 10
+    # One cursor over the orders, then items and addresses once per chunk.
+    assert len(queries) == 1 + 2 * 3
+
+
+@pytest.mark.django_db
+def test_export_orders_command_writes_a_file(django_user_model, tmp_path):
+    user = django_user_model.objects.create_user(username="buyer", password="pass", phone="1")
+    _orders(user, 2, items_per_order=1)
+    Order.objects.create(customer=user, completed=False)
+    target = tmp_path / 'orders.ndjson'
+
+    call_command('export_orders', '--output-format', 'ndjson', '--customer', 'buyer', '--output', str(target))
+    assert len(target.read_text().splitlines()) == 2
+
+    out = io.StringIO()
+    call_command('export_orders', '--include-open', stdout=out)
+    assert len(out.getvalue().splitlines()) == 4
@@ -0,0 +1,138 @@
+import json
+import threading
+from decimal import Decimal
+
+import pytest
+from cloudinary import CloudinaryResource
+from django.core.management import call_command
+
+from api.cache import get_version
+from api.catalog_import import import_products, read_rows
+from api.models import Order, OrderItem, Product
+from api.search import INDEX_RESOURCE, InMemorySearchBackend
+
+
+class StubUploader:
+    """Records uploads instead of sending them to Cloudinary."""
+    uploads = []
+    lock = threading.Lock()
+
+    def upload(self, source, public_id):
+        if 'broken' in source:
+            raise RuntimeError('unreachable')
+        with self.lock:
+            self.uploads.append((source, public_id))
+        return CloudinaryResource(public_id, version='1', format='jpg', type='upload', resource_type='image')
+
+
+@pytest.fixture(autouse=True)
+def stub_uploader(monkeypatch):
+    monkeypatch.setattr('api.catalog_import.get_image_uploader', StubUploader)
+    StubUploader.uploads = []
+    return StubUploader
+
+
+def _csv(tmp_path, lines):
+    path = tmp_path / 'catalog.csv'
+    path.write_text('sku,name,price,digital,image\n' + '\n'.join(lines) + '\n')
+    return path
+
+
+@pytest.mark.django_db
+def test_import_creates_updates_and_reports_invalid_rows(tmp_path):
+    Product.objects.create(sku='LAMP-1', name='Old lamp', price=5)
+    path = _csv(tmp_path, [
+        'LAMP-1,Desk lamp,12.50,false,',
+        'RUG-1,Rug,40,no,http://img/rug.jpg',
+        'EBOOK-1,Ebook,3.99,true,',
+        ',No sku,1,false,',
+        'BAD-1,Bad price,abc,false,',
+        'BAD-2,Too precise,1.999,false,',
+        'RUG-2,Broken image,8,false,http://img/broken.jpg',
+    ])
+    version = get_version('products')
+
+    report = import_products(read_rows(path), batch_size=3)
+
+    assert (report.rows, report.created, report.updated, report.invalid) == (7, 3, 1, 3)
+    assert (report.images, report.image_failures) == (1, 1)
+    assert [line for line, _ in report.errors] == [5, 6, 7, 8]
+    lamp = Product.objects.get(sku='LAMP-1')
+    assert (lamp.name, lamp.price) == ('Desk lamp', Decimal('12.50'))
+    assert Product.objects.get(sku='EBOOK-1').digital is True
+    rug = Product.objects.get(sku='RUG-1')
+    assert rug.image.public_id == 'products/RUG-1'
+    assert 'products/RUG-1' in rug.image_url and rug.thumbnail_url
+    assert not Product.objects.get(sku='RUG-2').image
+    assert get_version('products') != version
+
+
+@pytest.mark.django_db
+def test_reimport_keeps_images_and_reprices_open_carts(tmp_path, django_user_model):
+    import_products(read_rows(_csv(tmp_path, ['RUG-1,Rug,40,false,http://img/rug.jpg'])))
+    rug = Product.objects.get(sku='RUG-1')
+    user = django_user_model.objects.create_user(username="buyer", password="pass", phone="1")
+    cart = Order.objects.create(customer=user, completed=False)
+    OrderItem.objects.create(order=cart, product=rug, quantity=2)
+    cart.recalculate_totals()
+
+    report = import_products(read_rows(_csv(tmp_path, ['RUG-1,Rug,45,false,'])))
+
+    assert report.updated == 1 and report.images == 0
+    rug.refresh_from_db()
+    assert rug.price == Decimal('45') and rug.image.public_id == 'products/RUG-1'
+    cart.refresh_from_db()
+    assert cart.total == Decimal('90')
+
+
+@pytest.mark.django_db
+def test_dry_run_writes_and_uploads_nothing(tmp_path):
+    Product.objects.create(sku='LAMP-1', name='Lamp', price=5)
+    path = tmp_path / 'catalog.jsonl'
+    path.write_text('\n'.join([
+        json.dumps({'sku': 'LAMP-1', 'name': 'Lamp', 'price': 6}),
+        json.dumps({'sku': 'RUG-1', 'name': 'Rug', 'price': '40', 'image': 'http://img/rug.jpg'}),
+        'not json',
+    ]))
+
+    report = import_products(read_rows(path), dry_run=True)
+
+    assert (report.created, report.updated, report.invalid) == (1, 1, 1)
+    assert StubUploader.uploads == []
+    assert Product.objects.get(sku='LAMP-1').price == Decimal('5')
+    assert not Product.objects.filter(sku='RUG-1').exists()
+
+
+@pytest.mark.django_db
+def test_import_products_command_reports_progress(tmp_path, capsys):
+    path = _csv(tmp_path, [f'SKU-{i},Product {i},{i + 1},false,http://img/{i}.jpg' for i in range(25)])
+
+    call_command('import_products', str(path), '--batch-size', '10', '--upload-workers', '4')
+
+    out = capsys.readouterr().out
+    assert out.count('rows/s') == 3
+    assert 'Imported 25 rows: 25 created' in out
+    assert Product.objects.filter(sku__startswith='SKU-').count() == 25
+    assert len(StubUploader.uploads) == 25
+
+
+@pytest.mark.django_db
+def test_import_refreshes_shipping_need_and_other_processes_search_index(tmp_path, django_user_model, django_capture_on_commit_callbacks):
+    import_products(read_rows(_csv(tmp_path, ['EBOOK-1,Ebook,3.99,true,'])))
+    ebook = Product.objects.get(sku='EBOOK-1')
+    user = django_user_model.objects.create_user(username="reader", password="pass", phone="1")
+    cart = Order.objects.create(customer=user, completed=False)
+    OrderItem.objects.create(order=cart, product=ebook, quantity=1)
+    cart.recalculate_totals()
+    assert not cart.requires_shipping
+    worker_index = InMemorySearchBackend()
+    assert [p.name for p in worker_index.search('ebook', 5)] == ['Ebook']
+    version = get_version(INDEX_RESOURCE)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        import_products(read_rows(_csv(tmp_path, ['EBOOK-1,Printed book,3.99,false,'])))
+
+    cart.refresh_from_db()
+    assert cart.requires_shipping
+    assert get_version(INDEX_RESOURCE) != version
+    assert [p.name for p in worker_index.search('printed', 5)] == ['Printed book']
@@ -0,0 +1,61 @@
+import re
+
+import pytest
+from django.db import connection
+
+from api.models import Order, Product, WishlistItem
+
+FULL_SCAN = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    # SCAN without SEARCH means SQLite walks the whole table (or a whole index).
+    'sqlite': re.compile(r'\bSCAN (\w+)'),
+}
+# An index that finds the rows but not in the requested order still sorts them.
+SORT = {
+    'postgresql': re.compile(r'\bSort\b'),
+    'sqlite': re.compile(r'USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY'),
+}
+
+
+def _hot_queries(user):
+    return {
+        'open cart': Order.objects.filter(customer=user, completed=False),
+        'payment lookup': Order.objects.filter(razorpay_order_id='order_500'),
+        'order history': Order.objects.filter(customer_id=user.id, completed=True).order_by('-date_ordered'),
+        'wishlist page': WishlistItem.objects.filter(user=user).select_related('product').order_by('-id')[:25],
+        'wishlist next page': WishlistItem.objects.filter(user=user, id__lt=10**9).order_by('-id')[:25],
+    }
+
+
+@pytest.fixture
+def seeded(django_user_model):
+    users = django_user_model.objects.bulk_create(
+        django_user_model(username=f"user{i}", phone="1") for i in range(200)
+    )
+    products = Product.objects.bulk_create(Product(name=f"Product {i}", price=10) for i in range(50))
+    Order.objects.bulk_create(
+        Order(customer=user, completed=n > 0, razorpay_order_id=f'order_{i * 5 + n}' if n else None)
+        for i, user in enumerate(users) for n in range(5)
+    )
+    WishlistItem.objects.bulk_create(
+        WishlistItem(user=user, product=product) for user in users for product in products[:10]
+    )
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+        if connection.vendor == 'postgresql':
+            # Whatever the table sizes, only a query no index can serve still plans a Seq Scan.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+    return users[17]
+
+
+@pytest.mark.django_db
+def test_hot_queries_use_an_index(seeded):
+    pattern = FULL_SCAN.get(connection.vendor)
+    if pattern is None:
+        pytest.skip(f'no plan check for {connection.vendor}')
+
+    for name, queryset in _hot_queries(seeded).items():
+        plan = queryset.explain()
+        scanned = [table for table in pattern.findall(plan) if table.startswith('api_')]
+        assert not scanned, f'{name} scans {scanned}:\n{plan}'
+        assert not SORT[connection.vendor].search(plan), f'{name} sorts instead of reading an index in order:\n{plan}'
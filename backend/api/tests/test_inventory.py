@@ -0,0 +1,142 @@
+import threading
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.inventory import OutOfStock, release_expired_reservations, reserve_order, set_stock
+from api.models import Order, OrderItem, Product, StockReservation, StockShard
+
+
+def make_cart(django_user_model, name, product, quantity):
+    user = django_user_model.objects.create_user(username=name, password="pass", phone="1")
+    order = Order.objects.create(customer=user)
+    OrderItem.objects.create(order=order, product=product, quantity=quantity)
+    return user, order
+
+
+def stock(product):
+    shards = StockShard.objects.filter(product=product)
+    return sum(s.available for s in shards), sum(s.reserved for s in shards)
+
+
+@pytest.mark.django_db
+def test_reserve_commit_and_release(django_user_model):
+    product = Product.objects.create(name="Lamp", price=10)
+    set_stock(product, 5, shards=2)
+    _, order = make_cart(django_user_model, "a", product, 3)
+
+    reserve_order(order)
+    assert stock(product) == (2, 3)
+
+    # Reserving again replaces the earlier hold rather than stacking on it.
+    reserve_order(order)
+    assert stock(product) == (2, 3)
+
+    order.mark_paid("pay_1")
+    assert stock(product) == (2, 0)
+    assert not order.stock_reservations.filter(status=StockReservation.HELD).exists()
+
+
+@pytest.mark.django_db
+def test_out_of_stock_rolls_back_and_expired_holds_return(django_user_model):
+    lamp = Product.objects.create(name="Lamp", price=10)
+    desk = Product.objects.create(name="Desk", price=50)
+    set_stock(lamp, 2)
+    set_stock(desk, 1)
+    _, order = make_cart(django_user_model, "b", lamp, 2)
+    OrderItem.objects.create(order=order, product=desk, quantity=2)
+
+    with pytest.raises(OutOfStock) as excinfo:
+        reserve_order(order)
+    assert excinfo.value.product_ids == [desk.id]
+    assert stock(lamp) == (2, 0)
+
+    OrderItem.objects.filter(order=order, product=desk).delete()
+    reserve_order(order, ttl=timedelta(seconds=-1))
+    assert release_expired_reservations() == 1
+    assert stock(lamp) == (2, 0)
+
+
+@pytest.mark.django_db
+def test_start_payment_returns_conflict_when_out_of_stock(django_user_model):
+    product = Product.objects.create(name="Lamp", price=10)
+    set_stock(product, 1)
+    user, _ = make_cart(django_user_model, "c", product, 2)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.post('/api/payment/start/')
+
+    assert response.status_code == 409
+    assert response.data["product_ids"] == [product.id]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_reservations_never_oversell(django_user_model):
+    product = Product.objects.create(name="Hot", price=10)
+    set_stock(product, 10, shards=3)
+    orders = [make_cart(django_user_model, f"buyer{i}", product, 1)[1] for i in range(20)]
+    results = []
+
+    def buy(order):
+        try:
+            reserve_order(order)
+            results.append(True)
+        except OutOfStock:
+            results.append(False)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=buy, args=(order,)) for order in orders]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 10
+    assert stock(product) == (0, 10)
+    assert StockReservation.objects.filter(status=StockReservation.HELD).count() == 10
+
+
+@pytest.mark.django_db
+def test_commit_settles_cart_changes_made_after_the_hold(django_user_model):
+    lamp = Product.objects.create(name="Lamp", price=10)
+    desk = Product.objects.create(name="Desk", price=50)
+    set_stock(lamp, 10)
+    set_stock(desk, 10)
+    _, order = make_cart(django_user_model, "d", lamp, 2)
+    OrderItem.objects.create(order=order, product=desk, quantity=4)
+    reserve_order(order)
+
+    OrderItem.objects.filter(order=order, product=lamp).update(quantity=5)
+    OrderItem.objects.filter(order=order, product=desk).update(quantity=1)
+    order.mark_paid("pay_2")
+
+    assert stock(lamp) == (5, 0)
+    assert stock(desk) == (9, 0)
+
+
+@pytest.mark.django_db
+def test_process_order_completes_a_cart_once(django_user_model, monkeypatch):
+    lamp = Product.objects.create(name="Lamp", price=10)
+    set_stock(lamp, 10)
+    user, order = make_cart(django_user_model, "twice", lamp, 2)
+    client = APIClient()
+    client.force_authenticate(user=user)
+    get = Order.objects.get
+
+    def read_then_lose_the_race(*args, **kwargs):
+        stale = get(*args, **kwargs)
+        Order.objects.filter(pk=stale.pk).update(completed=True)
+        return stale
+
+    # Both submits read the open cart before either one completes it.
+    monkeypatch.setattr(Order.objects, 'get', read_then_lose_the_race)
+    response = client.post('/api/process-order/', {'shipping': {'address': '1 Road'}}, format='json')
+
+    assert response.status_code == 409
+    assert stock(lamp) == (10, 0)
+    assert not order.shippingaddress_set.exists()
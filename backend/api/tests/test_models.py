@@ -5,4 +5,15 @@ from api.models import Product
 def test_product_str_representation():
     product = Product.objects.create(name="Test Camera", price=199.99)
     product_str = str(product)
-    assert product_str == "Test Camera"
\ No newline at end of file
+    assert product_str == "Test Camera"
+
+@pytest.mark.django_db
+def test_product_image_urls_are_precomputed_on_save():
+    from cloudinary import CloudinaryResource
+
+    image = CloudinaryResource("products/camera", format="jpg", type="upload", resource_type="image")
+    product = Product.objects.create(name="Camera", price=99, image=image)
+    product.refresh_from_db()
+    assert "c_limit,h_800,w_800" in product.image_url
+    assert "c_limit,h_300,w_300" in product.thumbnail_url
+    assert product.imageURL == product.image_url
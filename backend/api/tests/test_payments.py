@@ -0,0 +1,133 @@
+import time
+
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from api.fake_gateway import FakeGatewayServer
+from api.models import Order, OrderItem, Product
+from api.payments import CircuitBreaker, GatewayUnavailable, RazorpayGateway
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def make_gateway(server, **options):
+    options.setdefault('backoff', 0)
+    return RazorpayGateway('key', 'secret', base_url=server.base_url, **options)
+
+
+def test_retry_reuses_order_created_for_the_same_receipt():
+    with FakeGatewayServer().start() as server:
+        server.state.orders.append({'id': 'order_existing', 'amount': 5000, 'currency': 'INR',
+                                    'receipt': 'order_rcptid_1', 'status': 'created'})
+        server.state.fail_next = 1
+        order = make_gateway(server).create_order(5000, 'INR', 'order_rcptid_1')
+
+    assert order['id'] == 'order_existing'
+    assert len(server.state.orders) == 1
+
+
+def test_slow_gateway_times_out():
+    with FakeGatewayServer(latency=0.5).start() as server:
+        gateway = make_gateway(server, read_timeout=0.1, max_retries=0)
+        started = time.monotonic()
+        with pytest.raises(GatewayUnavailable):
+            gateway.create_order(100, 'INR', 'order_rcptid_2')
+        assert time.monotonic() - started < 0.45
+
+
+def test_circuit_breaker_fails_fast_once_open():
+    with FakeGatewayServer(failure_rate=1.0).start() as server:
+        gateway = make_gateway(server, max_retries=1, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+        with pytest.raises(GatewayUnavailable):
+            gateway.create_order(100, 'INR', 'order_rcptid_3')
+        calls = server.state.requests
+
+        with pytest.raises(GatewayUnavailable):
+            gateway.create_order(100, 'INR', 'order_rcptid_3')
+        assert server.state.requests == calls
+
+
+@pytest.mark.django_db
+def test_start_payment_uses_gateway(django_user_model, monkeypatch):
+    user = django_user_model.objects.create_user(username="payer", password="pass", phone="1")
+    product = Product.objects.create(name="Watch", price="150.00")
+    order = Order.objects.create(customer=user)
+    OrderItem.objects.create(order=order, product=product, quantity=2)
+    order.recalculate_totals()
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    with FakeGatewayServer().start() as server:
+        monkeypatch.setattr('api.views.get_payment_gateway', lambda: make_gateway(server))
+        address = {'address': '1 Main St', 'city': 'Kochi', 'state': 'KL', 'zipcode': '682001'}
+        response = client.post('/api/payment/start/', {'shipping_address': address}, format='json')
+        assert response.status_code == 200
+        assert response.data['amount'] == 30000
+        order.refresh_from_db()
+        assert order.payment_amount == 30000 and order.shipping_details == address
+
+        server.state.failure_rate = 1.0
+        cache.clear()
+        response = client.post('/api/payment/start/', {}, format='json')
+        assert response.status_code == 503
+
+
+@pytest.mark.django_db
+def test_payment_callback_rejects_a_cart_that_grew_after_checkout(django_user_model, monkeypatch):
+    class Verified:
+        def verify_payment_signature(self, params):
+            return True
+
+    monkeypatch.setattr('api.views.get_payment_gateway', Verified)
+    user = django_user_model.objects.create_user(username="grower", password="pass", phone="1")
+    product = Product.objects.create(name="Watch", price="150.00")
+    order = Order.objects.create(customer=user, razorpay_order_id="order_grow", payment_amount=15000)
+    OrderItem.objects.create(order=order, product=product, quantity=2)
+    order.recalculate_totals()
+    client = APIClient()
+    client.force_authenticate(user=user)
+    body = {'razorpay_order_id': 'order_grow', 'razorpay_payment_id': 'pay_1', 'razorpay_signature': 'sig',
+            'shipping_address': {'address': '1 Main St', 'city': 'Kochi', 'state': 'KL', 'zipcode': '682001'}}
+
+    assert client.post('/api/payment/success/', body, format='json').status_code == 409
+    order.refresh_from_db()
+    assert not order.completed
+
+    Order.objects.filter(pk=order.pk).update(payment_amount=30000)
+    assert client.post('/api/payment/success/', body, format='json').status_code == 200
+    order.refresh_from_db()
+    assert order.completed and order.shipping_address.zipcode == '682001'
+
+
+@pytest.mark.django_db
+def test_async_start_payment_awaits_the_gateway(django_user_model, monkeypatch, settings):
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from api.payments import AsyncPaymentGateway
+
+    settings.ROOT_URLCONF = 'Ecommerce.asgi_urls'
+    user = django_user_model.objects.create_user(username="asyncpayer", email="a@example.com", password="pass", phone="1")
+    order = Order.objects.create(customer=user)
+    OrderItem.objects.create(order=order, product=Product.objects.create(name="Watch", price="150.00"), quantity=1)
+    order.recalculate_totals()
+    client = APIClient(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    with FakeGatewayServer().start() as server:
+        monkeypatch.setattr('api.async_views.get_async_payment_gateway', lambda: AsyncPaymentGateway(make_gateway(server)))
+        response = client.post('/api/payment/start/', {'shipping_address': {'city': 'Kochi'}}, format='json')
+        assert response.status_code == 200
+        assert response.json()['amount'] == 15000 and response.json()['prefill']['email'] == "a@example.com"
+        order.refresh_from_db()
+        assert order.razorpay_order_id == response.json()['order_id'] == server.state.orders[0]['id']
+        assert order.shipping_details['city'] == 'Kochi'
+
+        server.state.failure_rate = 1.0
+        cache.clear()
+        assert client.post('/api/payment/start/', {}, format='json').status_code == 503
+    assert APIClient().post('/api/payment/start/', {}, format='json').status_code == 401
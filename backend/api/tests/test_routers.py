@@ -0,0 +1,101 @@
+import sqlite3
+
+import pytest
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.models import Order, Product
+from api.routers import ReplicaRouter, use_replicas
+
+
+@pytest.fixture
+def replica(settings, tmp_path):
+    """A second SQLite database holding a snapshot of default, registered as a replica."""
+    def snapshot():
+        connection.close()
+        with sqlite3.connect(connection.settings_dict['NAME']) as source, sqlite3.connect(path) as target:
+            source.backup(target)
+
+    alias, path = 'replica_0', tmp_path / 'replica.sqlite3'
+    settings_dict = connections.configure_settings({
+        'default': connection.settings_dict,
+        alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path},
+    })[alias]
+    # Registered on the handler only, like a connection created at runtime.
+    connections[alias] = DatabaseWrapper(settings_dict, alias)
+    settings.DATABASE_REPLICAS = [alias]
+    yield snapshot
+    connections[alias].close()
+    del connections[alias]
+
+
+def test_router_sends_only_flagged_reads_to_replicas(settings):
+    router = ReplicaRouter()
+    settings.DATABASE_REPLICAS = ['replica_0']
+
+    assert router.db_for_read(Product) is None
+    with use_replicas():
+        assert router.db_for_read(Product) == 'replica_0'
+        assert router.db_for_write(Product) == 'default'
+    settings.DATABASE_REPLICAS = []
+    with use_replicas():
+        assert router.db_for_read(Product) is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_catalog_reads_hit_the_replica_and_cart_stays_on_primary(replica, django_user_model):
+    user = django_user_model.objects.create_user(username='routed', password='pass', phone='1')
+    product = Product.objects.create(name='Lamp', price=10)
+    replica()
+    # Only the primary sees the rename; a replica read still returns the snapshot.
+    Product.objects.filter(pk=product.pk).update(name='Lamp v2')
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    with CaptureQueriesContext(connections['replica_0']) as replica_queries:
+        detail = client.get(f'/api/products/{product.id}/')
+        client.post('/api/cart/update/', {'productId': product.id, 'action': 'add'}, format='json')
+        cart = client.get('/api/cart/')
+
+    assert detail.data['name'] == 'Lamp'
+    assert cart.data['orderitems'][0]['product']['name'] == 'Lamp v2'
+    assert Order.objects.get(customer=user).item_count == 1
+    # Just the product read; the cart write and cart read never touched it.
+    assert len(replica_queries.captured_queries) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_recent_writers_read_their_orders_from_the_primary(replica, django_user_model):
+    user = django_user_model.objects.create_user(username='writer', password='pass', phone='1')
+    product = Product.objects.create(name='Lamp', price=10)
+    replica()
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    client.post('/api/cart/update/', {'productId': product.id, 'action': 'add'}, format='json')
+    response = client.post('/api/process-order/', {'shipping': {'address': '1 Road', 'city': 'Kochi'}}, format='json')
+    assert response.status_code == 200
+
+    # The replica snapshot predates the order, but the writer is pinned.
+    assert len(client.get('/api/orders/').data) == 1
+
+    # Once the pin is gone the history is read from the replica again.
+    cache.clear()
+    assert len(client.get('/api/orders/').data) == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_shared_cache_entries_are_built_from_the_primary(replica):
+    product = Product.objects.create(name='Lamp', price=10)
+    replica()
+    Product.objects.filter(pk=product.pk).update(name='Lamp v2')
+
+    with CaptureQueriesContext(connections['replica_0']) as replica_queries:
+        response = APIClient().get('/api/products/')
+
+    # The replica has not caught up, but the page everyone will share must not be stale.
+    assert [item['name'] for item in response.data['results']] == ['Lamp v2']
+    assert replica_queries.captured_queries == []
@@ -0,0 +1,133 @@
+import pytest
+from django.db import connection
+from rest_framework.test import APIClient
+
+from api.models import Product
+from api.search import InMemorySearchBackend, PostgresSearchBackend, invalidate_search_index
+
+
+@pytest.fixture
+def catalog(db):
+    names = ["Samsung Galaxy Phone", "Samsung Refrigerator", "Gaming Laptop", "Laptop Sleeve", "Phone Case"]
+    return {name: Product.objects.create(name=name, price=100) for name in names}
+
+
+@pytest.mark.django_db
+def test_in_memory_search_ranks_and_matches_prefixes(catalog):
+    backend = InMemorySearchBackend()
+
+    assert {p.name for p in backend.search("sams", 10)} == {"Samsung Galaxy Phone", "Samsung Refrigerator"}
+    assert [p.name for p in backend.search("samsung phone", 10)] == ["Samsung Galaxy Phone"]
+    assert backend.search("tablet", 10) == []
+    assert [s['name'] for s in backend.autocomplete("lap", 5)] == ["Laptop Sleeve", "Gaming Laptop"]
+
+
+@pytest.mark.django_db
+def test_in_memory_search_follows_product_changes(catalog):
+    backend = InMemorySearchBackend()
+    backend.search("phone", 10)
+
+    sleeve = catalog["Laptop Sleeve"]
+    sleeve.name = "Phone Sleeve"
+    sleeve.save()
+    backend.index_product(sleeve)
+    backend.remove_product(catalog["Phone Case"].pk)
+
+    assert {p.name for p in backend.search("phone", 10)} == {"Samsung Galaxy Phone", "Phone Sleeve"}
+
+
+@pytest.mark.django_db
+def test_search_endpoint(catalog, monkeypatch):
+    monkeypatch.setattr('api.views.get_search_backend', InMemorySearchBackend)
+    client = APIClient()
+
+    response = client.get('/api/products/search/', {'q': 'laptop'})
+    assert response.status_code == 200
+    assert {p['name'] for p in response.data['results']} == {"Gaming Laptop", "Laptop Sleeve"}
+
+    response = client.get('/api/products/search/autocomplete/', {'q': 'ref'})
+    assert response.data['suggestions'] == [{'id': catalog["Samsung Refrigerator"].id, 'name': "Samsung Refrigerator"}]
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason="requires Postgres full-text search")
+def test_postgres_search_ranks_and_tolerates_typos(catalog):
+    backend = PostgresSearchBackend()
+
+    assert catalog["Gaming Laptop"] in backend.search("laptops", 10)
+    assert catalog["Samsung Refrigerator"] in backend.search("refrigerater", 10)
+    assert {s['name'] for s in backend.autocomplete("sams", 5)} == {"Samsung Galaxy Phone", "Samsung Refrigerator"}
+
+
+@pytest.mark.django_db
+def test_product_list_search_goes_through_the_backend(catalog, monkeypatch):
+    monkeypatch.setattr('api.filters.get_search_backend', InMemorySearchBackend)
+    client = APIClient()
+
+    # Matches every term in any order, which name LIKE '%samsung phone%' would not.
+    response = client.get('/api/products/', {'search': 'samsung phone'})
+    assert response.status_code == 200
+    assert [p['name'] for p in response.data['results']] == ["Samsung Galaxy Phone"]
+
+    response = client.get('/api/products/', {'search': 'lap', 'max_price': 1000})
+    assert {p['name'] for p in response.data['results']} == {"Gaming Laptop", "Laptop Sleeve"}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('urls', ['Ecommerce.urls', 'Ecommerce.asgi_urls'])
+def test_product_list_search_pages_by_relevance(catalog, monkeypatch, settings, urls):
+    # Says "laptop" twice, so it outranks both older laptop products.
+    Product.objects.create(name="Laptop Bag (fits any laptop)", price=100)
+    settings.ROOT_URLCONF = urls
+    backend = InMemorySearchBackend()
+    monkeypatch.setattr('api.filters.get_search_backend', lambda: backend)
+    expected = [p.name for p in backend.search("laptop", 10)]
+    client = APIClient()
+
+    names, url = [], '/api/products/?search=laptop&page_size=1'
+    while url:
+        page = client.get(url).json()
+        names += [p['name'] for p in page['results']]
+        url = page['next']
+    previous = client.get(page['previous']).json()
+
+    assert [p['name'] for p in previous['results']] == ["Gaming Laptop"]
+    assert names == expected == ["Laptop Bag (fits any laptop)", "Gaming Laptop", "Laptop Sleeve"]
+
+
+@pytest.mark.django_db
+def test_product_list_search_sees_bulk_created_products(catalog, monkeypatch, django_capture_on_commit_callbacks):
+    backend = InMemorySearchBackend()
+    monkeypatch.setattr('api.filters.get_search_backend', lambda: backend)
+    client = APIClient()
+    assert client.get('/api/products/', {'search': 'tablet'}).data['results'] == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Product.objects.bulk_create([Product(name="Android Tablet", price=100)])
+        invalidate_search_index()
+
+    response = client.get('/api/products/', {'search': 'tablet'})
+    assert [p['name'] for p in response.data['results']] == ["Android Tablet"]
+
+
+@pytest.mark.django_db
+def test_rolled_back_product_writes_do_not_reach_the_index(catalog, monkeypatch, django_capture_on_commit_callbacks):
+    from django.db import transaction
+
+    backend = InMemorySearchBackend()
+    monkeypatch.setattr('api.signals.get_search_backend', lambda: backend)
+    backend.search("phone", 10)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        try:
+            with transaction.atomic():
+                Product.objects.create(name="Phantom Phone", price=1)
+                catalog["Phone Case"].delete()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+    assert {p.name for p in backend.search("phone", 10)} == {"Samsung Galaxy Phone", "Phone Case"}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Product.objects.get(name="Phone Case").delete()
+    assert [p.name for p in backend.search("phone", 10)] == ["Samsung Galaxy Phone"]
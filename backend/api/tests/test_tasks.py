@@ -0,0 +1,52 @@
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import Order, OrderItem, Product, Task
+from api.tasks import claim_tasks, enqueue, execute_task, task
+
+calls = []
+
+
+@task(max_attempts=2)
+def flaky(value):
+    calls.append(value)
+    if len(calls) == 1:
+        raise RuntimeError("first attempt fails")
+
+
+@pytest.mark.django_db
+def test_process_order_sends_confirmation_eagerly(django_user_model, settings, django_capture_on_commit_callbacks):
+    settings.TASKS_ALWAYS_EAGER = True
+    user = django_user_model.objects.create_user(username="mailme", email="mailme@example.com", password="pass", phone="1")
+    order = Order.objects.create(customer=user)
+    OrderItem.objects.create(order=order, product=Product.objects.create(name="Cup", price=5), quantity=1)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post('/api/process-order/', {'shipping': {'address': '1 Road', 'city': 'Kochi'}}, format='json')
+
+    assert response.status_code == 200
+    assert len(mail.outbox) == 1
+    assert Task.objects.count() == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_failed_task_is_retried_with_backoff():
+    calls.clear()
+    job = enqueue(flaky.name, ["a"], max_attempts=2)
+
+    assert claim_tasks(10) == [job.pk]
+    assert execute_task(job.pk) is False
+    job.refresh_from_db()
+    assert job.status == Task.PENDING and job.run_after > timezone.now()
+    assert claim_tasks(10) == []
+
+    Task.objects.filter(pk=job.pk).update(run_after=timezone.now())
+    call_command('runworker', '--burst', '--concurrency', '1')
+    job.refresh_from_db()
+    assert job.status == Task.DONE and job.attempts == 2
+    assert calls == ["a", "a"]
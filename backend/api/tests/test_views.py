@@ -14,3 +14,278 @@ def test_order_list_view_unauthenticated():
     assert response.status_code == 401
 
 
+
+
+def _create_completed_orders(user, count, items_per_order=3):
+    from api.models import Order, OrderItem, Product, ShippingAddress
+
+    for i in range(count):
+        order = Order.objects.create(customer=user, completed=True)
+        for j in range(items_per_order):
+            product = Product.objects.create(name=f"Product {i}-{j}", price=10, digital=bool(j % 2))
+            OrderItem.objects.create(order=order, product=product, quantity=j + 1)
+        ShippingAddress.objects.create(customer=user, order=order, address="1 Main St", city="Kochi", state="KL", zipcode="682001")
+
+
+@pytest.mark.django_db
+def test_order_list_query_count_is_constant(django_user_model):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    user = django_user_model.objects.create_user(username="buyer", password="pass", phone="1")
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    _create_completed_orders(user, 1)
+    with CaptureQueriesContext(connection) as small:
+        response = client.get('/api/orders/')
+    assert response.status_code == 200
+    assert len(response.data) == 1
+
+    _create_completed_orders(user, 10, items_per_order=5)
+    with CaptureQueriesContext(connection) as large:
+        response = client.get('/api/orders/')
+    assert response.status_code == 200
+    assert len(response.data) == 11
+    assert response.data[0]['shipping_address']['city'] == "Kochi"
+
+    assert len(large.captured_queries) == len(small.captured_queries)
+
+
+@pytest.mark.django_db
+def test_cart_update_maintains_stored_totals(django_user_model):
+    from api.models import Order, Product
+
+    user = django_user_model.objects.create_user(username="shopper", password="pass", phone="1")
+    client = APIClient()
+    client.force_authenticate(user=user)
+    shirt = Product.objects.create(name="Shirt", price="25.50", digital=False)
+    ebook = Product.objects.create(name="Ebook", price="4.00", digital=True)
+
+    for product in (shirt, shirt, ebook):
+        client.post('/api/cart/update/', {'productId': product.id, 'action': 'add'}, format='json')
+    order = Order.objects.get(customer=user, completed=False)
+    assert (order.total, order.item_count, order.requires_shipping) == (55, 3, True)
+
+    client.post('/api/cart/update/', {'productId': shirt.id, 'action': 'remove'}, format='json')
+    client.post('/api/cart/update/', {'productId': shirt.id, 'action': 'remove'}, format='json')
+    order.refresh_from_db()
+    assert (order.total, order.item_count, order.requires_shipping) == (4, 1, False)
+
+    response = client.get('/api/cart/')
+    assert response.data['get_cart_total'] == 4
+    assert response.data['shipping'] is False
+
+
+@pytest.mark.django_db
+def test_reconcile_cart_totals_repairs_drift(django_user_model):
+    from django.core.management import call_command
+    from api.models import Order, OrderItem, Product
+
+    user = django_user_model.objects.create_user(username="drift", password="pass", phone="1")
+    product = Product.objects.create(name="Lamp", price="10.00", digital=False)
+    order = Order.objects.create(customer=user)
+    OrderItem.objects.create(order=order, product=product, quantity=3)
+
+    call_command('reconcile_cart_totals')
+    order.refresh_from_db()
+    assert (order.total, order.item_count, order.requires_shipping) == (30, 3, True)
+
+
+@pytest.mark.django_db
+def test_cart_update_set_action_returns_cart(django_user_model):
+    from api.models import Product
+
+    user = django_user_model.objects.create_user(username="setter", password="pass", phone="1")
+    client = APIClient()
+    client.force_authenticate(user=user)
+    product = Product.objects.create(name="Mug", price="8.00", digital=False)
+
+    response = client.post('/api/cart/update/', {'productId': product.id, 'action': 'set', 'quantity': 4}, format='json')
+    assert response.status_code == 200
+    assert response.data['get_cart_items'] == 4
+    assert response.data['orderitems'][0]['quantity'] == 4
+
+    response = client.post('/api/cart/update/', {'productId': product.id, 'action': 'set', 'quantity': 0}, format='json')
+    assert response.data['get_cart_items'] == 0
+    assert response.data['orderitems'] == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_cart_adds_do_not_lose_updates(django_user_model):
+    from concurrent.futures import ThreadPoolExecutor
+    from django.db import connection
+    from api.models import Order, OrderItem, Product
+
+    user = django_user_model.objects.create_user(username="clicker", password="pass", phone="1")
+    product = Product.objects.create(name="Headphones", price="15.00", digital=False)
+    clicks = 20
+
+    def add_to_cart(_):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        try:
+            return client.post('/api/cart/update/', {'productId': product.id, 'action': 'add'}, format='json').status_code
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        statuses = list(pool.map(add_to_cart, range(clicks)))
+
+    assert statuses == [200] * clicks
+    order = Order.objects.get(customer=user, completed=False)
+    assert OrderItem.objects.get(order=order, product=product).quantity == clicks
+    assert order.item_count == clicks
+
+
+@pytest.mark.django_db
+def test_cart_batch_applies_operations_with_constant_queries(django_user_model):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from api.models import Order, Product
+
+    user = django_user_model.objects.create_user(username="batcher", password="pass", phone="1")
+    client = APIClient()
+    client.force_authenticate(user=user)
+    products = [Product.objects.create(name=f"Item {i}", price="2.00", digital=False) for i in range(12)]
+
+    small_batch = [{'productId': products[0].id, 'action': 'add', 'quantity': 2}]
+    with CaptureQueriesContext(connection) as small:
+        response = client.post('/api/cart/batch/', {'operations': small_batch}, format='json')
+    assert response.status_code == 200
+
+    large_batch = [{'productId': product.id, 'action': 'add'} for product in products[1:]]
+    large_batch += [
+        {'productId': products[0].id, 'action': 'remove'},
+        {'productId': products[1].id, 'quantity': 5},
+        {'productId': products[2].id, 'quantity': 0},
+    ]
+    with CaptureQueriesContext(connection) as large:
+        response = client.post('/api/cart/batch/', {'operations': large_batch}, format='json')
+    assert response.status_code == 200
+    # The larger batch also issues one bulk_update and one delete.
+    assert len(large.captured_queries) <= len(small.captured_queries) + 2
+
+    order = Order.objects.get(customer=user, completed=False)
+    # 1 of products[0], 5 of products[1], none of products[2], 1 each of the other 9.
+    assert order.item_count == 15
+    assert response.data['get_cart_items'] == 15
+    assert len(response.data['orderitems']) == 11
+
+
+@pytest.mark.django_db
+def test_cart_batch_rejects_unknown_products(django_user_model):
+    user = django_user_model.objects.create_user(username="typo", password="pass", phone="1")
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.post('/api/cart/batch/', {'operations': [{'productId': 999, 'action': 'add'}]}, format='json')
+    assert response.status_code == 404
+    assert response.data['missing'] == [999]
+
+    response = client.post('/api/cart/batch/', [{'productId': 999, 'action': 'add'}], format='json')
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_product_list_is_cursor_paginated_and_filterable():
+    from django.core.cache import cache
+    from api.models import Product
+
+    cache.clear()
+    for i in range(5):
+        Product.objects.create(name=f"Gadget {i}", price=10 * (i + 1), digital=i % 2 == 0)
+    client = APIClient()
+
+    first = client.get('/api/products/', {'page_size': 2})
+    assert [p['name'] for p in first.data['results']] == ["Gadget 0", "Gadget 1"]
+    second = client.get(first.data['next'])
+    assert [p['name'] for p in second.data['results']] == ["Gadget 2", "Gadget 3"]
+
+    filtered = client.get('/api/products/', {'min_price': 20, 'max_price': 40, 'digital': 'true'})
+    assert [p['name'] for p in filtered.data['results']] == ["Gadget 2"]
+
+    assert client.get('/api/products/', {'min_price': 'cheap'}).status_code == 400
+    for value in ('NaN', 'Infinity', '-inf', 'sNaN'):
+        assert client.get('/api/products/', {'max_price': value}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_product_detail_conditional_get():
+    from api.models import Product
+
+    product = Product.objects.create(name="Speaker", price=40)
+    client = APIClient()
+
+    response = client.get(f'/api/products/{product.id}/')
+    assert response.status_code == 200
+    etag, last_modified = response['ETag'], response['Last-Modified']
+
+    assert client.get(f'/api/products/{product.id}/', HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert client.get(f'/api/products/{product.id}/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code == 304
+
+    product.price = 35
+    product.save()
+    assert client.get(f'/api/products/{product.id}/', HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.django_db
+def test_cart_conditional_get_skips_serialization(django_user_model):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from django.utils.http import http_date
+    from api.models import Product
+
+    user = django_user_model.objects.create_user(username="poller", password="pass", phone="1")
+    client = APIClient()
+    client.force_authenticate(user=user)
+    product = Product.objects.create(name="Pen", price=2)
+    client.post('/api/cart/update/', {'productId': product.id, 'action': 'add'}, format='json')
+
+    etag = client.get('/api/cart/')['ETag']
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get('/api/cart/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert len(queries.captured_queries) == 1
+
+    client.post('/api/cart/update/', {'productId': product.id, 'action': 'add'}, format='json')
+    response = client.get('/api/cart/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data['get_cart_items'] == 2
+
+    # Only the ETag validates a cart; a same-second change must not look unmodified.
+    assert not response.has_header('Last-Modified')
+    response = client.get('/api/cart/', HTTP_IF_MODIFIED_SINCE=http_date())
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_product_list_annotates_customer_state_in_one_query(django_user_model):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from api.models import Order, OrderItem, Product, WishlistItem
+
+    cache.clear()
+    user = django_user_model.objects.create_user(username="state", password="pass", phone="1")
+    mug, lamp, desk = (Product.objects.create(name=name, price=5) for name in ("Mug", "Lamp", "Desk"))
+    WishlistItem.objects.create(user=user, product=mug)
+    OrderItem.objects.create(order=Order.objects.create(customer=user), product=lamp, quantity=3)
+    client = APIClient()
+
+    public = client.get('/api/products/')
+    assert 'in_wishlist' not in public.data['results'][0]
+    assert 'Authorization' in public['Vary']
+
+    headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get('/api/products/', **headers)
+    assert len(ctx.captured_queries) == 1
+    state = {p['name']: (p['in_wishlist'], p['cart_quantity']) for p in response.data['results']}
+    assert state == {"Mug": (True, 0), "Lamp": (False, 3), "Desk": (False, 0)}
+    assert 'ETag' not in response
+
+    detail = client.get(f'/api/products/{lamp.id}/', **headers)
+    assert detail.data['cart_quantity'] == 3
+    assert detail['Cache-Control'] == 'private, no-cache'
@@ -0,0 +1,113 @@
+import hashlib
+import hmac
+import json
+
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from api.models import Order, PaymentEvent
+
+SECRET = "whsec_test"
+
+
+def deliver(client, payload, event_id, secret=SECRET):
+    body = json.dumps(payload)
+    signature = hmac.new(secret.encode(), body.encode(), hashlib.sha256).hexdigest()
+    return client.generic(
+        'POST', '/api/payment/webhook/', body, content_type='application/json',
+        HTTP_X_RAZORPAY_SIGNATURE=signature, HTTP_X_RAZORPAY_EVENT_ID=event_id,
+    )
+
+
+def captured(order_id, payment_id="pay_1"):
+    return {"event": "payment.captured",
+            "payload": {"payment": {"entity": {"id": payment_id, "order_id": order_id}}}}
+
+
+@pytest.fixture(autouse=True)
+def webhook_secret(settings):
+    settings.RAZORPAY_WEBHOOK_SECRET = SECRET
+
+
+@pytest.mark.django_db
+def test_webhook_records_each_event_once():
+    client = APIClient()
+
+    assert deliver(client, captured("order_abc"), "evt_1").status_code == 200
+    assert deliver(client, captured("order_abc"), "evt_1").status_code == 200
+    assert PaymentEvent.objects.count() == 1
+
+    assert deliver(client, captured("order_abc"), "evt_2", secret="wrong").status_code == 400
+    assert PaymentEvent.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_worker_finalizes_orders_idempotently(django_user_model):
+    user = django_user_model.objects.create_user(username="webhooked", password="pass", phone="1")
+    order = Order.objects.create(customer=user, razorpay_order_id="order_xyz")
+    client = APIClient()
+    deliver(client, captured("order_xyz", "pay_9"), "evt_a")
+    deliver(client, {"event": "order.paid", "payload": {"payment": {"entity": {"id": "pay_9", "order_id": "order_xyz"}}}}, "evt_b")
+    deliver(client, captured("order_missing"), "evt_c")
+
+    call_command('process_payment_events')
+
+    order.refresh_from_db()
+    assert order.completed and order.transaction_id == "pay_9"
+    assert PaymentEvent.objects.filter(processed_at__isnull=False).count() == 2
+    failed = PaymentEvent.objects.get(event_id="evt_c")
+    assert failed.processed_at is None and failed.attempts == 1 and failed.last_error
+
+
+@pytest.mark.django_db
+def test_webhook_only_checkout_gets_its_address_and_amounts_are_checked(django_user_model):
+    from api.models import OrderItem, Product
+
+    user = django_user_model.objects.create_user(username="tabcloser", password="pass", phone="1")
+    product = Product.objects.create(name="Lamp", price=10)
+    order = Order.objects.create(
+        customer=user, razorpay_order_id="order_tab", payment_amount=2000,
+        shipping_details={"address": "1 Main St", "city": "Kochi", "state": "KL", "zipcode": "682001"},
+    )
+    OrderItem.objects.create(order=order, product=product, quantity=3)
+    order.recalculate_totals()
+    client = APIClient()
+
+    grown = captured("order_tab", "pay_short")
+    grown["payload"]["payment"]["entity"]["amount"] = 2000
+    deliver(client, grown, "evt_short")
+    call_command('process_payment_events')
+    order.refresh_from_db()
+    assert not order.completed
+    assert "paise" in PaymentEvent.objects.get(event_id="evt_short").last_error
+
+    paid = captured("order_tab", "pay_full")
+    paid["payload"]["payment"]["entity"]["amount"] = 3000
+    deliver(client, paid, "evt_full")
+    call_command('process_payment_events')
+    order.refresh_from_db()
+    assert order.completed and order.transaction_id == "pay_full"
+    assert order.shipping_address.city == "Kochi"
+
+
+@pytest.mark.django_db
+def test_failed_events_back_off_before_retrying(django_user_model):
+    from django.utils import timezone
+
+    from api.webhooks import process_pending_events
+
+    # The webhook can arrive before start_payment's transaction commits the order id.
+    deliver(APIClient(), captured("order_early", "pay_early"), "evt_early")
+    assert process_pending_events() == 1
+    event = PaymentEvent.objects.get(event_id="evt_early")
+    assert event.attempts == 1 and event.next_attempt_at > timezone.now()
+
+    user = django_user_model.objects.create_user(username="early", password="pass", phone="1")
+    order = Order.objects.create(customer=user, razorpay_order_id="order_early")
+    assert process_pending_events() == 0
+
+    PaymentEvent.objects.filter(pk=event.pk).update(next_attempt_at=timezone.now())
+    assert process_pending_events() == 1
+    order.refresh_from_db()
+    assert order.completed and order.transaction_id == "pay_early"
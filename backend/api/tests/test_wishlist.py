@@ -0,0 +1,91 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.models import Product, WishlistItem
+
+
+@pytest.fixture
+def client_for(django_user_model):
+    def make(username):
+        user = django_user_model.objects.create_user(username=username, password='pass', phone='1')
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return user, client
+    return make
+
+
+@pytest.mark.django_db
+def test_wishlist_pages_cost_fixed_queries(client_for):
+    user, client = client_for('pages')
+    products = [Product.objects.create(name=f'Item {i}', price=i + 1) for i in range(5)]
+    WishlistItem.objects.bulk_create(WishlistItem(user=user, product=product) for product in products)
+
+    with CaptureQueriesContext(connection) as ctx:
+        first = client.get('/api/wishlist/?page_size=3')
+    assert len(ctx.captured_queries) == 1
+    assert [item['product']['name'] for item in first.data['results']] == ['Item 4', 'Item 3', 'Item 2']
+
+    second = client.get(first.data['next'])
+    assert [item['product']['name'] for item in second.data['results']] == ['Item 1', 'Item 0']
+    assert second.data['next'] is None
+
+
+@pytest.mark.django_db
+def test_bulk_add_remove_and_cached_ids(client_for, django_capture_on_commit_callbacks):
+    user, client = client_for('bulk')
+    a, b, c = (Product.objects.create(name=name, price=1) for name in 'abc')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post('/api/wishlist/bulk-add/', {'product_ids': [a.id, b.id, b.id]}, format='json')
+    assert response.data['product_ids'] == [a.id, b.id]
+
+    assert client.get('/api/wishlist/ids/').data['product_ids'] == [a.id, b.id]
+    with CaptureQueriesContext(connection) as ctx:
+        assert client.get('/api/wishlist/ids/').data['product_ids'] == [a.id, b.id]
+    assert len(ctx.captured_queries) == 0
+
+    # Already-wishlisted products are skipped rather than rejected.
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post('/api/wishlist/bulk-add/', {'product_ids': [b.id, c.id]}, format='json')
+        client.post('/api/wishlist/bulk-remove/', {'product_ids': [a.id]}, format='json')
+    assert client.get('/api/wishlist/ids/').data['product_ids'] == [b.id, c.id]
+
+    # Single-item endpoints go through the model signals.
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post('/api/wishlist/remove/', {'product_id': c.id}, format='json')
+    assert client.get('/api/wishlist/ids/').data['product_ids'] == [b.id]
+
+
+@pytest.mark.django_db
+def test_bulk_add_rejects_unknown_products(client_for):
+    user, client = client_for('missing')
+    product = Product.objects.create(name='Real', price=1)
+
+    response = client.post('/api/wishlist/bulk-add/', {'product_ids': [product.id, 999999]}, format='json')
+
+    assert response.status_code == 404
+    assert response.data['missing'] == [999999]
+    assert not WishlistItem.objects.exists()
+    assert client.post('/api/wishlist/bulk-add/', {'product_ids': []}, format='json').status_code == 400
+
+
+@pytest.mark.django_db
+def test_ids_read_racing_a_write_does_not_cache_stale_ids(client_for, monkeypatch, django_capture_on_commit_callbacks):
+    from api import wishlist
+    user, client = client_for('race')
+    product = Product.objects.create(name='Late', price=1)
+    load_ids = wishlist._load_ids
+
+    def load_then_write(user_id):
+        ids = load_ids(user_id)
+        with django_capture_on_commit_callbacks(execute=True):
+            wishlist.add_products(user_id, [product.id])
+        return ids
+
+    monkeypatch.setattr(wishlist, '_load_ids', load_then_write)
+    assert wishlist.wishlist_product_ids(user.id) == []
+    monkeypatch.undo()
+
+    assert client.get('/api/wishlist/ids/').data['product_ids'] == [product.id]
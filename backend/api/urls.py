@@ -4,15 +4,25 @@ from . import views
 urlpatterns = [
     path('register/',views.SignUpView.as_view(),name='register'),
     path('products/', views.ProductListView.as_view(), name='api_product_list'),
+    path('products/search/', views.ProductSearchView.as_view(), name='api_product_search'),
+    path('products/search/autocomplete/', views.ProductAutocompleteView.as_view(), name='api_product_autocomplete'),
     path('products/<int:pk>/', views.ProductDetailView.as_view(), name='api_product_detail'),
     path('orders/',views.OrderListView.as_view(),name='orders'),
+    path('orders/export/',views.OrderExportView.as_view(),name='orders-export'),
     path('cart/', views.CartDetailView.as_view(), name='api_cart_detail'),
     path('cart/update/', views.UpdateCartView.as_view(), name='api_cart_update'),
+    path('cart/batch/', views.BatchUpdateCartView.as_view(), name='api_cart_batch'),
     path('process-order/', views.ProcessOrderView.as_view(), name='api_process_order'),
     path('payment/start/', views.start_payment, name='start-payment'),
     path('payment/success/', views.handle_payment_success, name='handle-payment-success'),
+    path('payment/webhook/', views.RazorpayWebhookView.as_view(), name='payment-webhook'),
     path('wishlist/', views.WishlistListView.as_view(), name='get-wishlist'),
     path('wishlist/add/', views.WishlistAddView.as_view(), name='add-to-wishlist'),
     path('wishlist/remove/', views.WishlistRemoveView.as_view(), name='remove-from-wishlist'),
-    path('homepage-banner/', views.get_homepage_banner, name='get-homepage-banner')
+    path('wishlist/ids/', views.WishlistIdsView.as_view(), name='wishlist-ids'),
+    path('wishlist/bulk-add/', views.WishlistBulkAddView.as_view(), name='bulk-add-to-wishlist'),
+    path('wishlist/bulk-remove/', views.WishlistBulkRemoveView.as_view(), name='bulk-remove-from-wishlist'),
+    path('homepage-banner/', views.get_homepage_banner, name='get-homepage-banner'),
+    path('analytics/daily/', views.DailySalesView.as_view(), name='analytics-daily'),
+    path('analytics/top-products/', views.TopProductsView.as_view(), name='analytics-top-products'),
 ]
\ No newline at end of file
@@ -1,57 +1,192 @@
 from django.shortcuts import render, get_object_or_404
 from rest_framework.generics import ListAPIView, RetrieveAPIView, CreateAPIView, ListCreateAPIView
-from rest_framework import permissions, status, filters
+from rest_framework import permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from api.models import User,Product, Order, OrderItem, ShippingAddress, WishlistItem, Banner
-from api.serializers import ProductSerializer, OrderSerializer, UserSerializer, WishlistItemSerializer, BannerSerializer
-import razorpay
+from api.models import User,Product, Order, OrderItem, WishlistItem, Banner, DailyProductSales, DailySales, order_detail_prefetches
+from api.authentication import ClaimsJWTAuthentication
+from api.cart_store import get_cart_store
+from api.checkout import payment_details, receipt_for, record_payment_start, reserve_cart
+from api.analytics import parse_range, rollups_as_of
+from api.exports import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS
+from api.cache import conditional_get, object_etag, set_validators, versioned_cache
+from api.filters import ProductFilterBackend, ProductSearchFilter
+from api.inventory import OutOfStock, commit_order_stock, release_order_stock, reserve_order
+from api.pagination import ProductCursorPagination, WishlistCursorPagination
+from api.routers import ReplicaReadMixin
+from api.search import get_search_backend
+from api.serializers import CustomerProductSerializer, ProductSerializer, OrderSerializer, UserSerializer, WishlistItemSerializer, BannerSerializer, CartOperationSerializer, WishlistBulkSerializer
+from api.payments import AmountMismatch, GatewayUnavailable, check_amount, get_payment_gateway
+from api.tasks import on_order_completed
+from api.webhooks import record_event
+from api.wishlist import add_products, missing_products, remove_products, wishlist_product_ids
+from razorpay.errors import SignatureVerificationError
+import json
 from django.conf import settings
-from django.db import transaction
+from django.db import router, transaction
+from django.http import StreamingHttpResponse
+from django.db.models import Sum, prefetch_related_objects
 from rest_framework.decorators import api_view, permission_classes
-from django.views.decorators.cache import cache_page
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
 from django.utils.decorators import method_decorator
 
-razorpay_client = razorpay.Client(
-    auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
-)
-
 class SignUpView(CreateAPIView):
     serializer_class=UserSerializer
 
-@method_decorator(cache_page(60 * 60), name='dispatch')
-class ProductListView(ListAPIView):
+class CustomerProductStateMixin:
+    """
+    Authenticated requests get each product's in_wishlist and cart_quantity
+    annotated into the same query; anonymous ones keep the public shape that
+    the shared cache and ETags are built on.
+    """
+    authentication_classes = [ClaimsJWTAuthentication]
+
+    def personalized(self):
+        return self.request.user.is_authenticated
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.personalized():
+            queryset = queryset.with_customer_state(self.request.user.id, cart=not get_cart_store().write_behind)
+        return queryset
+
+    def get_serializer_class(self):
+        return CustomerProductSerializer if self.personalized() else ProductSerializer
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        store = get_cart_store()
+        if self.personalized() and store.write_behind:
+            context['cart_quantities'] = store.quantities(self.request.user)
+        return context
+
+@method_decorator(versioned_cache('products', uncached_params=('search',), personalized=True), name='get')
+class ProductListView(ReplicaReadMixin, CustomerProductStateMixin, ListAPIView):
     queryset=Product.objects.all()
     serializer_class=ProductSerializer
     permission_classes=[permissions.AllowAny]
+    pagination_class = ProductCursorPagination
 
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['name']
+    filter_backends = [ProductSearchFilter, ProductFilterBackend]
+
+class ProductSearchView(APIView):
+    permission_classes = [permissions.AllowAny]
+    default_limit = 20
+    max_limit = 100
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        return max(1, min(limit, self.max_limit))
 
-class ProductDetailView(RetrieveAPIView):
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'results': []})
+        products = get_search_backend().search(query, self.get_limit(request))
+        return Response({'results': ProductSerializer(products, many=True).data})
+
+
+class ProductAutocompleteView(ProductSearchView):
+    default_limit = 8
+    max_limit = 20
+
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'suggestions': []})
+        return Response({'suggestions': get_search_backend().autocomplete(query, self.get_limit(request))})
+
+
+class ProductDetailView(ReplicaReadMixin, CustomerProductStateMixin, RetrieveAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [permissions.AllowAny]
 
-class OrderListView(ListAPIView):
+    def retrieve(self, request, *args, **kwargs):
+        product = self.get_object()
+        if self.personalized():
+            # Wishlist and cart changes do not touch product.updated_at, so
+            # the row's validators cannot vouch for this response.
+            response = Response(self.get_serializer(product).data)
+            response['Cache-Control'] = 'private, no-cache'
+            patch_vary_headers(response, ['Authorization'])
+            return response
+        etag = object_etag('product', product)
+        not_modified = conditional_get(request, etag, product.updated_at)
+        if not_modified:
+            return not_modified
+        response = Response(self.get_serializer(product).data)
+        patch_vary_headers(response, ['Authorization'])
+        return set_validators(response, etag, product.updated_at)
+
+class OrderListView(ReplicaReadMixin, ListAPIView):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication]
 
     def get_queryset(self):
 
         user = self.request.user
-        return Order.objects.filter(customer=user, completed=True).order_by('-date_ordered')
+        return Order.objects.with_details().filter(customer_id=user.id, completed=True).order_by('-date_ordered')
+
+class OrderExportView(ReplicaReadMixin, APIView):
+    """
+    Streams the caller's completed orders as CSV (one row per line item)
+    or NDJSON (one object per order); staff can pass ?scope=all for every
+    customer's. Rows are written as they are read, see api.exports.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        output = request.query_params.get('output', 'csv')
+        if output not in EXPORT_FORMATS:
+            return Response({"error": f"output must be one of {', '.join(EXPORT_FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        stream, content_type = EXPORT_FORMATS[output]
+
+        queryset = Order.objects.filter(completed=True)
+        if not (request.user.is_staff and request.query_params.get('scope') == 'all'):
+            queryset = queryset.filter(customer_id=request.user.id)
+        # The body is generated after dispatch returns, outside use_replicas(),
+        # so pick the database now.
+        queryset = queryset.using(router.db_for_read(Order) or 'default')
+
+        response = StreamingHttpResponse(stream(queryset, DEFAULT_CHUNK_SIZE), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="orders.{output}"'
+        response['Cache-Control'] = 'private, no-store'
+        return response
 
 class CartDetailView(RetrieveAPIView):
     serializer_class=OrderSerializer
     permission_classes=[permissions.IsAuthenticated]
 
     def get_object(self):
-        order, created= Order.objects.get_or_create(
+        order = Order.objects.select_related('customer').filter(
             customer=self.request.user,
             completed=False
-        )
+        ).first()
+        if order is None:
+            order = Order.objects.create(customer=self.request.user, completed=False)
         return order
+
+    def retrieve(self, request, *args, **kwargs):
+        store = get_cart_store()
+        if store.write_behind:
+            return Response(store.cart_data(request.user))
+        order = self.get_object()
+        etag = object_etag('cart', order)
+        # The ETag comes from the order row alone, so an unchanged cart is
+        # answered before its line items are even loaded. No Last-Modified:
+        # a polled cart can change twice within its one-second resolution.
+        not_modified = conditional_get(request, etag)
+        if not_modified:
+            return not_modified
+        prefetch_related_objects([order], *order_detail_prefetches())
+        response = Response(self.get_serializer(order).data)
+        return set_validators(response, etag, private=True)
     
 class UpdateCartView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -61,19 +196,50 @@ class UpdateCartView(APIView):
 
         if not product_id or not action:
             return Response({'error': 'productId and action are required'}, status=status.HTTP_400_BAD_REQUEST)
-        customer=request.user
+        if action not in ('add', 'remove', 'set'):
+            return Response({'error': 'action must be one of add, remove or set'}, status=status.HTTP_400_BAD_REQUEST)
+        if action == 'set':
+            try:
+                quantity = int(request.data.get('quantity'))
+            except (TypeError, ValueError):
+                return Response({'error': 'quantity is required for the set action'}, status=status.HTTP_400_BAD_REQUEST)
+
         product=get_object_or_404(Product,id=product_id)
-        order, created=Order.objects.get_or_create(customer=customer, completed=False)
-        order_item,created=OrderItem.objects.get_or_create(order=order, product=product)
+        store = get_cart_store()
         if action == 'add':
-            order_item.quantity += 1
+            store.add_item(request.user, product)
         elif action == 'remove':
-            order_item.quantity -= 1
+            store.remove_item(request.user, product)
+        else:
+            store.set_item_quantity(request.user, product, quantity)
+        return Response(store.cart_data(request.user))
+
 
-        order_item.save()
-        if order_item.quantity <= 0:
-            order_item.delete()
-        return Response({'message': f'Item {action}ed successfully.'})
+class BatchUpdateCartView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    max_operations = 200
+
+    def post(self, request, *args, **kwargs):
+        if not isinstance(request.data, dict):
+            return Response({'error': 'Expected an object with an operations list.'}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = CartOperationSerializer(data=request.data.get('operations'), many=True)
+        if not serializer.is_valid():
+            return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        operations = serializer.validated_data
+        if not operations:
+            return Response({'error': 'operations must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(operations) > self.max_operations:
+            return Response({'error': f'At most {self.max_operations} operations per request.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        product_ids = {operation['productId'] for operation in operations}
+        found = set(Product.objects.filter(id__in=product_ids).values_list('id', flat=True))
+        missing = sorted(product_ids - found)
+        if missing:
+            return Response({'error': 'Some products were not found.', 'missing': missing}, status=status.HTTP_404_NOT_FOUND)
+
+        store = get_cart_store()
+        store.apply_operations(request.user, operations)
+        return Response(store.cart_data(request.user))
 
 
 class ProcessOrderView(APIView):
@@ -82,6 +248,7 @@ class ProcessOrderView(APIView):
     def post(self, request, *args, **kwargs):
 
         user = request.user 
+        get_cart_store().persist(user)
         
         try:
 
@@ -93,17 +260,23 @@ class ProcessOrderView(APIView):
         if not shipping_info:
             return Response({'error': 'Shipping information is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        order.completed = True
-        order.save()
-
-        ShippingAddress.objects.create(
-            customer=user,
-            order=order,
-            address=shipping_info.get('address'),
-            city=shipping_info.get('city'),
-            state=shipping_info.get('state'),
-            zipcode=shipping_info.get('zipcode'),
-        )
+        try:
+            with transaction.atomic():
+                # Same as Order.mark_paid: a second submit waits here, then sees the order completed.
+                order = Order.objects.select_for_update().get(pk=order.pk)
+                if order.completed:
+                    return Response({'error': 'This order has already been processed.'}, status=status.HTTP_409_CONFLICT)
+                reserve_order(order)
+                order.completed = True
+                order.completed_at = timezone.now()
+                order.save(update_fields=['completed', 'completed_at', 'updated_at'])
+                commit_order_stock(order)
+                order.attach_shipping_address(shipping_info)
+        except OutOfStock as e:
+            return Response({'error': 'Some items are out of stock.', 'product_ids': e.product_ids}, status=status.HTTP_409_CONFLICT)
+
+        get_cart_store().clear(user)
+        on_order_completed(order)
 
 
         serializer = OrderSerializer(order)
@@ -117,44 +290,23 @@ def start_payment(request):
     user = request.user
     data = request.data
 
-
     try:
-        order = Order.objects.get(customer=user, completed=False)
-        cart_total = order.get_cart_total
+        order = reserve_cart(user)
     except Order.DoesNotExist:
         return Response({"error": "No active cart found."}, status=status.HTTP_404_NOT_FOUND)
-
-    amount_in_paise = int(cart_total * 100)
+    except OutOfStock as e:
+        return Response({"error": "Some items are out of stock.", "product_ids": e.product_ids}, status=status.HTTP_409_CONFLICT)
 
     try:
-        razorpay_order = razorpay_client.order.create({
-            "amount": amount_in_paise,
-            "currency": "INR",
-            "receipt": f"order_rcptid_{order.id}",
-            "payment_capture": "1" 
-        })
-
-
-        order.razorpay_order_id = razorpay_order['id']
-        order.save()
-
-
-        response_data = {
-            "order_id": razorpay_order['id'],
-            "razorpay_key": settings.RAZORPAY_KEY_ID,
-            "amount": amount_in_paise,
-            "currency": "INR",
-            "name": "Your E-Commerce Site",
-            "description": "Test Transaction",
-            "prefill": {
-                "name": user.username,
-                "email": user.email,
-                "contact": user.phone
-            }
-        }
-        return Response(response_data, status=status.HTTP_200_OK)
+        razorpay_order = get_payment_gateway().create_order(order.amount_in_paise, "INR", receipt_for(order))
+        record_payment_start(order, razorpay_order, data.get('shipping_address') if isinstance(data, dict) else None)
+        return Response(payment_details(user, order), status=status.HTTP_200_OK)
 
+    except GatewayUnavailable as e:
+        release_order_stock(order)
+        return Response({"error": "Payment gateway is unavailable, please retry shortly.", "details": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
     except Exception as e:
+        release_order_stock(order)
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
@@ -178,35 +330,87 @@ def handle_payment_success(request):
         }
 
  
-        razorpay_client.utility.verify_payment_signature(params_dict)
+        get_payment_gateway().verify_payment_signature(params_dict)
 
         with transaction.atomic():
             order = Order.objects.get(razorpay_order_id=razorpay_order_id)
-            order.transaction_id = razorpay_payment_id
-            order.completed = True
-            order.save()
-
-   
-            ShippingAddress.objects.create(
-                customer=request.user,
-                order=order,
-                address=shipping_info.get('address'),
-                city=shipping_info.get('city'),
-                state=shipping_info.get('state'),
-                zipcode=shipping_info.get('zipcode'),
-            )
+            # The webhook worker may have completed the order already.
+            if not order.completed:
+                check_amount(order, order.payment_amount)
+            if order.mark_paid(razorpay_payment_id):
+                on_order_completed(order)
+            order.attach_shipping_address(shipping_info)
+        get_cart_store().clear(request.user)
 
         return Response({"status": "success", "order_id": order.id}, status=status.HTTP_200_OK)
 
+    except AmountMismatch as e:
+        return Response({"error": "The cart changed after payment started; please contact support.", "details": str(e)}, status=status.HTTP_409_CONFLICT)
     except Exception as e:
         return Response({"error": "Payment verification failed", "details": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+class RazorpayWebhookView(APIView):
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        body = request.body.decode('utf-8')
+        try:
+            get_payment_gateway().verify_webhook_signature(
+                body, request.headers.get('X-Razorpay-Signature'), settings.RAZORPAY_WEBHOOK_SECRET
+            )
+            payload = json.loads(body)
+        except (SignatureVerificationError, ValueError):
+            return Response({"error": "Invalid webhook signature or payload."}, status=status.HTTP_400_BAD_REQUEST)
+
+        event_id = request.headers.get('X-Razorpay-Event-Id') or payload.get('id')
+        if not event_id:
+            return Response({"error": "Missing event id."}, status=status.HTTP_400_BAD_REQUEST)
+        record_event(event_id, payload)
+        return Response({"status": "received"}, status=status.HTTP_200_OK)
+
 class WishlistListView(ListAPIView):
     serializer_class = WishlistItemSerializer
     permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication]
+    pagination_class = WishlistCursorPagination
 
     def get_queryset(self):
-        return WishlistItem.objects.filter(user=self.request.user).order_by('-added_at')
+        return WishlistItem.objects.filter(user_id=self.request.user.id).select_related('product')
+
+
+class WishlistIdsView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication]
+
+    def get(self, request, *args, **kwargs):
+        return Response({"product_ids": wishlist_product_ids(request.user.id)})
+
+
+class WishlistBulkAddView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = WishlistBulkSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        product_ids = serializer.validated_data['product_ids']
+        missing = missing_products(product_ids)
+        if missing:
+            return Response({"error": "Some products were not found.", "missing": missing}, status=status.HTTP_404_NOT_FOUND)
+        add_products(request.user.id, product_ids)
+        return Response({"product_ids": wishlist_product_ids(request.user.id)})
+
+
+class WishlistBulkRemoveView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = WishlistBulkSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        remove_products(request.user.id, serializer.validated_data['product_ids'])
+        return Response({"product_ids": wishlist_product_ids(request.user.id)})
 
 
 class WishlistAddView(APIView):
@@ -220,7 +424,7 @@ class WishlistAddView(APIView):
         try:
             product = Product.objects.get(id=product_id)
  
-            wishlist_item, created = WishlistItem.objects.get_or_create(user=request.user, product=product)
+            wishlist_item, created = WishlistItem.objects.get_or_create(user_id=request.user.id, product=product)
             if created:
                 return Response({"status": "success", "message": "Item added to wishlist."}, status=status.HTTP_201_CREATED)
             else:
@@ -238,18 +442,65 @@ class WishlistRemoveView(APIView):
             return Response({"error": "Product ID is required."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            wishlist_item = WishlistItem.objects.get(user=request.user, product_id=product_id)
+            wishlist_item = WishlistItem.objects.get(user_id=request.user.id, product_id=product_id)
             wishlist_item.delete()
             return Response({"status": "success", "message": "Item removed from wishlist."}, status=status.HTTP_200_OK)
         except WishlistItem.DoesNotExist:
             return Response({"error": "Item not found in wishlist."}, status=status.HTTP_404_NOT_FOUND)
         
 @api_view(['GET'])
-@cache_page(60 * 60)
+@versioned_cache('banner')
 def get_homepage_banner(request):
     try:
         banner = Banner.objects.get(name="homepage-banner")
         serializer = BannerSerializer(banner)
         return Response(serializer.data)
     except Banner.DoesNotExist:
-        return Response({"error": "Homepage banner not found in database."}, status=404)
\ No newline at end of file
+        return Response({"error": "Homepage banner not found in database."}, status=404)
+
+
+class AnalyticsView(ReplicaReadMixin, APIView):
+    """Staff-only reads of the sales rollups (api.analytics) over ?start=&end=."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        try:
+            start, end = parse_range(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        data = self.report(request, start, end)
+        data.update(start=start, end=end, as_of=rollups_as_of())
+        return Response(data)
+
+class DailySalesView(AnalyticsView):
+
+    def report(self, request, start, end):
+        days = DailySales.objects.filter(day__range=(start, end)).order_by('day')
+        results = list(days.values('day', 'orders', 'revenue', 'units'))
+        totals = {
+            'orders': sum(row['orders'] for row in results),
+            'revenue': sum((row['revenue'] for row in results), 0),
+            'units': sum(row['units'] for row in results),
+        }
+        return {'results': results, 'totals': totals}
+
+class TopProductsView(AnalyticsView):
+
+    def report(self, request, start, end):
+        by = request.query_params.get('by', 'revenue')
+        if by not in ('revenue', 'units'):
+            by = 'revenue'
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 100)
+        except ValueError:
+            limit = 10
+        products = (
+            DailyProductSales.objects.filter(day__range=(start, end))
+            .values('product_id', 'product__name')
+            .annotate(units=Sum('units'), revenue=Sum('revenue'))
+            .order_by(f'-{by}', 'product_id')[:limit]
+        )
+        return {'results': [
+            {'product_id': row['product_id'], 'name': row['product__name'], 'units': row['units'], 'revenue': row['revenue']}
+            for row in products
+        ]}
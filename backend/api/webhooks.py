@@ -0,0 +1,85 @@
+"""
+Razorpay webhook ingestion and finalization.
+
+The webhook view only verifies the signature and appends the raw event to
+PaymentEvent (ignoring redeliveries of an event id it already has), so it
+stays a single INSERT during sales bursts. process_pending_events, run by
+the process_payment_events command, then finalizes orders. Finalizing is
+idempotent: an order completed by the browser callback or by an earlier
+delivery is left as it is. A failed event is retried with exponential
+backoff (next_attempt_at), so an event that arrives before the order it
+refers to has committed is not used up in a burst of instant retries. A
+payment whose amount no longer matches the order total is not applied;
+the event stays failed with the reason.
+"""
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from api.cart_store import get_cart_store
+from api.models import Order, PaymentEvent
+from api.payments import check_amount
+from api.routers import pin_to_primary
+from api.tasks import on_order_completed, retry_delay
+
+logger = logging.getLogger(__name__)
+
+PAID_EVENTS = {'payment.captured', 'order.paid'}
+
+
+def record_event(event_id, payload):
+    """Append a webhook delivery; redeliveries of a recorded event id are ignored."""
+    PaymentEvent.objects.bulk_create(
+        [PaymentEvent(event_id=event_id, event_type=payload.get('event', ''), payload=payload)],
+        ignore_conflicts=True,
+    )
+
+
+def _payment_entity(payload):
+    return payload.get('payload', {}).get('payment', {}).get('entity', {})
+
+
+def handle_event(event):
+    if event.event_type not in PAID_EVENTS:
+        return
+    payment = _payment_entity(event.payload)
+    razorpay_order_id = payment.get('order_id')
+    if not razorpay_order_id:
+        raise ValueError('Event has no order_id')
+    order = Order.objects.select_related('customer').get(razorpay_order_id=razorpay_order_id)
+    if order.completed:
+        return
+    # A mismatch leaves the event failed with the reason in last_error for someone to review.
+    check_amount(order, payment.get('amount', order.payment_amount))
+    if order.mark_paid(payment.get('id')):
+        order.attach_shipping_address()
+        on_order_completed(order)
+        if order.customer:
+            get_cart_store().clear(order.customer)
+            pin_to_primary(order.customer_id)
+
+
+def process_pending_events(batch_size=100, max_attempts=5):
+    """Finalize one batch of unprocessed events; returns how many were handled."""
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            PaymentEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True, attempts__lt=max_attempts, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        for event in events:
+            event.attempts += 1
+            try:
+                with transaction.atomic():
+                    handle_event(event)
+            except Exception as exc:
+                logger.warning('Payment event %s failed: %s', event.event_id, exc)
+                event.last_error = str(exc)
+                event.next_attempt_at = timezone.now() + retry_delay(event.attempts)
+            else:
+                event.processed_at = timezone.now()
+                event.last_error = ''
+        PaymentEvent.objects.bulk_update(events, ['attempts', 'processed_at', 'last_error', 'next_attempt_at'])
+    return len(events)
@@ -0,0 +1,68 @@
+"""
+Wishlist membership.
+
+Product grids only need to know which product ids a user has wishlisted,
+so /api/wishlist/ids/ answers from `SELECT product_id ... WHERE user_id = ?`,
+which the (user, product) unique index covers on its own, and keeps the
+result in the cache per user. The key embeds a per-user generation
+(api.cache versions) that every write path bumps on commit: bulk_create
+here explicitly, single saves and deletes (including product deletions
+cascading) through the WishlistItem signals. A reader that loaded the ids
+before such a commit stores them under the old generation, where nobody
+looks any more, instead of overwriting the invalidation.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from api.cache import bump_version, get_version
+from api.models import Product, WishlistItem
+
+IDS_TIMEOUT = 60 * 60
+
+
+def _resource(user_id):
+    return f'wishlist:{user_id}'
+
+
+def _ids_key(user_id, version):
+    return f'wishlist:ids:{user_id}:{version}'
+
+
+def invalidate_wishlist_ids(user_id):
+    transaction.on_commit(lambda: bump_version(_resource(user_id)))
+
+
+def _load_ids(user_id):
+    return sorted(WishlistItem.objects.filter(user_id=user_id).values_list('product_id', flat=True))
+
+
+def wishlist_product_ids(user_id):
+    # Read the generation before the rows, so a write committing in between
+    # moves readers past whatever this call stores.
+    key = _ids_key(user_id, get_version(_resource(user_id)))
+    ids = cache.get(key)
+    if ids is None:
+        ids = _load_ids(user_id)
+        cache.set(key, ids, timeout=IDS_TIMEOUT)
+    return ids
+
+
+def missing_products(product_ids):
+    found = set(Product.objects.filter(pk__in=product_ids).values_list('pk', flat=True))
+    return sorted(set(product_ids) - found)
+
+
+def add_products(user_id, product_ids):
+    """Wishlist every product in product_ids; ones already there are left alone."""
+    with transaction.atomic():
+        WishlistItem.objects.bulk_create(
+            [WishlistItem(user_id=user_id, product_id=product_id) for product_id in sorted(set(product_ids))],
+            ignore_conflicts=True,
+        )
+        invalidate_wishlist_ids(user_id)
+
+
+def remove_products(user_id, product_ids):
+    with transaction.atomic():
+        WishlistItem.objects.filter(user_id=user_id, product_id__in=product_ids).delete()
+        invalidate_wishlist_ids(user_id)
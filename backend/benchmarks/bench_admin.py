@@ -0,0 +1,100 @@
+"""
+Admin changelist latency on large order tables.
+
+    python benchmarks/bench_admin.py [--orders 1000000] [--batch-size 10000] [--repeat 5]
+
+Seeds a throwaway test database with bulk inserts (users, products,
+orders, one line item, address and wishlist row per order), runs ANALYZE
+so Postgres has row estimates, then times the first and a filtered page
+of each changelist through the test client. Use Postgres for the
+estimated counts; on SQLite every page still runs an exact COUNT(*).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Ecommerce.settings')
+
+import django
+
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+
+from api.models import Order, OrderItem, Product, ShippingAddress, User, WishlistItem
+
+
+def seed(orders, batch_size):
+    customers = max(orders // 10, 1)
+    User.objects.bulk_create((User(username=f'bench{i}', phone='0') for i in range(customers)), batch_size=batch_size)
+    Product.objects.bulk_create((Product(name=f'Bench product {i}', price=10) for i in range(1000)), batch_size=batch_size)
+    user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+    product_ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+
+    for start in range(0, orders, batch_size):
+        size = min(batch_size, orders - start)
+        created = Order.objects.bulk_create(
+            Order(customer_id=user_ids[(start + i) % len(user_ids)], completed=True, total=10, item_count=1)
+            for i in range(size)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product_id=product_ids[order.pk % len(product_ids)], quantity=1) for order in created
+        )
+        ShippingAddress.objects.bulk_create(
+            ShippingAddress(order=order, customer_id=order.customer_id, city='Kochi') for order in created
+        )
+        print(f'seeded {start + size}/{orders} orders', end='\r', flush=True)
+    WishlistItem.objects.bulk_create(
+        (WishlistItem(user_id=user_id, product_id=product_ids[user_id % len(product_ids)]) for user_id in user_ids),
+        batch_size=batch_size, ignore_conflicts=True,
+    )
+    print()
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+
+def timed(client, url, repeat):
+    durations = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(url)
+            durations.append(time.perf_counter() - start)
+        assert response.status_code == 200, (url, response.status_code)
+    return statistics.median(durations) * 1000, len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    settings.ALLOWED_HOSTS = ['*']
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        seed(args.orders, args.batch_size)
+        client = Client()
+        client.force_login(User.objects.create_superuser(username='bench-admin', password='x', phone='0'))
+        for url in (
+            '/admin/api/order/', '/admin/api/order/?completed__exact=1', '/admin/api/order/?p=50',
+            '/admin/api/orderitem/', '/admin/api/shippingaddress/', '/admin/api/wishlistitem/',
+        ):
+            ms, queries = timed(client, url, args.repeat)
+            print(f'{url:<45} {ms:8.1f} ms  {queries} queries')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+Requests per second and p99 latency of the read endpoints under sync
+gunicorn workers versus uvicorn workers serving api.async_views.
+
+    python benchmarks/bench_async_views.py [--sync-workers 4] [--async-workers 1]
+                                           [--concurrency 32] [--duration 10]
+
+Both servers run against the same throwaway SQLite database (set
+DATABASE_URL to a Postgres URL to benchmark that instead). Pick worker
+counts so the "rss" column roughly matches; the comparison is meant to be
+made at equal memory. Requests carry no If-None-Match, so every one
+renders a full body.
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Ecommerce.settings')
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp()}/bench_async.sqlite3'
+
+import django
+
+django.setup()
+
+import requests
+from django.core.management import call_command
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import Order, OrderItem, Product, User, WishlistItem
+
+
+def seed(products):
+    call_command('migrate', verbosity=0)
+    Product.objects.bulk_create(Product(name=f'Bench product {i}', price=i % 90 + 10) for i in range(products))
+    user, _ = User.objects.get_or_create(username='bench', defaults={'phone': '0'})
+    order, _ = Order.objects.get_or_create(customer=user, completed=False)
+    for product in Product.objects.order_by('id')[:5]:
+        OrderItem.objects.get_or_create(order=order, product=product, defaults={'quantity': 2})
+        WishlistItem.objects.get_or_create(user=user, product=product)
+    order.recalculate_totals()
+    return str(RefreshToken.for_user(user).access_token), Product.objects.order_by('id').values_list('id', flat=True)[10]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid):
+    """Resident memory of a process and all of its children, in MB."""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                ppid = int(Path(f'/proc/{entry}/stat').read_text().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        try:
+            for line in Path(f'/proc/{current}/status').read_text().splitlines():
+                if line.startswith('VmRSS:'):
+                    total += int(line.split()[1])
+        except OSError:
+            pass
+    return total / 1024
+
+
+def start_server(kind, workers, port):
+    env = {**os.environ, 'ASYNC_READ_VIEWS': '1' if kind == 'async' else '0'}
+    if kind == 'async':
+        command = ['uvicorn', 'Ecommerce.asgi:application', '--workers', str(workers),
+                   '--port', str(port), '--log-level', 'warning', '--no-access-log']
+    else:
+        command = ['gunicorn', 'Ecommerce.wsgi:application', '--workers', str(workers),
+                   '--bind', f'127.0.0.1:{port}', '--log-level', 'warning']
+    process = subprocess.Popen(command, cwd=BACKEND, env=env, start_new_session=True)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f'http://127.0.0.1:{port}/api/products/', timeout=5)
+            return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f'{kind} server did not start')
+
+
+def stop_server(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    process.wait(timeout=10)
+
+
+def load(url, headers, concurrency, duration):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker():
+        session = requests.Session()
+        local = []
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                ok = session.get(url, headers=headers, timeout=10).status_code == 200
+            except requests.RequestException:
+                ok = False
+            local.append(time.perf_counter() - start)
+            if not ok:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0
+    return len(latencies) / duration, p99 * 1000, errors[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sync-workers', type=int, default=4)
+    parser.add_argument('--async-workers', type=int, default=1)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--products', type=int, default=500)
+    args = parser.parse_args()
+
+    token, product_id = seed(args.products)
+    auth = {'Authorization': f'Bearer {token}'}
+    endpoints = [
+        ('product list', '/api/products/?page_size=24', {}),
+        ('product detail', f'/api/products/{product_id}/', {}),
+        ('cart', '/api/cart/', auth),
+        ('wishlist', '/api/wishlist/', auth),
+    ]
+
+    for kind, workers in (('sync', args.sync_workers), ('async', args.async_workers)):
+        port = free_port()
+        process = start_server(kind, workers, port)
+        try:
+            print(f'{kind} ({workers} workers, rss {rss_mb(process.pid):.0f} MB)')
+            for name, path, headers in endpoints:
+                rps, p99, errors = load(f'http://127.0.0.1:{port}{path}', headers, args.concurrency, args.duration)
+                print(f'  {name:<15} {rps:8.1f} req/s  p99 {p99:7.1f} ms  errors {errors}')
+            print(f'  rss after load {rss_mb(process.pid):.0f} MB')
+        finally:
+            stop_server(process)
+
+
+if __name__ == '__main__':
+    main()
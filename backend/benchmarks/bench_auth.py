@@ -0,0 +1,72 @@
+"""
+Authentication overhead per request: stock simplejwt versus the cached and
+claims-only classes in api.authentication.
+
+    python benchmarks/bench_auth.py [--requests 5000] [--users 50]
+
+Requests cycle through --users distinct tokens, as a busy worker would see.
+Runs against a throwaway test database created from the configured one;
+the shared cache is whatever CACHES points at (local memory unless
+REDIS_URL is set), so "cached" includes a real Redis hit when it is.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Ecommerce.settings')
+
+import django
+
+django.setup()
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.authentication import CachedJWTAuthentication, ClaimsJWTAuthentication, local_users, verified_tokens
+from api.models import User
+
+
+def run(name, authenticator, requests):
+    local_users.clear()
+    verified_tokens.clear()
+    cache.clear()
+    with CaptureQueriesContext(connection) as ctx:
+        start = time.perf_counter()
+        for request in requests:
+            authenticator.authenticate(request)
+        elapsed = time.perf_counter() - start
+    print(f'{name:<22} {elapsed / len(requests) * 1e6:8.1f} us/request  '
+          f'{len(ctx.captured_queries) / len(requests):5.2f} queries/request')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=50)
+    args = parser.parse_args()
+
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        users = User.objects.bulk_create(User(username=f'bench-{i}', phone='0') for i in range(args.users))
+        tokens = [str(RefreshToken.for_user(user).access_token) for user in users]
+        factory = APIRequestFactory()
+        requests = [
+            factory.get('/api/cart/', HTTP_AUTHORIZATION=f'Bearer {tokens[i % len(tokens)]}')
+            for i in range(args.requests)
+        ]
+        run('simplejwt', JWTAuthentication(), requests)
+        run('cached user + token', CachedJWTAuthentication(), requests)
+        run('claims only', ClaimsJWTAuthentication(), requests)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Connection setup overhead per request: a fresh connection every request
+(CONN_MAX_AGE=0), a persistent connection (CONN_MAX_AGE>0, with and
+without health checks) and, on Postgres with psycopg 3 installed,
+Django's native pool.
+
+    DATABASE_URL=postgres://... python benchmarks/bench_db_connections.py [--requests 500]
+
+Each "request" runs one trivial query between the request_started and
+request_finished signals, which is where Django opens and closes
+connections. Against the SQLite fallback the numbers are only a smoke
+test: opening a SQLite file costs next to nothing.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Ecommerce.settings')
+
+import django
+
+django.setup()
+
+from django.core.signals import request_finished, request_started
+from django.db import connection
+
+
+def run(name, requests, **overrides):
+    connection.close()
+    original = {key: connection.settings_dict.get(key) for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS', 'OPTIONS')}
+    connection.settings_dict.update(overrides)
+    try:
+        start = time.perf_counter()
+        for _ in range(requests):
+            request_started.send(sender=None)
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            request_finished.send(sender=None)
+        elapsed = time.perf_counter() - start
+    finally:
+        connection.close()
+        if hasattr(connection, 'close_pool'):
+            connection.close_pool()
+        connection.settings_dict.update(original)
+    print(f'{name:<28} {elapsed / requests * 1000:8.3f} ms/request')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    print(f'{connection.vendor} database {connection.settings_dict["NAME"]}')
+    run('new connection per request', args.requests, CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False)
+    run('persistent', args.requests, CONN_MAX_AGE=600, CONN_HEALTH_CHECKS=False)
+    run('persistent + health checks', args.requests, CONN_MAX_AGE=600, CONN_HEALTH_CHECKS=True)
+
+    if connection.vendor == 'postgresql':
+        try:
+            import psycopg_pool  # noqa: F401
+        except ImportError:
+            print('pool: skipped, install "psycopg[binary,pool]" to compare')
+            return
+        options = {**connection.settings_dict.get('OPTIONS', {}), 'pool': {'min_size': 2, 'max_size': 4}}
+        run('psycopg pool', args.requests, CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False, OPTIONS=options)
+
+
+if __name__ == '__main__':
+    main()
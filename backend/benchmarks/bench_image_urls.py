@@ -0,0 +1,80 @@
+"""
+Serialization cost of 1,000 products with per-request Cloudinary URL
+building versus the URLs precomputed at save time.
+
+    python benchmarks/bench_image_urls.py [--products 1000] [--rounds 5]
+
+Products are built in memory, so no database is needed.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Ecommerce.settings')
+
+import django
+
+django.setup()
+
+import cloudinary
+from cloudinary import CloudinaryResource
+from rest_framework import serializers
+
+from api.images import PRODUCT_IMAGE_VARIANTS, build_image_urls
+from api.models import Product
+from api.serializers import ProductSerializer
+
+
+class LegacyProductSerializer(serializers.ModelSerializer):
+    """The serializer as it was: build_url on every product, every request."""
+    image = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'price', 'digital', 'image']
+
+    def get_image(self, obj):
+        return cloudinary.CloudinaryImage(obj.image.public_id).build_url(
+            transformation=PRODUCT_IMAGE_VARIANTS['image_url']
+        )
+
+
+def make_products(count):
+    products = []
+    for i in range(count):
+        image = CloudinaryResource(f'products/item-{i}', format='jpg', type='upload', resource_type='image')
+        product = Product(id=i + 1, name=f'Product {i}', price='19.99', digital=False, image=image)
+        for field, url in build_image_urls(image, PRODUCT_IMAGE_VARIANTS).items():
+            setattr(product, field, url)
+        products.append(product)
+    return products
+
+
+def best_of(rounds, serializer_class, products):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        serializer_class(products, many=True).data
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    products = make_products(args.products)
+    before = best_of(args.rounds, LegacyProductSerializer, products)
+    after = best_of(args.rounds, ProductSerializer, products)
+    print(f'{args.products} products, best of {args.rounds}')
+    print(f'  build_url per request: {before * 1000:8.1f} ms')
+    print(f'  precomputed URLs:      {after * 1000:8.1f} ms  ({before / after:.1f}x faster)')
+
+
+if __name__ == '__main__':
+    main()
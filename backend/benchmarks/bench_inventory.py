@@ -0,0 +1,92 @@
+"""
+Concurrent reservations against one hot product, single shard versus
+several shards.
+
+    python benchmarks/bench_inventory.py [--threads 8] [--orders 400] [--stock 300] [--shards 1 4]
+
+Runs against a throwaway test database created from the configured one
+(use Postgres to see row-lock contention; SQLite serializes every writer).
+Reports reservations per second and checks that nothing was oversold.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Ecommerce.settings')
+
+import django
+
+django.setup()
+
+from django.db import connection
+
+from api.inventory import OutOfStock, reserve_order, set_stock
+from api.models import Order, OrderItem, Product, StockReservation, StockShard, User
+
+
+def run(threads, orders, stock, shards):
+    product = Product.objects.create(name=f'Hot item x{shards}', price=10)
+    set_stock(product, stock, shards=shards)
+    carts = []
+    for i in range(orders):
+        user = User.objects.create(username=f'bench-{shards}-{i}', phone='0')
+        order = Order.objects.create(customer=user)
+        OrderItem.objects.create(order=order, product=product, quantity=1)
+        carts.append(order)
+
+    queue = iter(carts)
+    lock = threading.Lock()
+    counts = {'ok': 0, 'out': 0}
+
+    def worker():
+        while True:
+            with lock:
+                order = next(queue, None)
+            if order is None:
+                break
+            try:
+                reserve_order(order)
+                key = 'ok'
+            except OutOfStock:
+                key = 'out'
+            with lock:
+                counts[key] += 1
+        connection.close()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    held = sum(StockReservation.objects.filter(product=product).values_list('quantity', flat=True))
+    available = sum(StockShard.objects.filter(product=product).values_list('available', flat=True))
+    oversold = held > stock or available < 0 or held + available != stock
+    print(f'shards={shards:<3} {orders / elapsed:8.1f} reservations/s  '
+          f'reserved={counts["ok"]} rejected={counts["out"]} oversold={"YES" if oversold else "no"}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--orders', type=int, default=400)
+    parser.add_argument('--stock', type=int, default=300)
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 4])
+    args = parser.parse_args()
+
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        for shards in args.shards:
+            run(args.threads, args.orders, args.stock, shards)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
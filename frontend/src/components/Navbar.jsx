@@ -5,7 +5,7 @@ import { useCart } from '../context/CartContext';
 
 export default function Navbar() {
   const navigate = useNavigate();
-  const { wishlist, clearWishlist } = useWishlist();
+  const { wishlistIds, clearWishlist } = useWishlist();
   const { cartCount, logout } = useCart();
   const token = localStorage.getItem('accessToken');
   
@@ -47,7 +47,7 @@ export default function Navbar() {
       <Link to="/" className="hover:text-cyan-300 transition-colors" onClick={() => setIsMenuOpen(false)}>Home</Link>
       <Link to="/wishlist" className="relative hover:text-cyan-300 transition-colors" onClick={() => setIsMenuOpen(false)}>
         Wishlist
-        {wishlist.length > 0 && <span className="absolute -top-2 -left-4 bg-red-600 text-xs text-white rounded-full h-5 w-5 flex items-center justify-center">{wishlist.length}</span>}
+        {wishlistIds.length > 0 && <span className="absolute -top-2 -left-4 bg-red-600 text-xs text-white rounded-full h-5 w-5 flex items-center justify-center">{wishlistIds.length}</span>}
       </Link>
       {token ? (
         <>
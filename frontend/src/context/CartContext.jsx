@@ -19,6 +19,11 @@ export function CartProvider({ children }) {
     setCartTotal(total);
   };
 
+  const applyServerCart = (cart) => {
+    setCartItems(cart.orderitems || []);
+    setCartTotal(cart.get_cart_total || 0);
+  };
+
   const fetchCart = useCallback(async () => {
     const token = localStorage.getItem('accessToken');
     setLoading(true);
@@ -27,8 +32,7 @@ export function CartProvider({ children }) {
     if (token) { 
       try {
         const response = await api.get('/cart/');
-        setCartItems(response.data.orderitems || []);
-        setCartTotal(response.data.get_cart_total || 0);
+        applyServerCart(response.data);
       } catch (err) {
         if (err.response?.status === 404) {
           setCartItems([]);
@@ -54,8 +58,8 @@ export function CartProvider({ children }) {
     const token = localStorage.getItem('accessToken');
     if (token) { 
       try {
-        await api.post('/cart/update/', { productId: product.id, action: 'add' });
-        await fetchCart();
+        const response = await api.post('/cart/update/', { productId: product.id, action: 'add' });
+        applyServerCart(response.data);
       } catch (err) {
         console.error("Failed to add to cart", err);
       }
@@ -78,8 +82,8 @@ export function CartProvider({ children }) {
     const token = localStorage.getItem('accessToken');
     if (token) { 
       try {
-        await api.post('/cart/update/', { productId, action: 'remove' });
-        await fetchCart();
+        const response = await api.post('/cart/update/', { productId, action: 'remove' });
+        applyServerCart(response.data);
       } catch (err) {
         console.error("Failed to decrease quantity", err);
       }
@@ -98,10 +102,8 @@ export function CartProvider({ children }) {
       const itemToClear = cartItems.find(item => item.product.id === productId);
       if (!itemToClear) return;
       try {
-        for (let i = 0; i < itemToClear.quantity; i++) {
-          await api.post('/cart/update/', { productId, action: 'remove' });
-        }
-        await fetchCart();
+        const response = await api.post('/cart/update/', { productId, action: 'set', quantity: 0 });
+        applyServerCart(response.data);
       } catch (err) {
         console.error("Failed to clear item", err);
       }
@@ -8,51 +8,52 @@ export function useWishlist() {
 }
 
 export function WishlistProvider({ children }) {
-  const [wishlist, setWishlist] = useState([]);
+  // Only product ids are kept here; WishlistPage pages through the full items.
+  const [wishlistIds, setWishlistIds] = useState([]);
 
   const fetchWishlist = useCallback(async () => {
     if (!localStorage.getItem('accessToken')) {
-        setWishlist([]);
+        setWishlistIds([]);
         return;
     }
     try {
-      const { data } = await api.get('/wishlist/');
-      setWishlist(data || []);
+      const { data } = await api.get('/wishlist/ids/');
+      setWishlistIds(data.product_ids || []);
     } catch (error) {
       console.error("Failed to fetch wishlist", error);
-      setWishlist([]); // Clear wishlist on error
+      setWishlistIds([]); // Clear wishlist on error
     }
   }, []);
 
   const addToWishlist = useCallback(async (product) => {
     try {
-      await api.post('/wishlist/add/', { product_id: product.id });
-      await fetchWishlist(); // Refetch to sync state
+      // The bulk endpoints answer with the updated ids, so no refetch is needed.
+      const { data } = await api.post('/wishlist/bulk-add/', { product_ids: [product.id] });
+      setWishlistIds(data.product_ids);
     } catch (error) {
       console.error("Failed to add to wishlist", error);
     }
-  }, [fetchWishlist]);
+  }, []);
 
   const removeFromWishlist = useCallback(async (productId) => {
     try {
-      await api.post('/wishlist/remove/', { product_id: productId });
-      await fetchWishlist(); // Refetch to sync state
+      const { data } = await api.post('/wishlist/bulk-remove/', { product_ids: [productId] });
+      setWishlistIds(data.product_ids);
     } catch (error) {
       console.error("Failed to remove from wishlist", error);
     }
-  }, [fetchWishlist]);
+  }, []);
 
   const isInWishlist = useCallback((productId) => {
-    // Check against the product object nested in the wishlist item
-    return wishlist.some((item) => item.product.id === productId);
-  }, [wishlist]);
+    return wishlistIds.includes(productId);
+  }, [wishlistIds]);
 
   const clearWishlist = useCallback(() => {
-    setWishlist([]);
+    setWishlistIds([]);
   }, []);
 
   const value = {
-    wishlist,
+    wishlistIds,
     fetchWishlist,
     addToWishlist,
     removeFromWishlist,
@@ -52,7 +52,7 @@ export default function CheckoutPage() {
 
     try {
       console.log("Requesting new Razorpay order from backend...");
-      const { data: orderData } = await api.post('/payment/start/', {});
+      const { data: orderData } = await api.post('/payment/start/', { shipping_address: formData });
       console.log("Received new Razorpay Order ID:", orderData.order_id);
 
       const options = {
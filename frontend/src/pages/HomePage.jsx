@@ -9,6 +9,8 @@ function useQuery() {
 
 export default function HomePage() {
   const [products, setProducts] = useState([]);
+  const [nextPageUrl, setNextPageUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [bannerData, setBannerData] = useState(null); 
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
@@ -22,7 +24,7 @@ export default function HomePage() {
       setError(null);
       try {
         const productsUrl = searchQuery 
-          ? `/products/?search=${searchQuery}`
+          ? `/products/search/?q=${encodeURIComponent(searchQuery)}`
           : '/products/';
         
         const [productsResponse, bannerResponse] = await Promise.all([
@@ -30,7 +32,8 @@ export default function HomePage() {
             api.get('/homepage-banner/')
         ]);
         
-        setProducts(productsResponse.data);
+        setProducts(productsResponse.data.results);
+        setNextPageUrl(productsResponse.data.next || null);
         setBannerData(bannerResponse.data);
 
       } catch (err) {
@@ -46,6 +49,20 @@ export default function HomePage() {
     fetchData();
   }, [searchQuery]);
 
+  const handleLoadMore = async () => {
+    if (!nextPageUrl) return;
+    setLoadingMore(true);
+    try {
+      const { data } = await api.get(nextPageUrl);
+      setProducts((current) => [...current, ...data.results]);
+      setNextPageUrl(data.next);
+    } catch (err) {
+      console.error("Error fetching more products:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleScrollToProducts = () => {
     const productsSection = document.getElementById('products-section');
     if (productsSection) {
@@ -86,11 +103,20 @@ export default function HomePage() {
         ) : error ? (
           <div className="text-center text-red-500 p-10">{error}</div>
         ) : products.length > 0 ? (
-          <div className="grid grid-cols-1 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-8">
-            {products.map((product) => (
-              <ProductCard key={product.id} product={product} />
-            ))}
-          </div>
+          <>
+            <div className="grid grid-cols-1 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-8">
+              {products.map((product) => (
+                <ProductCard key={product.id} product={product} />
+              ))}
+            </div>
+            {nextPageUrl && (
+              <div className="text-center mt-10">
+                <button onClick={handleLoadMore} disabled={loadingMore} className="bg-cyan-600 text-white font-bold py-3 px-8 rounded-md hover:bg-cyan-700 disabled:opacity-50">
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </button>
+              </div>
+            )}
+          </>
         ) : (
           <p className="text-center text-xl text-slate-400">No products found.</p>
         )}
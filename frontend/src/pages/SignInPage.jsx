@@ -18,14 +18,12 @@ function SignInPage() {
     const guestCart = JSON.parse(localStorage.getItem('cart')) || [];
     if (guestCart.length > 0) {
       console.log("Merging guest cart with backend...");
-      const mergePromises = guestCart.map(item => {
-        const itemPromises = [];
-        for (let i = 0; i < item.quantity; i++) {
-          itemPromises.push(api.post('/cart/update/', { productId: item.product.id, action: 'add' }));
-        }
-        return Promise.all(itemPromises);
-      });
-      await Promise.all(mergePromises);
+      const operations = guestCart.map(item => ({
+        productId: item.product.id,
+        action: 'add',
+        quantity: item.quantity,
+      }));
+      await api.post('/cart/batch/', { operations });
       localStorage.removeItem('cart');
     }
   };
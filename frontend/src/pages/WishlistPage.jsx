@@ -1,26 +1,64 @@
-import { useEffect } from 'react';
+import { useEffect, useState } from 'react';
 import { useWishlist } from '../context/WishlistContext';
 import ProductCard from '../components/ProductCard';
+import api from '../api/axiosConfig';
 
 export default function WishlistPage() {
-  const { wishlist, fetchWishlist } = useWishlist();
+  const { wishlistIds } = useWishlist();
+  const [items, setItems] = useState([]);
+  const [nextPageUrl, setNextPageUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
+  // Reload the first page whenever the set of wishlisted products changes.
   useEffect(() => {
-    fetchWishlist();
-  }, [fetchWishlist]);
+    const fetchItems = async () => {
+      try {
+        const { data } = await api.get('/wishlist/');
+        setItems(data.results);
+        setNextPageUrl(data.next || null);
+      } catch (error) {
+        console.error("Failed to fetch wishlist", error);
+        setItems([]);
+      }
+    };
+    fetchItems();
+  }, [wishlistIds]);
+
+  const handleLoadMore = async () => {
+    if (!nextPageUrl) return;
+    setLoadingMore(true);
+    try {
+      const { data } = await api.get(nextPageUrl);
+      setItems((current) => [...current, ...data.results]);
+      setNextPageUrl(data.next);
+    } catch (error) {
+      console.error("Failed to fetch more wishlist items", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   return (
     <div className="container mx-auto p-6">
       <h1 className="text-5xl font-bold text-center my-10">My Wishlist</h1>
-      {wishlist.length > 0 ? (
-        <div className="grid grid-cols-1 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-8">
-          {wishlist.map((item) => (
-            <ProductCard key={item.product.id} product={item.product} />
-          ))}
-        </div>
+      {items.length > 0 ? (
+        <>
+          <div className="grid grid-cols-1 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-8">
+            {items.map((item) => (
+              <ProductCard key={item.product.id} product={item.product} />
+            ))}
+          </div>
+          {nextPageUrl && (
+            <div className="text-center mt-10">
+              <button onClick={handleLoadMore} disabled={loadingMore} className="bg-cyan-600 text-white font-bold py-3 px-8 rounded-md hover:bg-cyan-700 disabled:opacity-50">
+                {loadingMore ? 'Loading...' : 'Load more'}
+              </button>
+            </div>
+          )}
+        </>
       ) : (
         <p className="text-center text-xl text-slate-400">Your wishlist is empty.</p>
       )}
     </div>
   );
-}
\ No newline at end of file
+}